@@ -0,0 +1,402 @@
+"""
+Arquivo frio em Parquet dos meses fechados de dados_energia.
+
+Um arquivo por usina e mês, em pastas no estilo Hive:
+
+    ARQUIVO_DIR/usina_id=12/ano=2025/mes=03/dados.parquet
+
+Leituras sem usina ficam em usina_id=0. Os arquivos são colunares,
+comprimidos com zstd e ordenados por (timestamp, id) (leituras atrasadas,
+arquivadas depois, entram em row groups no fim), então um filtro de período
+descarta pastas inteiras e, dentro do arquivo, row groups pelas estatísticas
+de min/max.
+
+O arquivador lê o mês em lotes de COMPACTACAO_LOTE linhas e grava o Parquet
+inteiro; só então tira as linhas do SQLite, um lote por transação, somando
+cada lote ao nível de 15 minutos. Nem a memória nem o lock de escrita crescem
+com o tamanho do mês. ler() e agregar() juntam o arquivo com a cauda quente
+que ainda está no banco.
+
+Com retenção do bruto ligada (RETENCAO_BRUTO_DIAS > 0), a compactação de
+retencao.py arquiva os meses anteriores ao corte antes de tirá-los do banco,
+com ou sem ARQUIVO_AUTOMATICO. Bancos compactados antes disso podem ter
+meses só no nível de 15 minutos; meses_incompletos() os aponta.
+
+Uso:
+
+    python arquivo.py arquivar [--ate 2025-06-01]
+"""
+import argparse
+import itertools
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.orm import Session
+
+import consultas
+import models
+import retencao
+import rollups
+
+# pyarrow é opcional e só é importado no primeiro uso (ver _exigir_pyarrow):
+# com o pandas que ele arrasta, custaria ~0,5 s na subida de cada worker
+pa = pc = ds = pq = None
+
+ARQUIVO_DIR = Path(os.getenv("ARQUIVO_DIR", "./arquivo"))
+# "1" faz o compactador agendado arquivar todos os meses fechados, não só os
+# anteriores ao corte da retenção (esses são arquivados sempre)
+ARQUIVO_AUTOMATICO = os.getenv("ARQUIVO_AUTOMATICO", "0") == "1"
+LINHAS_POR_ROW_GROUP = 65536
+
+# Colunas de cada arquivo (usina_id, ano e mes vêm do caminho)
+COLUNAS = ("id", "dispositivo_id", "timestamp", "gerado_kwh", "consumido_kwh")
+COLUNAS_CONSULTA = COLUNAS + ("usina_id",)
+
+
+class ArquivoIndisponivel(RuntimeError):
+    """pyarrow não está instalado."""
+
+
+def disponivel() -> bool:
+    try:
+        _exigir_pyarrow()
+    except ArquivoIndisponivel:
+        return False
+    return True
+
+
+def _exigir_pyarrow():
+    global pa, pc, ds, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise ArquivoIndisponivel("Instale pyarrow para usar o arquivo frio")
+    pc, ds, pq = pyarrow.compute, pyarrow.dataset, pyarrow.parquet
+    pa = pyarrow
+
+
+def _esquema():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("dispositivo_id", pa.int64()),
+        ("timestamp", pa.timestamp("us")),
+        ("gerado_kwh", pa.float64()),
+        ("consumido_kwh", pa.float64()),
+    ])
+
+
+def caminho_particao(usina_id: int, ano: int, mes: int) -> Path:
+    return ARQUIVO_DIR / f"usina_id={usina_id}" / f"ano={ano}" / f"mes={mes:02d}" / "dados.parquet"
+
+
+def _inicio_mes(data: datetime) -> datetime:
+    return data.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _meses(inicio: datetime, fim: datetime):
+    """Inícios de mês de `inicio` (truncado) até antes de `fim`."""
+    mes = _inicio_mes(inicio)
+    while mes < fim:
+        yield mes
+        mes = rollups.proximo_bucket("1mo", mes)
+
+
+def _lotes(db: Session, filtro, colunas, lote: int):
+    """Linhas que atendem `filtro` em ordem de (timestamp, id), `lote` por vez (keyset)."""
+    d = models.DadoEnergia
+    apos = None
+    while True:
+        consulta = select(*colunas).where(*filtro).order_by(d.timestamp, d.id).limit(lote)
+        if apos is not None:
+            ts, id_ = apos
+            consulta = consulta.where(d.timestamp >= ts, or_(d.timestamp > ts, and_(d.timestamp == ts, d.id > id_)))
+        linhas = db.execute(consulta).all()
+        if not linhas:
+            return
+        yield linhas
+        if len(linhas) < lote:
+            return
+        apos = (linhas[-1].timestamp, linhas[-1].id)
+
+
+def _gravar(lotes, caminho: Path) -> int:
+    """
+    Grava os lotes de linhas (COLUNAS) em `caminho`, em row groups de
+    LINHAS_POR_ROW_GROUP. Retorna o maior id lido.
+    """
+    # Se o mês já tem arquivo (leituras atrasadas, ou um arquivamento
+    # interrompido antes de apagar tudo), as linhas dele são copiadas primeiro
+    # e as do banco entram depois, sem repetir ids
+    existente = pq.ParquetFile(caminho) if caminho.exists() else None
+    arquivados = existente.read(columns=["id"])["id"] if existente is not None else None
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    # Nomes com "." no início são ignorados pelo pyarrow.dataset
+    temporario = caminho.with_name(f".{caminho.name}.tmp")
+    ultimo_id, pendentes, linhas_pendentes = 0, [], 0
+    with pq.ParquetWriter(temporario, _esquema(), compression="zstd") as escritor:
+        if existente is not None:
+            for grupo in range(existente.num_row_groups):
+                escritor.write_table(existente.read_row_group(grupo))
+        for linhas in lotes:
+            tabela = pa.table(list(zip(*linhas)), schema=_esquema())
+            ultimo_id = max(ultimo_id, pc.max(tabela["id"]).as_py())
+            if arquivados is not None:
+                tabela = tabela.filter(pc.invert(pc.is_in(tabela["id"], value_set=arquivados)))
+            pendentes.append(tabela)
+            linhas_pendentes += tabela.num_rows
+            if linhas_pendentes >= LINHAS_POR_ROW_GROUP:
+                escritor.write_table(pa.concat_tables(pendentes), row_group_size=LINHAS_POR_ROW_GROUP)
+                pendentes, linhas_pendentes = [], 0
+        if linhas_pendentes:
+            escritor.write_table(pa.concat_tables(pendentes), row_group_size=LINHAS_POR_ROW_GROUP)
+    os.replace(temporario, caminho)
+    return ultimo_id
+
+
+def arquivar_particao(db: Session, usina_id: Optional[int], mes: datetime,
+                      lote: int = retencao.COMPACTACAO_LOTE) -> int:
+    """
+    Move as leituras de uma usina em um mês para o Parquet, lendo e apagando
+    `lote` linhas por vez. Retorna as linhas movidas.
+    """
+    _exigir_pyarrow()
+    d = models.DadoEnergia
+    filtro = [
+        d.timestamp >= mes,
+        d.timestamp < rollups.proximo_bucket("1mo", mes),
+        d.usina_id == usina_id if usina_id is not None else d.usina_id.is_(None),
+    ]
+    lotes = _lotes(db, filtro, [getattr(d, coluna) for coluna in COLUNAS], lote)
+    primeiro = next(lotes, None)
+    if primeiro is None:
+        return 0
+    ultimo_id = _gravar(itertools.chain([primeiro], lotes), caminho_particao(usina_id or 0, mes.year, mes.month))
+    # Encerra a transação de leitura antes de começar a apagar
+    db.commit()
+
+    # O arquivo já está no disco: as linhas saem do SQLite pelo mesmo caminho
+    # da compactação, para o nível de 15 minutos continuar completo (lotes
+    # que o nível de 15 minutos já não retém não precisam passar por ele).
+    # Cada lote é somado e apagado na mesma transação; leituras que chegaram
+    # durante a gravação têm id maior que ultimo_id e ficam para a próxima vez
+    corte_15m = retencao.corte(retencao.RETENCAO_15M_DIAS)
+    movidas = 0
+    colunas = (d.id, d.timestamp, d.gerado_kwh, d.consumido_kwh)
+    for linhas in _lotes(db, [*filtro, d.id <= ultimo_id], colunas, lote):
+        ids, timestamps, gerado, consumido = zip(*linhas)
+        if corte_15m is None or timestamps[-1] >= corte_15m:
+            rollups.somar_colunas(
+                db, "15m", rollups.TABELA_15M, rollups.TABELA_USINA_15M,
+                np.array(timestamps, dtype="datetime64[us]"),
+                np.array(gerado, dtype=np.float64),
+                np.array(consumido, dtype=np.float64),
+                np.full(len(linhas), usina_id or 0, dtype=np.int64),
+            )
+        db.execute(delete(d).where(d.id.in_(ids)))
+        db.commit()
+        movidas += len(linhas)
+    return movidas
+
+
+def arquivar(db: Session, ate: Optional[datetime] = None, lote: int = retencao.COMPACTACAO_LOTE) -> dict:
+    """
+    Arquiva todos os meses fechados antes de `ate` (padrão: início do mês
+    corrente, em UTC), `lote` linhas por vez. Retorna um resumo.
+    """
+    _exigir_pyarrow()
+    ate = _inicio_mes(consultas.normalizar_data(ate) or datetime.utcnow())
+    d = models.DadoEnergia
+    resumo = {"particoes_arquivadas": 0, "linhas_arquivadas": 0}
+    primeira = db.execute(select(func.min(d.timestamp))).scalar()
+    if primeira is None or primeira >= ate:
+        return resumo
+    for mes in _meses(primeira, ate):
+        fim = rollups.proximo_bucket("1mo", mes)
+        usinas = db.execute(
+            select(d.usina_id).where(d.timestamp >= mes, d.timestamp < fim).distinct()
+        ).scalars().all()
+        for usina_id in usinas:
+            resumo["linhas_arquivadas"] += arquivar_particao(db, usina_id, mes, lote)
+            resumo["particoes_arquivadas"] += 1
+    return resumo
+
+
+def _linhas_arquivadas_por_mes(usina_id: Optional[int]) -> dict:
+    """"AAAA-MM" -> linhas no arquivo, pelos metadados dos Parquet (sem ler os dados)."""
+    contagem = {}
+    if not ARQUIVO_DIR.is_dir():
+        return contagem
+    usina = "*" if usina_id is None else usina_id
+    for caminho in ARQUIVO_DIR.glob(f"usina_id={usina}/ano=*/mes=*/dados.parquet"):
+        chave = f"{caminho.parent.parent.name[4:]}-{caminho.parent.name[4:]}"
+        contagem[chave] = contagem.get(chave, 0) + pq.read_metadata(caminho).num_rows
+    return contagem
+
+
+def meses_incompletos(db: Session, inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                      usina_id: Optional[int] = None) -> list:
+    """
+    Meses ("AAAA-MM") do período com leituras que só existem no nível de 15
+    minutos: compactadas por versões antigas de retencao.py, que apagavam o
+    bruto sem arquivar. ler() e agregar() não as enxergam. Todo mês arquivado
+    dentro da retenção do nível de 15 minutos é somado a ele, então um mês
+    com mais leituras lá do que no arquivo perdeu dados brutos.
+    """
+    _exigir_pyarrow()
+    inicio, fim = consultas.normalizar_data(inicio), consultas.normalizar_data(fim)
+    t = rollups.TABELA_USINA_15M if usina_id is not None else rollups.TABELA_15M
+    mes = func.strftime("%Y-%m", t.bucket)
+    consulta = select(mes, func.sum(t.leituras)).group_by(mes)
+    if inicio is not None:
+        consulta = consulta.where(t.bucket >= _inicio_mes(inicio))
+    if fim is not None:
+        consulta = consulta.where(t.bucket < fim)
+    if usina_id is not None:
+        consulta = consulta.where(t.usina_id == usina_id)
+    compactadas = db.execute(consulta).all()
+    if not compactadas:
+        return []
+    arquivadas = _linhas_arquivadas_por_mes(usina_id)
+    return [chave for chave, leituras in compactadas if leituras > arquivadas.get(chave, 0)]
+
+
+def _filtro_arquivo(inicio, fim, usina_id, dispositivo_id):
+    filtro = ds.scalar(True)
+    if usina_id is not None:
+        filtro &= ds.field("usina_id") == usina_id
+    if dispositivo_id is not None:
+        filtro &= ds.field("dispositivo_id") == dispositivo_id
+    # ano/mes eliminam pastas inteiras; timestamp usa as estatísticas dos row groups
+    if inicio is not None:
+        filtro &= (ds.field("ano") > inicio.year) | (
+            (ds.field("ano") == inicio.year) & (ds.field("mes") >= inicio.month)
+        )
+        filtro &= ds.field("timestamp") >= pa.scalar(inicio, pa.timestamp("us"))
+    if fim is not None:
+        filtro &= (ds.field("ano") < fim.year) | (
+            (ds.field("ano") == fim.year) & (ds.field("mes") <= fim.month)
+        )
+        filtro &= ds.field("timestamp") < pa.scalar(fim, pa.timestamp("us"))
+    return filtro
+
+
+def _ler_arquivo(colunas, inicio, fim, usina_id, dispositivo_id):
+    if not ARQUIVO_DIR.is_dir():
+        return None
+    particionamento = ds.partitioning(
+        pa.schema([("usina_id", pa.int64()), ("ano", pa.int32()), ("mes", pa.int32())]), flavor="hive"
+    )
+    dataset = ds.dataset(ARQUIVO_DIR, format="parquet", partitioning=particionamento)
+    return dataset.to_table(columns=list(colunas),
+                            filter=_filtro_arquivo(inicio, fim, usina_id, dispositivo_id))
+
+
+def _ler_cauda(db: Session, colunas, inicio, fim, usina_id, dispositivo_id):
+    d = models.DadoEnergia
+    consulta = select(*(getattr(d, coluna) for coluna in colunas))
+    if inicio is not None:
+        consulta = consulta.where(d.timestamp >= inicio)
+    if fim is not None:
+        consulta = consulta.where(d.timestamp < fim)
+    if usina_id is not None:
+        consulta = consulta.where(d.usina_id == usina_id)
+    if dispositivo_id is not None:
+        consulta = consulta.where(d.dispositivo_id == dispositivo_id)
+    linhas = db.execute(consulta).all()
+    valores = list(zip(*linhas)) if linhas else [()] * len(colunas)
+    tipos = {c.name: c.type for c in _esquema()}
+    tipos["usina_id"] = pa.int64()
+    return pa.table({
+        coluna: pa.array(
+            # Como no arquivo, "sem usina" é 0
+            [v or 0 for v in serie] if coluna == "usina_id" else serie, type=tipos[coluna]
+        )
+        for coluna, serie in zip(colunas, valores)
+    })
+
+
+def ler(db: Session, inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+        usina_id: Optional[int] = None, dispositivo_id: Optional[int] = None,
+        colunas: Sequence[str] = COLUNAS, ordenar: bool = True):
+    """
+    Leituras em [inicio, fim) como uma tabela Arrow, juntando o arquivo frio
+    (só as colunas e partições necessárias) com a cauda ainda no SQLite.
+    """
+    _exigir_pyarrow()
+    inicio, fim = consultas.normalizar_data(inicio), consultas.normalizar_data(fim)
+    colunas = tuple(colunas)
+    partes = [
+        _ler_arquivo(colunas, inicio, fim, usina_id, dispositivo_id),
+        _ler_cauda(db, colunas, inicio, fim, usina_id, dispositivo_id),
+    ]
+    tabela = pa.concat_tables([parte for parte in partes if parte is not None])
+    if ordenar and "timestamp" in colunas:
+        chaves = [("timestamp", "ascending")] + ([("id", "ascending")] if "id" in colunas else [])
+        tabela = tabela.sort_by(chaves)
+    return tabela
+
+
+# Unidade do pc.floor_temporal para cada bucket de consultas.BUCKETS
+UNIDADES_BUCKET = {"15m": (15, "minute"), "1h": (1, "hour"), "1d": (1, "day"), "1mo": (1, "month")}
+
+
+def agregar(db: Session, bucket: str, inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+            usina_id: Optional[int] = None, dispositivo_id: Optional[int] = None) -> dict:
+    """
+    Mesmas colunas de consultas.consulta_agregada, calculadas sobre ler():
+    vale para qualquer período, usina ou dispositivo, inclusive os já
+    arquivados. Retorna as colunas como listas.
+    """
+    tabela = ler(db, inicio, fim, usina_id, dispositivo_id,
+                 colunas=("timestamp", "gerado_kwh", "consumido_kwh"), ordenar=False)
+    multiplo, unidade = UNIDADES_BUCKET[bucket]
+    tabela = tabela.append_column(
+        "bucket", pc.floor_temporal(tabela["timestamp"], multiple=multiplo, unit=unidade)
+    )
+    agregados = tabela.group_by("bucket").aggregate([
+        ("gerado_kwh", "count"),
+        ("gerado_kwh", "sum"), ("gerado_kwh", "min"), ("gerado_kwh", "max"), ("gerado_kwh", "mean"),
+        ("consumido_kwh", "sum"), ("consumido_kwh", "min"), ("consumido_kwh", "max"), ("consumido_kwh", "mean"),
+    ]).sort_by("bucket")
+    gerado, consumido = agregados["gerado_kwh_sum"], agregados["consumido_kwh_sum"]
+    return {
+        "bucket": agregados["bucket"].to_pylist(),
+        "leituras": agregados["gerado_kwh_count"].to_pylist(),
+        "gerado_kwh_soma": gerado.to_pylist(),
+        "gerado_kwh_min": agregados["gerado_kwh_min"].to_pylist(),
+        "gerado_kwh_max": agregados["gerado_kwh_max"].to_pylist(),
+        "gerado_kwh_media": agregados["gerado_kwh_mean"].to_pylist(),
+        "consumido_kwh_soma": consumido.to_pylist(),
+        "consumido_kwh_min": agregados["consumido_kwh_min"].to_pylist(),
+        "consumido_kwh_max": agregados["consumido_kwh_max"].to_pylist(),
+        "consumido_kwh_media": agregados["consumido_kwh_mean"].to_pylist(),
+        "excedente_kwh": pc.subtract(gerado, consumido).to_pylist(),
+    }
+
+
+if __name__ == "__main__":
+    import database
+    import migracoes
+
+    parser = argparse.ArgumentParser(description="Arquivo frio em Parquet")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    cmd = sub.add_parser("arquivar", help="Move os meses fechados para o Parquet")
+    cmd.add_argument("--ate", type=datetime.fromisoformat, default=None,
+                     help="Arquiva os meses anteriores a esta data (padrão: mês corrente)")
+    args = parser.parse_args()
+
+    migracoes.verificar(database.engine)
+    sessao = database.SessionLocal()
+    try:
+        print(arquivar(sessao, args.ate))
+    finally:
+        sessao.close()
@@ -1,12 +1,58 @@
-from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import delete, or_, select
+
+import models
 
 SECRET_KEY = "chave-super-secreta"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Cache de tokens já verificados (token -> sub), limitado em tamanho e tempo
+TOKEN_CACHE_MAX = int(os.getenv("TOKEN_CACHE_MAX", "1024"))
+TOKEN_CACHE_TTL_S = int(os.getenv("TOKEN_CACHE_TTL_S", "300"))
+
+# Logout vale na hora no processo que o recebe e fica gravado em
+# tokens_revogados; os outros workers releem a tabela a cada
+# TOKEN_REVOGACAO_SYNC_S segundos, então neles o token revogado ainda passa
+# por no máximo esse tempo (0 desliga a releitura: só para um único processo)
+TOKEN_REVOGACAO_SYNC_S = float(os.getenv("TOKEN_REVOGACAO_SYNC_S", "5"))
+
+# Custo do bcrypt e pool dedicado: login/cadastro não ocupam o threadpool das rotas
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+HASH_FILA_MAX = int(os.getenv("HASH_FILA_MAX", "32"))
+
+# Tentativas de login permitidas por janela, por conta e por IP. O limite por
+# conta é o que barra força bruta; o por IP só contém varreduras de muitas
+# contas e é folgado porque uma equipe inteira pode sair pelo mesmo NAT na
+# troca de turno. Ajuste com LOGIN_MAX_POR_IP (0 desliga). Atrás de proxy
+# reverso, suba o uvicorn com --proxy-headers e --forwarded-allow-ips, senão
+# todo login conta para o IP do proxy.
+LOGIN_JANELA_S = int(os.getenv("LOGIN_JANELA_S", "60"))
+LOGIN_MAX_POR_CONTA = int(os.getenv("LOGIN_MAX_POR_CONTA", "5"))
+LOGIN_MAX_POR_IP = int(os.getenv("LOGIN_MAX_POR_IP", "300"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_pool_hash = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+_vagas_hash = threading.BoundedSemaphore(HASH_WORKERS + HASH_FILA_MAX)
+_latencias_hash = deque(maxlen=1000)  # segundos, últimas operações
+_lock_hash = threading.Lock()
+_estatisticas_hash = {"operacoes": 0, "recusadas": 0, "em_andamento": 0}
+
+_cache_tokens = OrderedDict()  # token -> (sub, válido até [epoch])
+_tokens_revogados = {}         # sha256 do token -> exp [epoch], para poder descartar depois
+_lock_tokens = threading.Lock()
+_estatisticas_tokens = {"acertos": 0, "falhas": 0, "rejeitados": 0}
 
 def gerar_hash_senha(senha):
     return pwd_context.hash(senha)
@@ -14,6 +60,87 @@ def gerar_hash_senha(senha):
 def verificar_senha(senha_plain, senha_hash):
     return pwd_context.verify(senha_plain, senha_hash)
 
+class PoolHashOcupado(Exception):
+    """Todas as vagas do pool de hash estão ocupadas."""
+
+def _no_pool_hash(funcao, *args) -> Future:
+    if not _vagas_hash.acquire(blocking=False):
+        with _lock_hash:
+            _estatisticas_hash["recusadas"] += 1
+        raise PoolHashOcupado()
+
+    def tarefa():
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args)
+        finally:
+            with _lock_hash:
+                _latencias_hash.append(time.perf_counter() - inicio)
+                _estatisticas_hash["operacoes"] += 1
+
+    with _lock_hash:
+        _estatisticas_hash["em_andamento"] += 1
+    futuro = _pool_hash.submit(tarefa)
+    futuro.add_done_callback(_liberar_vaga_hash)
+    return futuro
+
+def _liberar_vaga_hash(_futuro):
+    with _lock_hash:
+        _estatisticas_hash["em_andamento"] -= 1
+    _vagas_hash.release()
+
+async def gerar_hash_senha_async(senha):
+    return await asyncio.wrap_future(_no_pool_hash(gerar_hash_senha, senha))
+
+async def verificar_senha_async(senha_plain, senha_hash):
+    return await asyncio.wrap_future(_no_pool_hash(verificar_senha, senha_plain, senha_hash))
+
+def estatisticas_hash():
+    with _lock_hash:
+        latencias = sorted(_latencias_hash)
+        estatisticas = dict(_estatisticas_hash)
+    if latencias:
+        def p(q):
+            return latencias[min(len(latencias) - 1, int(len(latencias) * q))] * 1000
+        estatisticas.update(p50_ms=p(0.50), p95_ms=p(0.95), p99_ms=p(0.99), max_ms=latencias[-1] * 1000)
+    return estatisticas
+
+class LimitadorTentativas:
+    """Janela deslizante: no máximo `limite` eventos por chave a cada `janela_s` (0 = sem limite)."""
+
+    def __init__(self, limite: int, janela_s: float, max_chaves: int = 10000):
+        self.limite = limite
+        self.janela_s = janela_s
+        self.max_chaves = max_chaves
+        self._eventos = {}
+        self._lock = threading.Lock()
+
+    def permitir(self, chave: str) -> bool:
+        if self.limite <= 0:
+            return True
+        agora = time.monotonic()
+        limite_antigo = agora - self.janela_s
+        with self._lock:
+            eventos = self._eventos.get(chave)
+            if eventos is None:
+                if len(self._eventos) >= self.max_chaves:
+                    self._descartar_antigos(limite_antigo)
+                eventos = self._eventos[chave] = deque()
+            while eventos and eventos[0] <= limite_antigo:
+                eventos.popleft()
+            if len(eventos) >= self.limite:
+                return False
+            eventos.append(agora)
+            return True
+
+    def _descartar_antigos(self, limite_antigo: float):
+        for chave, eventos in list(self._eventos.items()):
+            if not eventos or eventos[-1] <= limite_antigo:
+                del self._eventos[chave]
+
+limite_login_conta = LimitadorTentativas(LOGIN_MAX_POR_CONTA, LOGIN_JANELA_S)
+limite_login_ip = LimitadorTentativas(LOGIN_MAX_POR_IP, LOGIN_JANELA_S)
+
 def criar_token(dados: dict, expira_em: int = ACCESS_TOKEN_EXPIRE_MINUTES):
     to_encode = dados.copy()
     expire = datetime.utcnow() + timedelta(minutes=expira_em)
@@ -21,8 +148,155 @@ def criar_token(dados: dict, expira_em: int = ACCESS_TOKEN_EXPIRE_MINUTES):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def verificar_token(token: str):
+    """
+    Retorna o `sub` do token ou None. Tokens válidos ficam em cache até o
+    menor entre o `exp` do token e TOKEN_CACHE_TTL_S, evitando refazer a
+    verificação de assinatura a cada requisição dos dashboards.
+    """
+    agora = time.time()
+    chave = hash_token(token)
+    with _lock_tokens:
+        if chave in _tokens_revogados:
+            _estatisticas_tokens["rejeitados"] += 1
+            return None
+        item = _cache_tokens.get(token)
+        if item is not None:
+            sub, valido_ate = item
+            if valido_ate > agora:
+                _cache_tokens.move_to_end(token)
+                _estatisticas_tokens["acertos"] += 1
+                return sub
+            del _cache_tokens[token]
+        _estatisticas_tokens["falhas"] += 1
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+    sub = payload.get("sub")
+    if sub is None:
+        return None
+
+    valido_ate = agora + TOKEN_CACHE_TTL_S
+    if payload.get("exp") is not None:
+        valido_ate = min(valido_ate, float(payload["exp"]))
+    with _lock_tokens:
+        # Pode ter sido revogado enquanto a assinatura era verificada
+        if chave not in _tokens_revogados:
+            _cache_tokens[token] = (sub, valido_ate)
+            _cache_tokens.move_to_end(token)
+            while len(_cache_tokens) > TOKEN_CACHE_MAX:
+                _cache_tokens.popitem(last=False)
+    return sub
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def revogar_token(token: str):
+    """
+    Invalida o token imediatamente neste processo e devolve (hash, exp) para
+    SincronizadorRevogacoes.persistir levar aos outros workers; None se o
+    token nem é um JWT.
+    """
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return None
+    chave = hash_token(token)
+    expira = float(exp) if exp is not None else float("inf")
+    with _lock_tokens:
+        _cache_tokens.pop(token, None)
+        _registrar_revogados({chave: expira})
+    return chave, expira
+
+def _registrar_revogados(revogados: dict):
+    # Chamado com _lock_tokens; tokens revogados só precisam ser lembrados até expirarem
+    agora = time.time()
+    for revogado, expira in list(_tokens_revogados.items()):
+        if expira <= agora:
+            del _tokens_revogados[revogado]
+    _tokens_revogados.update(revogados)
+
+class SincronizadorRevogacoes:
+    """
+    Compartilha as revogações entre processos pela tabela tokens_revogados:
+    persistir() grava a revogação feita aqui e sincronizar() traz as dos
+    outros workers, chamado ao iniciar e a cada `intervalo_s` em uma thread.
+    """
+
+    def __init__(self, session_factory, intervalo_s: float = TOKEN_REVOGACAO_SYNC_S):
+        self._session_factory = session_factory
+        self.intervalo = intervalo_s
+        self._parar = threading.Event()
+        self._thread = None
+        self.ultimo_erro = None
+
+    def persistir(self, token_hash: str, expira: float):
+        expira_em = None if expira == float("inf") else \
+            datetime.fromtimestamp(expira, timezone.utc).replace(tzinfo=None)
+        t = models.TokenRevogado
+        db = self._session_factory()
+        try:
+            db.merge(t(token_hash=token_hash, expira_em=expira_em, revogado_em=datetime.utcnow()))
+            # Linhas de tokens já expirados não barram mais nada
+            db.execute(delete(t).where(t.expira_em <= datetime.utcnow()))
+            db.commit()
+        finally:
+            db.close()
+
+    def sincronizar(self) -> int:
+        """Carrega as revogações ainda em vigor; devolve quantas há no banco."""
+        t = models.TokenRevogado
+        db = self._session_factory()
+        try:
+            linhas = db.execute(
+                select(t.token_hash, t.expira_em).where(or_(t.expira_em.is_(None), t.expira_em > datetime.utcnow()))
+            ).all()
+        finally:
+            db.close()
+        revogados = {
+            token_hash: float("inf") if expira_em is None else expira_em.replace(tzinfo=timezone.utc).timestamp()
+            for token_hash, expira_em in linhas
+        }
+        with _lock_tokens:
+            _registrar_revogados(revogados)
+        return len(revogados)
+
+    def iniciar(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._sincronizar_com_erro()
+        if self.intervalo <= 0:
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="revogacoes", daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout: float = 10.0):
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._parar.set()
+        thread.join(timeout)
+
+    def _sincronizar_com_erro(self):
+        try:
+            self.sincronizar()
+            self.ultimo_erro = None
+        except Exception as erro:
+            self.ultimo_erro = {"erro": str(erro), "em": datetime.utcnow().isoformat()}
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            self._sincronizar_com_erro()
+
+def estatisticas_cache_tokens():
+    with _lock_tokens:
+        acertos = _estatisticas_tokens["acertos"]
+        consultas = acertos + _estatisticas_tokens["falhas"]
+        return {
+            **_estatisticas_tokens,
+            "taxa_acerto": acertos / consultas if consultas else 0.0,
+            "tamanho": len(_cache_tokens),
+            "revogados": len(_tokens_revogados),
+        }
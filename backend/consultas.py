@@ -0,0 +1,115 @@
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import Integer, and_, cast, func, or_, select
+
+import models
+
+# Colunas expostas pelo GET /dados (lidas como tuplas, sem objetos ORM)
+COLUNAS_DADOS = (
+    models.DadoEnergia.id,
+    models.DadoEnergia.timestamp,
+    models.DadoEnergia.gerado_kwh,
+    models.DadoEnergia.consumido_kwh,
+)
+
+
+def normalizar_data(data: Optional[datetime]) -> Optional[datetime]:
+    # O banco guarda UTC sem fuso; datas com fuso são convertidas para UTC
+    if data is not None and data.tzinfo is not None:
+        return data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+
+def codificar_cursor(timestamp: datetime, id_: int) -> str:
+    return f"{timestamp.isoformat()}|{id_}"
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Converte o cursor "timestamp|id" de volta; levanta ValueError se inválido."""
+    timestamp, id_ = cursor.rsplit("|", 1)
+    return datetime.fromisoformat(timestamp), int(id_)
+
+
+def consulta_dados(inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                   apos: Optional[Tuple[datetime, int]] = None, limite: Optional[int] = None,
+                   usina_id: Optional[int] = None, dispositivo_id: Optional[int] = None):
+    """
+    Monta o SELECT das leituras em ordem de (timestamp, id), no intervalo
+    [inicio, fim), continuando depois da chave `apos` (paginação keyset).
+    Com `usina_id` a busca usa o índice (usina_id, timestamp, id) e lê só as
+    linhas da usina; `dispositivo_id` restringe a um dispositivo.
+    """
+    ts = models.DadoEnergia.timestamp
+    consulta = select(*COLUNAS_DADOS).order_by(ts, models.DadoEnergia.id)
+    if usina_id is not None:
+        consulta = consulta.where(models.DadoEnergia.usina_id == usina_id)
+    if dispositivo_id is not None:
+        consulta = consulta.where(models.DadoEnergia.dispositivo_id == dispositivo_id)
+    if inicio is not None:
+        consulta = consulta.where(ts >= normalizar_data(inicio))
+    if fim is not None:
+        consulta = consulta.where(ts < normalizar_data(fim))
+    if apos is not None:
+        ts_apos, id_apos = apos
+        # "ts >= x" mantém a busca por faixa no índice (timestamp, id)
+        consulta = consulta.where(
+            ts >= ts_apos,
+            or_(ts > ts_apos, and_(ts == ts_apos, models.DadoEnergia.id > id_apos)),
+        )
+    if limite is not None:
+        consulta = consulta.limit(limite)
+    return consulta
+
+
+# Granularidades aceitas por GET /dados/agregado
+BUCKETS = ("15m", "1h", "1d", "1mo")
+
+
+def expressao_bucket(bucket: str, ts=None):
+    """
+    Expressão SQL (SQLite) que trunca o timestamp para o início do bucket
+    (por padrão DadoEnergia.timestamp; `ts` permite outra coluna de data).
+    """
+    if ts is None:
+        ts = models.DadoEnergia.timestamp
+    if bucket == "15m":
+        segundos = cast(func.strftime("%s", ts), Integer)
+        return func.datetime((segundos // 900) * 900, "unixepoch")
+    formato = {"1h": "%Y-%m-%d %H:00:00", "1d": "%Y-%m-%d 00:00:00", "1mo": "%Y-%m-01 00:00:00"}[bucket]
+    return func.strftime(formato, ts)
+
+
+def consulta_agregada(bucket: str, inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                      usina_id: Optional[int] = None, por_usina: bool = False):
+    """
+    Soma, mínimo, máximo e média de geração/consumo por bucket de tempo,
+    calculados no próprio banco (GROUP BY) sobre o índice de timestamp.
+    `usina_id` filtra uma usina; `por_usina` agrupa por (usina_id, bucket),
+    ignorando leituras sem usina.
+    """
+    d = models.DadoEnergia
+    inicio_bucket = expressao_bucket(bucket).label("bucket")
+    grupos = (d.usina_id, inicio_bucket) if por_usina else (inicio_bucket,)
+    consulta = select(
+        *grupos,
+        func.count().label("leituras"),
+        func.sum(d.gerado_kwh).label("gerado_kwh_soma"),
+        func.min(d.gerado_kwh).label("gerado_kwh_min"),
+        func.max(d.gerado_kwh).label("gerado_kwh_max"),
+        func.avg(d.gerado_kwh).label("gerado_kwh_media"),
+        func.sum(d.consumido_kwh).label("consumido_kwh_soma"),
+        func.min(d.consumido_kwh).label("consumido_kwh_min"),
+        func.max(d.consumido_kwh).label("consumido_kwh_max"),
+        func.avg(d.consumido_kwh).label("consumido_kwh_media"),
+        func.sum(d.gerado_kwh - d.consumido_kwh).label("excedente_kwh"),
+    )
+    if inicio is not None:
+        consulta = consulta.where(d.timestamp >= normalizar_data(inicio))
+    if fim is not None:
+        consulta = consulta.where(d.timestamp < normalizar_data(fim))
+    if usina_id is not None:
+        consulta = consulta.where(d.usina_id == usina_id)
+    if por_usina:
+        consulta = consulta.where(d.usina_id.is_not(None))
+    return consulta.group_by(*grupos).order_by(*grupos)
@@ -1,9 +1,108 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-DATABASE_URL = "sqlite:///./dados.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dados.db")
+
+class BancoNaoSuportado(RuntimeError):
+    """A URL do banco não é SQLite."""
+
+def eh_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def exigir_sqlite(url: str, variavel: str):
+    # O SQL do backend é do SQLite: upsert com o insert do dialeto sqlite
+    # (ingestao.py, rollups.py), buckets com strftime/unixepoch (consultas.py,
+    # arquivo.py), PRAGMAs e rowid (retencao.py). Outro banco só falharia na
+    # primeira escrita ou agregação, então é recusado já na subida
+    if not eh_sqlite(url):
+        raise BancoNaoSuportado(
+            f"{variavel}: só SQLite é suportado (recebido {make_url(url).get_backend_name()!r})"
+        )
+
+exigir_sqlite(DATABASE_URL, "DATABASE_URL")
+
+def url_assincrona(url: str) -> str:
+    # Mesmo arquivo, pelo driver assíncrono do SQLite
+    return make_url(url).set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", url_assincrona(DATABASE_URL))
+exigir_sqlite(ASYNC_DATABASE_URL, "ASYNC_DATABASE_URL")
+
+# --- PERFIL DE ARMAZENAMENTO (SQLite) ---
+# "padrao" mantém o comportamento original (journal de rollback, sem PRAGMAs).
+# "producao" liga WAL, para que leituras longas não bloqueiem a ingestão, e
+# separa o engine de escrita (uma conexão) do engine de leitura.
+PERFIS_SQLITE = {
+    "padrao": {},
+    "producao": {
+        # Só vale para bancos novos; um banco existente precisa de um VACUUM
+        # completo para mudar (python retencao.py vacuum-completo)
+        "auto_vacuum": "INCREMENTAL",
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,        # em KiB (64 MiB)
+        "mmap_size": 268435456,      # 256 MiB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
+PERFIL_ARMAZENAMENTO = os.getenv("PERFIL_ARMAZENAMENTO", "padrao")
+
+def pragmas_do_perfil(perfil: str = PERFIL_ARMAZENAMENTO) -> dict:
+    """PRAGMAs do perfil, com ajustes em SQLITE_PRAGMAS="cache_size=-131072,mmap_size=0"."""
+    pragmas = dict(PERFIS_SQLITE[perfil])
+    for item in filter(None, os.getenv("SQLITE_PRAGMAS", "").split(",")):
+        nome, valor = item.split("=", 1)
+        pragmas[nome.strip()] = valor.strip()
+    return pragmas
+
+PRAGMAS = pragmas_do_perfil()
+
+def argumentos_conexao(url: str) -> dict:
+    # check_same_thread só existe no driver do SQLite
+    if eh_sqlite(url):
+        return {"check_same_thread": False}
+    return {}
+
+def aplicar_pragmas(engine, pragmas: dict):
+    @event.listens_for(engine, "connect")
+    def _ao_conectar(conexao_dbapi, _registro):
+        cursor = conexao_dbapi.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nome}={valor}")
+        cursor.close()
+
+def criar_engine(url: str, somente_leitura: bool = False, **opcoes):
+    engine = create_engine(url, connect_args=argumentos_conexao(url), **opcoes)
+    if eh_sqlite(url) and PRAGMAS:
+        aplicar_pragmas(engine, {**PRAGMAS, "query_only": "ON"} if somente_leitura else PRAGMAS)
+    return engine
+
+# Com WAL há um único escritor por vez; o pool de uma conexão enfileira as
+# escritas no próprio processo em vez de disputar o lock do arquivo.
+USA_WAL = eh_sqlite(DATABASE_URL) and str(PRAGMAS.get("journal_mode", "")).upper() == "WAL"
+
+if USA_WAL:
+    engine = criar_engine(DATABASE_URL, pool_size=1, max_overflow=0)
+    engine_leitura = criar_engine(DATABASE_URL, somente_leitura=True)
+else:
+    engine = criar_engine(DATABASE_URL)
+    engine_leitura = engine
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLeitura = sessionmaker(autocommit=False, autoflush=False, bind=engine_leitura)
 Base = declarative_base()
+
+# O engine assíncrono só lê: as rotas async gravam pelo engine de escrita
+# acima (em run_in_threadpool), para que com WAL continue havendo um único
+# escritor no processo; query_only faz uma escrita esquecida falhar na hora.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=argumentos_conexao(ASYNC_DATABASE_URL))
+if eh_sqlite(ASYNC_DATABASE_URL) and PRAGMAS:
+    aplicar_pragmas(async_engine.sync_engine, {**PRAGMAS, "query_only": "ON"} if USA_WAL else PRAGMAS)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
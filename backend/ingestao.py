@@ -0,0 +1,386 @@
+import math
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+import consultas
+import metricas
+import models
+import rollups
+
+# Parâmetros do group commit (podem ser ajustados por variável de ambiente)
+LOTE_MAX_LINHAS = int(os.getenv("INGESTAO_LOTE_MAX", "500"))
+INTERVALO_MS = int(os.getenv("INGESTAO_INTERVALO_MS", "50"))
+FILA_MAX = int(os.getenv("INGESTAO_FILA_MAX", "10000"))
+
+# Funções chamadas após cada commit com (colunas do lote, deltas dos rollups)
+ouvintes = []
+
+# Registro do formato binário (POST /dados/binario), little-endian, 20 bytes:
+# timestamp (float64, segundos Unix UTC), id do dispositivo (uint32),
+# gerado_kwh e consumido_kwh (float32)
+DTYPE_REGISTRO = np.dtype([
+    ("timestamp", "<f8"),
+    ("dispositivo_id", "<u4"),
+    ("gerado_kwh", "<f4"),
+    ("consumido_kwh", "<f4"),
+])
+
+
+# Tempo (s) que o mapa dispositivo -> usina confia no que leu: um dispositivo
+# apagado ou movido de usina fora deste processo (outro worker, SQL direto)
+# volta a ser lido do banco depois dele
+CACHE_DISPOSITIVOS_TTL_S = int(os.getenv("CACHE_DISPOSITIVOS_TTL_S", "300"))
+
+# dispositivo_id -> (usina_id, válido até [monotonic]) dos dispositivos já
+# vistos; dispositivos desconhecidos não entram
+_usinas_por_dispositivo = {}
+
+
+def esquecer_dispositivos(*dispositivos):
+    """Tira os dispositivos do mapa (sem argumentos, todos); chamada quando o cadastro muda."""
+    if not dispositivos:
+        _usinas_por_dispositivo.clear()
+    for dispositivo in dispositivos:
+        _usinas_por_dispositivo.pop(dispositivo, None)
+
+
+def usinas_dos_dispositivos(db: Session, dispositivos) -> dict:
+    """usina_id de cada dispositivo cadastrado; os não cadastrados ficam de fora."""
+    agora = time.monotonic()
+    usinas = {}
+    for dispositivo in set(dispositivos):
+        item = _usinas_por_dispositivo.get(dispositivo)
+        if item is not None and item[1] > agora:
+            usinas[dispositivo] = item[0]
+    faltando = sorted(set(dispositivos) - usinas.keys())
+    valido_ate = agora + CACHE_DISPOSITIVOS_TTL_S
+    for i in range(0, len(faltando), 500):
+        consulta = select(models.Dispositivo.id, models.Dispositivo.usina_id).where(
+            models.Dispositivo.id.in_(faltando[i:i + 500])
+        )
+        for linha in db.execute(consulta):
+            usinas[linha.id] = linha.usina_id
+            _usinas_por_dispositivo[linha.id] = (linha.usina_id, valido_ate)
+    return usinas
+
+
+def validar_leitura(leitura: dict) -> dict:
+    """
+    Confere uma leitura antes de aceitá-la. Levanta ValueError se ela não
+    puder ser gravada (valor ausente ou não finito: NaN viraria NULL nas
+    somas dos rollups e derrubaria a transação do lote inteiro) ou se tiver
+    dispositivo_id sem timestamp: todas as leituras sem hora de um lote
+    receberiam o mesmo instante e colidiriam na chave de idempotência.
+    """
+    for campo in ("gerado_kwh", "consumido_kwh"):
+        valor = leitura.get(campo)
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+            raise ValueError(f"{campo} deve ser um número finito")
+    if leitura.get("dispositivo_id") is not None and leitura.get("timestamp") is None:
+        raise ValueError("timestamp é obrigatório quando dispositivo_id é informado")
+    return leitura
+
+
+def _chaves_existentes(db: Session, dispositivos, ts_min: datetime, ts_max: datetime) -> set:
+    """(dispositivo_id, timestamp) já gravados para esses dispositivos no intervalo."""
+    d = models.DadoEnergia
+    dispositivos = sorted(dispositivos)
+    existentes = set()
+    # Em blocos, para não estourar o limite de parâmetros do SQLite
+    for i in range(0, len(dispositivos), 500):
+        consulta = select(d.dispositivo_id, d.timestamp).where(
+            d.dispositivo_id.in_(dispositivos[i:i + 500]),
+            d.timestamp >= ts_min,
+            d.timestamp <= ts_max,
+        )
+        existentes.update((linha.dispositivo_id, linha.timestamp) for linha in db.execute(consulta))
+    return existentes
+
+
+def _confirmar(db: Session, origem: str, linhas: int):
+    """Commit do lote, medindo a latência e contando as linhas gravadas."""
+    inicio = time.perf_counter()
+    db.commit()
+    metricas.duracao_commit.observar(time.perf_counter() - inicio, origem)
+    metricas.linhas_ingeridas.inc(linhas, origem)
+
+
+def _notificar(colunas: dict, deltas: dict):
+    for ouvinte in ouvintes:
+        ouvinte(colunas, deltas)
+
+
+def inserir_lote(db: Session, leituras: list) -> int:
+    """
+    Grava um lote de leituras em uma única transação, com um só INSERT
+    executemany (sem criar objetos ORM por linha), atualizando os rollups
+    na mesma transação.
+
+    Leituras com dispositivo_id são idempotentes por (dispositivo_id,
+    timestamp) e precisam trazer o timestamp (ver validar_leitura); as sem
+    dispositivo recebem a hora do servidor. Repetições dentro do lote e
+    chaves já gravadas são descartadas antes do INSERT (vale a primeira
+    gravação). A usina de cada
+    leitura vem do cadastro do dispositivo; leituras de dispositivos não
+    cadastrados são gravadas sem usina. Retorna quantas linhas foram de
+    fato inseridas.
+    """
+    if not leituras:
+        return 0
+    agora = datetime.utcnow()
+    linhas, vistos = [], set()
+    for leitura in leituras:
+        dispositivo = leitura.get("dispositivo_id")
+        timestamp = consultas.normalizar_data(leitura.get("timestamp")) or agora
+        if dispositivo is not None:
+            chave = (dispositivo, timestamp)
+            if chave in vistos:
+                continue
+            vistos.add(chave)
+        linhas.append({
+            "dispositivo_id": dispositivo,
+            "usina_id": None,
+            "timestamp": timestamp,
+            "gerado_kwh": leitura["gerado_kwh"],
+            "consumido_kwh": leitura["consumido_kwh"],
+        })
+
+    if vistos:
+        instantes = [timestamp for _, timestamp in vistos]
+        existentes = _chaves_existentes(db, {d for d, _ in vistos}, min(instantes), max(instantes))
+        if existentes:
+            linhas = [l for l in linhas if (l["dispositivo_id"], l["timestamp"]) not in existentes]
+    if not linhas:
+        db.commit()
+        return 0
+    if vistos:
+        usinas = usinas_dos_dispositivos(db, {d for d, _ in vistos})
+        for linha in linhas:
+            linha["usina_id"] = usinas.get(linha["dispositivo_id"])
+
+    # ON CONFLICT DO NOTHING só cobre uma corrida com outra transação
+    db.execute(insert(models.DadoEnergia).on_conflict_do_nothing(), linhas)
+    deltas = rollups.atualizar_rollups(db, linhas)
+    _confirmar(db, "json", len(linhas))
+    if ouvintes:
+        _notificar({
+            chave: [linha[chave] for linha in linhas]
+            for chave in ("dispositivo_id", "usina_id", "timestamp", "gerado_kwh", "consumido_kwh")
+        }, deltas)
+    return len(linhas)
+
+
+def decodificar_binario(corpo: bytes) -> np.ndarray:
+    """
+    Interpreta o corpo como registros DTYPE_REGISTRO sem copiar os dados.
+    Levanta ValueError se o tamanho não for múltiplo do registro ou se houver
+    valores não finitos.
+    """
+    if len(corpo) % DTYPE_REGISTRO.itemsize:
+        raise ValueError(f"Tamanho do corpo não é múltiplo de {DTYPE_REGISTRO.itemsize} bytes")
+    registros = np.frombuffer(corpo, dtype=DTYPE_REGISTRO)
+    for campo in ("timestamp", "gerado_kwh", "consumido_kwh"):
+        if not np.isfinite(registros[campo]).all():
+            raise ValueError(f"Valores não finitos em {campo}")
+    return registros
+
+
+def _filtrar_duplicados(db: Session, dispositivos: np.ndarray, timestamps: np.ndarray) -> np.ndarray:
+    """Máscara dos registros a gravar (mesma regra de inserir_lote, vetorizada)."""
+    manter = np.ones(len(dispositivos), dtype=bool)
+    com_dispositivo = np.flatnonzero(dispositivos > 0)
+    if com_dispositivo.size == 0:
+        return manter
+
+    chaves = np.empty(len(dispositivos), dtype=[("dispositivo", "<i8"), ("ts", "<i8")])
+    chaves["dispositivo"] = dispositivos
+    chaves["ts"] = timestamps.astype(np.int64)
+    # Dentro do lote: fica a primeira ocorrência de cada chave
+    _, primeiros = np.unique(chaves[com_dispositivo], return_index=True)
+    manter[com_dispositivo] = False
+    manter[com_dispositivo[primeiros]] = True
+
+    selecionados = timestamps[com_dispositivo]
+    existentes = _chaves_existentes(
+        db, np.unique(dispositivos[com_dispositivo]).tolist(),
+        selecionados.min().item(), selecionados.max().item(),
+    )
+    if existentes:
+        gravadas = np.array(
+            [(d, np.datetime64(t, "us").astype(np.int64)) for d, t in existentes], dtype=chaves.dtype
+        )
+        manter &= ~((dispositivos > 0) & np.isin(chaves, gravadas))
+    return manter
+
+
+def inserir_colunas(db: Session, registros: np.ndarray) -> int:
+    """
+    Grava registros decodificados de decodificar_binario. Os dados seguem
+    como colunas NumPy até o driver: as linhas são entregues ao executemany
+    do sqlite3 por um iterador, sem objetos ORM nem modelos pydantic.
+    dispositivo_id 0 significa "sem dispositivo" (sem deduplicação nem usina).
+    """
+    if len(registros) == 0:
+        return 0
+    timestamps = (registros["timestamp"] * 1e6).astype("datetime64[us]")
+    dispositivos = registros["dispositivo_id"].astype(np.int64)
+    manter = _filtrar_duplicados(db, dispositivos, timestamps)
+    if not manter.all():
+        timestamps, dispositivos, registros = timestamps[manter], dispositivos[manter], registros[manter]
+    if len(registros) == 0:
+        db.commit()
+        return 0
+    gerado = registros["gerado_kwh"].astype(np.float64)
+    consumido = registros["consumido_kwh"].astype(np.float64)
+    lista_dispositivos = [d or None for d in dispositivos.tolist()]
+    # usina_id por linha (0 = sem usina) a partir do mapa dos dispositivos únicos
+    unicos, posicao = np.unique(dispositivos, return_inverse=True)
+    mapa = usinas_dos_dispositivos(db, [d for d in unicos.tolist() if d])
+    usinas = np.array([mapa.get(d, 0) for d in unicos.tolist()], dtype=np.int64)[posicao]
+    lista_usinas = [u or None for u in usinas.tolist()]
+
+    # Mesmo formato de texto que o tipo DateTime do SQLAlchemy grava no SQLite
+    textos = np.char.replace(np.datetime_as_string(timestamps, unit="us"), "T", " ")
+    cursor = db.connection().connection.cursor()
+    cursor.executemany(
+        f"INSERT INTO {models.DadoEnergia.__tablename__} "
+        "(dispositivo_id, usina_id, timestamp, gerado_kwh, consumido_kwh) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT DO NOTHING",
+        zip(lista_dispositivos, lista_usinas, textos.tolist(), gerado.tolist(), consumido.tolist()),
+    )
+    cursor.close()
+    deltas = rollups.atualizar_rollups_colunas(db, timestamps, gerado, consumido, usinas)
+    _confirmar(db, "binario", len(registros))
+    if ouvintes:
+        _notificar({
+            "dispositivo_id": lista_dispositivos,
+            "usina_id": lista_usinas,
+            "timestamp": timestamps.tolist(),
+            "gerado_kwh": gerado.tolist(),
+            "consumido_kwh": consumido.tolist(),
+        }, deltas)
+    return len(registros)
+
+
+class FilaCheia(Exception):
+    """A fila de ingestão atingiu FILA_MAX; o cliente deve tentar novamente."""
+
+
+class BufferIngestao:
+    """
+    Acumula leituras avulsas e grava todas de uma vez (group commit) a cada
+    `max_linhas` leituras ou `intervalo_ms` milissegundos, o que vier antes.
+
+    Cada leitura enviada recebe um Future que é resolvido quando a transação
+    que a contém é confirmada, permitindo ao chamador esperar a durabilidade.
+    """
+
+    def __init__(self, session_factory, max_linhas: int = LOTE_MAX_LINHAS,
+                 intervalo_ms: int = INTERVALO_MS, max_fila: int = FILA_MAX):
+        self._session_factory = session_factory
+        self.max_linhas = max_linhas
+        self.intervalo = intervalo_ms / 1000
+        self._fila = queue.Queue(maxsize=max_fila)
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def profundidade(self) -> int:
+        return self._fila.qsize()
+
+    def iniciar(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(
+                target=self._executar, name="buffer-ingestao", daemon=True
+            )
+            self._thread.start()
+
+    def parar(self, timeout: float = 10.0):
+        """Sinaliza o encerramento e espera a fila ser totalmente gravada."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        self._parar.set()
+        thread.join(timeout)
+
+    def enviar(self, leitura: dict) -> Future:
+        # Valida antes de enfileirar: o que foi aceito (202) não pode ser recusado depois
+        validar_leitura(leitura)
+        if self._parar.is_set():
+            # Encerramento em andamento: não aceita novas leituras
+            raise FilaCheia()
+        if self._thread is None:
+            self.iniciar()
+        futuro = Future()
+        try:
+            self._fila.put_nowait((leitura, futuro))
+        except queue.Full:
+            raise FilaCheia()
+        return futuro
+
+    def _executar(self):
+        while True:
+            try:
+                primeiro = self._fila.get(timeout=0.1)
+            except queue.Empty:
+                if self._parar.is_set():
+                    return
+                continue
+
+            lote = [primeiro]
+            prazo = time.monotonic() + self.intervalo
+            while len(lote) < self.max_linhas:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._fila.get(timeout=restante))
+                except queue.Empty:
+                    break
+            self._gravar(lote)
+
+    def _gravar(self, lote: list):
+        db = self._session_factory()
+        try:
+            self._gravar_partes(db, lote)
+        finally:
+            db.close()
+
+    def _gravar_partes(self, db: Session, lote: list):
+        """
+        Grava o lote em uma transação. Se ela falhar por causa de alguma
+        linha, divide o lote ao meio e grava cada metade, até isolar as
+        leituras com problema: só os Futures delas recebem o erro. Falhas do
+        banco (OperationalError: travado, indisponível) valem para o lote
+        inteiro, sem repetir.
+        """
+        try:
+            inserir_lote(db, [leitura for leitura, _ in lote])
+        except Exception as erro:
+            db.rollback()
+            if len(lote) == 1 or isinstance(erro, OperationalError):
+                for _, futuro in lote:
+                    futuro.set_exception(erro)
+                return
+            meio = len(lote) // 2
+            self._gravar_partes(db, lote[:meio])
+            self._gravar_partes(db, lote[meio:])
+        else:
+            for _, futuro in lote:
+                futuro.set_result(None)
@@ -1,13 +1,106 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Header
+import asyncio
+import logging
+import math
+import time
+from concurrent.futures import TimeoutError as TempoEsgotado
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from fastapi import FastAPI, Depends, HTTPException, status, Header, Response, Query, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import database
 import models
+import arquivo
 import auth
-from pydantic import BaseModel
+import consultas
+import ingestao
+import metricas
+import migracoes
+import respostas
+import retencao
+import rollups
+import transmissao
+from pydantic import BaseModel, FiniteFloat, model_validator
+
+# Buffer de group commit usado pelo POST /dados
+buffer_ingestao = ingestao.BufferIngestao(database.SessionLocal)
+# Stream SSE de leituras novas e deltas de rollup
+difusor = transmissao.Difusor()
+ingestao.ouvintes.append(difusor.publicar_lote)
+# Compactação periódica dos níveis de retenção: só com COMPACTACAO_INTERVALO_MIN > 0,
+# que deve valer para um único processo (ou use python retencao.py compactar no cron);
+# com ARQUIVO_AUTOMATICO=1, arquiva antes os meses fechados em Parquet
+compactador = retencao.Compactador(
+    database.SessionLocal, etapas=[arquivo.arquivar] if arquivo.ARQUIVO_AUTOMATICO else []
+)
+# Revogações de logout gravadas no banco e relidas por todos os workers
+revogacoes = auth.SincronizadorRevogacoes(database.SessionLocal)
+
+# Métricas de GET /metrics: tempo de SQL por engine e gauges lidos na coleta
+metricas.instrumentar_engine(database.engine, "escrita")
+if database.engine_leitura is not database.engine:
+    metricas.instrumentar_engine(database.engine_leitura, "leitura")
+metricas.instrumentar_engine(database.async_engine.sync_engine, "async")
+metricas.registro.gauge(
+    "ingestao_fila_profundidade", "Leituras aguardando o group commit",
+    lambda: buffer_ingestao.profundidade,
+)
+metricas.registro.gauge(
+    "tempo_real_assinantes", "Clientes conectados em /dados/tempo-real",
+    lambda: difusor.total_assinantes,
+)
+metricas.registro.gauge(
+    "auth_cache_tokens_consultas_total", "Verificações de token pelo cache, por resultado",
+    lambda: {(chave,): valor for chave, valor in auth.estatisticas_cache_tokens().items()
+             if chave in ("acertos", "falhas", "rejeitados")},
+    rotulos=("resultado",), tipo="counter",
+)
+metricas.registro.gauge(
+    "auth_cache_tokens_taxa_acerto", "Fração das verificações de token atendidas pelo cache",
+    lambda: auth.estatisticas_cache_tokens()["taxa_acerto"],
+)
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    # O esquema é criado e alterado só por migracoes.py; aqui apenas conferimos
+    # a versão, sem DDL, para vários workers subirem juntos sem disputar o banco
+    migracoes.verificar(database.engine)
+    buffer_ingestao.iniciar()
+    compactador.iniciar()
+    revogacoes.iniciar()
+    yield
+    revogacoes.parar()
+    compactador.parar()
+    # Grava o que ainda estiver na fila antes de encerrar o processo
+    buffer_ingestao.parar()
+    await database.async_engine.dispose()
 
-models.Base.metadata.create_all(bind=database.engine)
+app = FastAPI(lifespan=ciclo_de_vida)
+# Comprime respostas maiores que 1 KiB quando o cliente envia Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+# Por último: fica por fora e mede a requisição inteira, inclusive a compressão
+app.add_middleware(metricas.MiddlewareMetricas)
 
-app = FastAPI()
+@app.exception_handler(RequestValidationError)
+async def erro_validacao(request: Request, erro: RequestValidationError):
+    # O 422 padrão repete a entrada de cada erro; NaN/Infinity recusados em
+    # DadoEntrada não são JSON válido e derrubariam a resposta com 500
+    detalhes = [
+        {**item, "input": str(item["input"])}
+        if isinstance(item.get("input"), float) and not math.isfinite(item["input"]) else item
+        for item in erro.errors()
+    ]
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(detalhes)})
 
 # ✅ ROTA RAIZ PARA EVITAR 404 AO ACESSAR "/"
 @app.get("/")
@@ -15,8 +108,20 @@ def root():
     return {"mensagem": "API Solar ativa!"}
 
 class DadoEntrada(BaseModel):
-    gerado_kwh: float
-    consumido_kwh: float
+    # NaN/Infinity do JSON são recusados com 422, como no POST /dados/binario
+    # (NaN viraria NULL nas somas dos rollups)
+    gerado_kwh: FiniteFloat
+    consumido_kwh: FiniteFloat
+    # Opcionais: com dispositivo_id a leitura é idempotente por (dispositivo, timestamp)
+    # e o timestamp da fonte é obrigatório
+    dispositivo_id: Optional[int] = None
+    timestamp: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def exigir_timestamp(self):
+        if self.dispositivo_id is not None and self.timestamp is None:
+            raise ValueError("timestamp é obrigatório quando dispositivo_id é informado")
+        return self
 
 def get_db():
     db = database.SessionLocal()
@@ -25,34 +130,565 @@ def get_db():
     finally:
         db.close()
 
+def get_db_leitura():
+    # Engine de leitura: no perfil "producao" (WAL) não disputa com a ingestão
+    db = database.SessionLeitura()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with database.AsyncSessionLocal() as db:
+        yield db
+
+# Tempo máximo que o POST /dados espera pela gravação do group commit
+TIMEOUT_GRAVACAO_S = 10
+log_ingestao = logging.getLogger("api.ingestao")
+
+def erro_gravacao(erro: Exception) -> HTTPException:
+    """503/504 para a leitura cujo commit não foi confirmado (nunca um 500 opaco)."""
+    if isinstance(erro, (TempoEsgotado, asyncio.TimeoutError)):
+        # A gravação pode ainda acontecer; com dispositivo_id o reenvio não duplica
+        return HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Gravação não confirmada no prazo, tente novamente",
+            headers={"Retry-After": "1"},
+        )
+    log_ingestao.warning("Falha no group commit: %s", erro)
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Banco indisponível para gravação, tente novamente",
+        headers={"Retry-After": "1"},
+    )
+
+def enfileirar(dado: DadoEntrada):
+    try:
+        return buffer_ingestao.enviar(dado.model_dump())
+    except ValueError as erro:
+        raise HTTPException(status_code=422, detail=str(erro))
+    except ingestao.FilaCheia:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Fila de ingestão cheia, tente novamente",
+            headers={"Retry-After": "1"},
+        )
+
 @app.post("/dados")
-def receber_dado(dado: DadoEntrada, db: Session = Depends(get_db)):
-    novo = models.DadoEnergia(**dado.dict())
-    db.add(novo)
-    db.commit()
+def receber_dado(dado: DadoEntrada, response: Response,
+                 modo: Literal["duravel", "aceito"] = "duravel"):
+    # "duravel": responde só depois do commit; "aceito": responde 202 ao enfileirar
+    futuro = enfileirar(dado)
+    if modo == "aceito":
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"mensagem": "Dado aceito para gravação"}
+    try:
+        futuro.result(timeout=TIMEOUT_GRAVACAO_S)
+    except (TempoEsgotado, SQLAlchemyError) as erro:
+        raise erro_gravacao(erro)
     return {"mensagem": "Dado registrado com sucesso"}
 
-@app.get("/dados")
-def listar_dados(authorization: str = Header(None), db: Session = Depends(get_db)):
-    token = authorization.split(" ")[1] if authorization else ""
+# Limite de leituras por requisição em /dados/lote
+LOTE_MAXIMO = 50000
+
+def validar_lote(dados: List[DadoEntrada]):
+    if len(dados) > LOTE_MAXIMO:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Lote excede o limite de {LOTE_MAXIMO} leituras",
+        )
+
+def resumo_lote(recebidos: int, inseridos: int, duracao: float):
+    return {
+        "mensagem": "Lote registrado com sucesso",
+        "inseridos": inseridos,
+        "duplicados": recebidos - inseridos,
+        "duracao_ms": round(duracao * 1000, 2),
+        "linhas_por_segundo": round(inseridos / duracao, 1) if duracao > 0 else None,
+    }
+
+@app.post("/dados/lote")
+def receber_lote(dados: List[DadoEntrada], db: Session = Depends(get_db)):
+    validar_lote(dados)
+    inicio = time.perf_counter()
+    inseridos = ingestao.inserir_lote(db, [dado.model_dump() for dado in dados])
+    return resumo_lote(len(dados), inseridos, time.perf_counter() - inicio)
+
+@app.post("/dados/binario")
+async def receber_binario(request: Request):
+    # Corpo: registros de 20 bytes (ver ingestao.DTYPE_REGISTRO), Content-Type
+    # application/octet-stream. Decodifica com np.frombuffer, sem JSON/pydantic.
+    corpo = await request.body()
+    if len(corpo) > LOTE_MAXIMO * ingestao.DTYPE_REGISTRO.itemsize:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Lote excede o limite de {LOTE_MAXIMO} leituras",
+        )
+    try:
+        registros = ingestao.decodificar_binario(corpo)
+    except ValueError as erro:
+        raise HTTPException(status_code=400, detail=str(erro))
+    return await run_in_threadpool(gravar_binario, registros)
+
+def gravar_binario(registros):
+    db = database.SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        inseridos = ingestao.inserir_colunas(db, registros)
+        return resumo_lote(len(registros), inseridos, time.perf_counter() - inicio)
+    finally:
+        db.close()
+
+# Tamanho de página padrão e máximo do GET /dados em JSON
+LIMITE_PADRAO = 1000
+LIMITE_MAXIMO = 10000
+# Linhas buscadas por vez do cursor no modo NDJSON
+LINHAS_POR_BUSCA = 1000
+
+def token_do_cabecalho(authorization: Optional[str]) -> str:
+    return authorization.split(" ")[1] if authorization else ""
+
+async def exigir_usuario(authorization: str = Header(None)):
+    # async: a verificação é rápida e assim não ocupa uma thread do threadpool
+    token = token_do_cabecalho(authorization)
     usuario = auth.verificar_token(token)
     if not usuario:
         raise HTTPException(status_code=401, detail="Token inválido")
-    return db.query(models.DadoEnergia).all()
+    return usuario
+
+def ler_cursor(cursor: Optional[str]):
+    try:
+        return consultas.decodificar_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def paginar(linhas, limite: int, formato: str):
+    # As linhas são tuplas (id, timestamp, gerado, consumido) serializadas direto
+    # pelo orjson, sem objetos ORM nem jsonable_encoder
+    conteudo = respostas.colunar(linhas) if formato == "colunar" else respostas.registros(linhas)
+    resposta = respostas.RespostaJSON(conteudo)
+    if len(linhas) == limite:
+        ultima = linhas[-1]
+        resposta.headers["X-Proximo-Cursor"] = consultas.codificar_cursor(ultima.timestamp, ultima.id)
+    return resposta
+
+def transmitir_ndjson(consulta):
+    # Sessão própria: a do Depends pode ser fechada antes do fim do streaming
+    db = database.SessionLeitura()
+    try:
+        resultado = db.execute(consulta.execution_options(yield_per=LINHAS_POR_BUSCA))
+        for linha in resultado:
+            yield respostas.linha_ndjson(linha)
+    finally:
+        db.close()
+
+def responder_dados(db: Session, inicio, fim, cursor, limite, formato, **filtros):
+    # Intervalo [inicio, fim). A próxima página vem no cabeçalho X-Proximo-Cursor.
+    # formato=colunar devolve {"timestamp": [...], "gerado_kwh": [...], ...}
+    apos = ler_cursor(cursor)
+
+    if formato == "ndjson":
+        consulta = consultas.consulta_dados(inicio, fim, apos, limite, **filtros)
+        return StreamingResponse(transmitir_ndjson(consulta), media_type="application/x-ndjson")
+
+    limite = min(limite or LIMITE_PADRAO, LIMITE_MAXIMO)
+    linhas = db.execute(consultas.consulta_dados(inicio, fim, apos, limite, **filtros)).all()
+    return paginar(linhas, limite, formato)
+
+@app.get("/dados")
+def listar_dados(
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limite: Optional[int] = Query(None, ge=1),
+    formato: Literal["json", "colunar", "ndjson"] = "json",
+    usuario: str = Depends(exigir_usuario),
+    db: Session = Depends(get_db_leitura),
+):
+    return responder_dados(db, inicio, fim, cursor, limite, formato)
+
+def formatar_bucket(bucket):
+    if isinstance(bucket, datetime):
+        return bucket.isoformat()
+    return bucket.replace(" ", "T")
+
+def resposta_agregado(resultado, formato: str, bucket: str):
+    chaves = tuple(resultado.keys())
+    linhas = [(formatar_bucket(linha[0]),) + tuple(linha[1:]) for linha in resultado]
+    if formato == "colunar":
+        resposta = respostas.RespostaJSON(respostas.colunar(linhas, chaves))
+    else:
+        resposta = respostas.RespostaJSON(respostas.registros(linhas, chaves))
+    resposta.headers["X-Bucket"] = bucket
+    return resposta
+
+# "auto" escolhe o nível mais fino ainda retido para o início do intervalo
+BUCKETS_AGREGADO = consultas.BUCKETS + ("auto",)
+
+def consulta_agregado(bucket: str, inicio: Optional[datetime], fim: Optional[datetime],
+                      usina_id: Optional[int] = None):
+    # 1h/1d/1mo vêm dos rollups; 15m junta os dados brutos ao nível de 15
+    # minutos já compactado. Retorna (bucket usado, consulta).
+    if bucket == "auto":
+        bucket = retencao.bucket_automatico(consultas.normalizar_data(inicio))
+    if bucket in rollups.TABELAS:
+        return bucket, rollups.consulta_rollup(bucket, inicio, fim, usina_id)
+    return bucket, rollups.consulta_agregada_historica(bucket, inicio, fim, usina_id)
+
+@app.get("/dados/agregado")
+def agregar_dados(
+    bucket: Literal[BUCKETS_AGREGADO] = "1h",
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    formato: Literal["json", "colunar"] = "json",
+    usuario: str = Depends(exigir_usuario),
+    db: Session = Depends(get_db_leitura),
+):
+    bucket, consulta = consulta_agregado(bucket, inicio, fim)
+    return resposta_agregado(db.execute(consulta), formato, bucket)
+
+# ==========================================
+# USINAS E DISPOSITIVOS
+# ==========================================
+
+class UsinaEntrada(BaseModel):
+    nome: str
+    potencia_kwp: Optional[float] = None
 
+class DispositivoEntrada(BaseModel):
+    nome: str
+
+CHAVES_USINA = ("id", "nome", "potencia_kwp")
+CHAVES_DISPOSITIVO = ("id", "usina_id", "nome")
+
+def buscar_usina(db: Session, usina_id: int):
+    usina = db.get(models.Usina, usina_id)
+    if usina is None:
+        raise HTTPException(status_code=404, detail="Usina não encontrada")
+    return usina
+
+@app.post("/usinas", status_code=status.HTTP_201_CREATED)
+def criar_usina(usina: UsinaEntrada, usuario: str = Depends(exigir_usuario), db: Session = Depends(get_db)):
+    if db.execute(select(models.Usina.id).where(models.Usina.nome == usina.nome)).first():
+        raise HTTPException(status_code=400, detail="Usina já existe")
+    nova = models.Usina(**usina.model_dump())
+    db.add(nova)
+    db.commit()
+    return {chave: getattr(nova, chave) for chave in CHAVES_USINA}
+
+@app.get("/usinas")
+def listar_usinas(
+    apos: Optional[int] = None,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    usuario: str = Depends(exigir_usuario),
+    db: Session = Depends(get_db_leitura),
+):
+    # Paginação keyset pelo id: passe em `apos` o último id recebido
+    u = models.Usina
+    consulta = select(u.id, u.nome, u.potencia_kwp).order_by(u.id).limit(limite)
+    if apos is not None:
+        consulta = consulta.where(u.id > apos)
+    return respostas.RespostaJSON(respostas.registros(db.execute(consulta).all(), CHAVES_USINA))
+
+@app.post("/usinas/{usina_id}/dispositivos", status_code=status.HTTP_201_CREATED)
+def criar_dispositivo(usina_id: int, dispositivo: DispositivoEntrada,
+                      usuario: str = Depends(exigir_usuario), db: Session = Depends(get_db)):
+    buscar_usina(db, usina_id)
+    novo = models.Dispositivo(usina_id=usina_id, **dispositivo.model_dump())
+    db.add(novo)
+    db.commit()
+    # O id pode ser de um dispositivo apagado que ainda estava no mapa da ingestão
+    ingestao.esquecer_dispositivos(novo.id)
+    return {chave: getattr(novo, chave) for chave in CHAVES_DISPOSITIVO}
+
+@app.get("/usinas/{usina_id}/dispositivos")
+def listar_dispositivos(usina_id: int, usuario: str = Depends(exigir_usuario),
+                        db: Session = Depends(get_db_leitura)):
+    buscar_usina(db, usina_id)
+    d = models.Dispositivo
+    consulta = select(d.id, d.usina_id, d.nome).where(d.usina_id == usina_id).order_by(d.id)
+    return respostas.RespostaJSON(respostas.registros(db.execute(consulta).all(), CHAVES_DISPOSITIVO))
+
+@app.get("/usinas/{usina_id}/dados")
+def listar_dados_usina(
+    usina_id: int,
+    dispositivo_id: Optional[int] = None,
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limite: Optional[int] = Query(None, ge=1),
+    formato: Literal["json", "colunar", "ndjson"] = "json",
+    usuario: str = Depends(exigir_usuario),
+    db: Session = Depends(get_db_leitura),
+):
+    # Mesmo contrato de GET /dados, lendo só as linhas da usina pelo índice
+    # (usina_id, timestamp, id)
+    buscar_usina(db, usina_id)
+    return responder_dados(db, inicio, fim, cursor, limite, formato,
+                           usina_id=usina_id, dispositivo_id=dispositivo_id)
+
+@app.get("/usinas/{usina_id}/agregado")
+def agregar_dados_usina(
+    usina_id: int,
+    bucket: Literal[BUCKETS_AGREGADO] = "1h",
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    formato: Literal["json", "colunar"] = "json",
+    usuario: str = Depends(exigir_usuario),
+    db: Session = Depends(get_db_leitura),
+):
+    buscar_usina(db, usina_id)
+    bucket, consulta = consulta_agregado(bucket, inicio, fim, usina_id)
+    return resposta_agregado(db.execute(consulta), formato, bucket)
+
+# ==========================================
+# HISTÓRICO (arquivo Parquet + cauda no SQLite)
+# ==========================================
+# Para relatórios de longo prazo: lê só as colunas e partições pedidas do
+# arquivo frio (ver arquivo.py) e junta com o que ainda está no banco.
+# X-Historico-Incompleto lista os meses do período com leituras apagadas
+# sem arquivamento (por versões antigas da compactação).
+
+def exigir_arquivo():
+    if not arquivo.disponivel():
+        raise HTTPException(status_code=501, detail="Arquivo frio indisponível (pyarrow não instalado)")
+
+def avisar_lacunas(resposta: Response, db: Session, inicio, fim, usina_id):
+    meses = arquivo.meses_incompletos(db, inicio, fim, usina_id)
+    if meses:
+        resposta.headers["X-Historico-Incompleto"] = ",".join(meses)
+    return resposta
+
+@app.get("/historico")
+def historico(
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    usina_id: Optional[int] = None,
+    dispositivo_id: Optional[int] = None,
+    colunas: str = "timestamp,gerado_kwh,consumido_kwh",
+    formato: Literal["colunar", "arrow"] = "colunar",
+    usuario: str = Depends(exigir_usuario),
+    db: Session = Depends(get_db_leitura),
+):
+    # formato=arrow devolve um stream Arrow IPC, lido direto por pandas/pyarrow/polars
+    exigir_arquivo()
+    selecionadas = tuple(c.strip() for c in colunas.split(",") if c.strip())
+    invalidas = set(selecionadas) - set(arquivo.COLUNAS_CONSULTA)
+    if not selecionadas or invalidas:
+        raise HTTPException(status_code=400, detail=f"Colunas válidas: {', '.join(arquivo.COLUNAS_CONSULTA)}")
+    tabela = arquivo.ler(db, inicio, fim, usina_id, dispositivo_id, selecionadas)
+    if formato == "arrow":
+        saida = arquivo.pa.BufferOutputStream()
+        with arquivo.pa.ipc.new_stream(saida, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        resposta = Response(saida.getvalue().to_pybytes(), media_type="application/vnd.apache.arrow.stream")
+    else:
+        resposta = respostas.RespostaJSON(tabela.to_pydict())
+    return avisar_lacunas(resposta, db, inicio, fim, usina_id)
+
+@app.get("/historico/agregado")
+def historico_agregado(
+    bucket: Literal[consultas.BUCKETS] = "1d",
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    usina_id: Optional[int] = None,
+    dispositivo_id: Optional[int] = None,
+    formato: Literal["json", "colunar"] = "json",
+    usuario: str = Depends(exigir_usuario),
+    db: Session = Depends(get_db_leitura),
+):
+    exigir_arquivo()
+    colunas = arquivo.agregar(db, bucket, inicio, fim, usina_id, dispositivo_id)
+    colunas["bucket"] = [formatar_bucket(b) for b in colunas["bucket"]]
+    if formato == "colunar":
+        resposta = respostas.RespostaJSON(colunas)
+    else:
+        resposta = respostas.RespostaJSON(respostas.registros(zip(*colunas.values()), tuple(colunas)))
+    return avisar_lacunas(resposta, db, inicio, fim, usina_id)
+
+# Intervalo de comentários keep-alive no stream SSE
+KEEPALIVE_SSE_S = 15
+
+@app.get("/dados/tempo-real")
+async def tempo_real(request: Request, token: Optional[str] = None, authorization: str = Header(None)):
+    # EventSource do navegador não envia cabeçalhos: aceita também ?token=
+    if not auth.verificar_token(token or token_do_cabecalho(authorization)):
+        raise HTTPException(status_code=401, detail="Token inválido")
+
+    async def eventos():
+        assinante = difusor.assinar()
+        try:
+            while not await request.is_disconnected():
+                try:
+                    mensagem = await asyncio.wait_for(assinante.fila.get(), KEEPALIVE_SSE_S)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if assinante.perdidos:
+                    # Cliente lento: avisa quantos eventos foram descartados para ele
+                    yield b"event: perdidos\ndata: " + respostas.dumps({"quantidade": assinante.perdidos}) + b"\n\n"
+                    assinante.perdidos = 0
+                yield mensagem
+        finally:
+            difusor.cancelar(assinante)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def limitar_tentativas(request: Request, email: Optional[str] = None):
+    # Conta e IP têm limites separados: um ataque a uma conta não bloqueia as demais
+    ip = request.client.host if request.client else "desconhecido"
+    bloqueado = not auth.limite_login_ip.permitir(ip)
+    if not bloqueado and email is not None:
+        bloqueado = not auth.limite_login_conta.permitir(email.lower())
+    if bloqueado:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas, aguarde e tente novamente",
+            headers={"Retry-After": str(auth.LOGIN_JANELA_S)},
+        )
+
+async def no_pool_hash(operacao):
+    try:
+        return await operacao
+    except auth.PoolHashOcupado:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Serviço de autenticação ocupado, tente novamente",
+            headers={"Retry-After": "1"},
+        )
+
+async def buscar_usuario(db: AsyncSession, email: str):
+    resultado = await db.execute(select(models.Usuario).where(models.Usuario.email == email))
+    return resultado.scalar_one_or_none()
+
+def gravar_usuario(email: str, senha_hash: str):
+    # Pelo engine de escrita: o assíncrono só lê (ver database.py)
+    db = database.SessionLocal()
+    try:
+        db.add(models.Usuario(email=email, senha_hash=senha_hash))
+        db.commit()
+    finally:
+        db.close()
+
+# Login e cadastro são async: o bcrypt roda no pool dedicado de auth.py e a
+# rota só aguarda, sem prender threads usadas pela ingestão.
 @app.post("/cadastrar")
-def cadastrar(email: str, senha: str, db: Session = Depends(get_db)):
-    if db.query(models.Usuario).filter(models.Usuario.email == email).first():
+async def cadastrar(request: Request, email: str, senha: str, db: AsyncSession = Depends(get_async_db)):
+    limitar_tentativas(request)
+    if await buscar_usuario(db, email):
         raise HTTPException(status_code=400, detail="Usuário já existe")
-    user = models.Usuario(email=email, senha_hash=auth.gerar_hash_senha(senha))
-    db.add(user)
-    db.commit()
+    senha_hash = await no_pool_hash(auth.gerar_hash_senha_async(senha))
+    await run_in_threadpool(gravar_usuario, email, senha_hash)
     return {"mensagem": "Usuário cadastrado"}
 
 @app.post("/login")
-def login(email: str, senha: str, db: Session = Depends(get_db)):
-    user = db.query(models.Usuario).filter(models.Usuario.email == email).first()
-    if not user or not auth.verificar_senha(senha, user.senha_hash):
+async def login(request: Request, email: str, senha: str, db: AsyncSession = Depends(get_async_db)):
+    limitar_tentativas(request, email)
+    user = await buscar_usuario(db, email)
+    if not user or not await no_pool_hash(auth.verificar_senha_async(senha, user.senha_hash)):
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
     token = auth.criar_token({"sub": user.email})
-    return {"access_token": token}
\ No newline at end of file
+    return {"access_token": token}
+
+@app.post("/logout")
+async def logout(authorization: str = Header(None), usuario: str = Depends(exigir_usuario)):
+    revogacao = auth.revogar_token(token_do_cabecalho(authorization))
+    if revogacao is not None:
+        # Neste processo já vale; gravada, os outros workers a leem na próxima sincronização
+        await run_in_threadpool(revogacoes.persistir, *revogacao)
+    return {"mensagem": "Sessão encerrada"}
+
+@app.get("/status")
+async def status_api(usuario: str = Depends(exigir_usuario)):
+    return {
+        "fila_ingestao": buffer_ingestao.profundidade,
+        "assinantes_tempo_real": difusor.total_assinantes,
+        "cache_tokens": auth.estatisticas_cache_tokens(),
+        "hash_senhas": auth.estatisticas_hash(),
+        "compactacao": compactador.ultimo_resultado,
+        "revogacoes_erro": revogacoes.ultimo_erro,
+    }
+
+@app.get("/metrics")
+def exportar_metricas():
+    # Formato texto do Prometheus; sem autenticação, como de costume para o scraper
+    return Response(metricas.registro.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# ==========================================
+# CAMINHO ASSÍNCRONO (/async/...)
+# ==========================================
+# Mesmas rotas de dados, mas com handlers async sobre o engine asyncio do
+# SQLAlchemy (aiosqlite, ver ASYNC_DATABASE_URL em database.py).
+# As leituras não ocupam threads do threadpool enquanto esperam o banco; as
+# escritas vão para o engine de escrita, o único escritor do processo.
+
+@app.post("/async/dados")
+async def receber_dado_async(dado: DadoEntrada, response: Response,
+                             modo: Literal["duravel", "aceito"] = "duravel"):
+    futuro = enfileirar(dado)
+    if modo == "aceito":
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"mensagem": "Dado aceito para gravação"}
+    try:
+        # shield: o prazo esgotado não cancela o Future do buffer, que ainda vai gravar a leitura
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(futuro)), TIMEOUT_GRAVACAO_S)
+    except (asyncio.TimeoutError, SQLAlchemyError) as erro:
+        raise erro_gravacao(erro)
+    return {"mensagem": "Dado registrado com sucesso"}
+
+def gravar_lote(leituras: list) -> int:
+    db = database.SessionLocal()
+    try:
+        return ingestao.inserir_lote(db, leituras)
+    finally:
+        db.close()
+
+@app.post("/async/dados/lote")
+async def receber_lote_async(dados: List[DadoEntrada]):
+    validar_lote(dados)
+    leituras = [dado.model_dump() for dado in dados]
+    inicio = time.perf_counter()
+    # A escrita vai para o engine de escrita (uma conexão com WAL) sem prender o event loop
+    inseridos = await run_in_threadpool(gravar_lote, leituras)
+    return resumo_lote(len(dados), inseridos, time.perf_counter() - inicio)
+
+async def transmitir_ndjson_async(consulta):
+    async with database.AsyncSessionLocal() as db:
+        resultado = await db.stream(consulta.execution_options(yield_per=LINHAS_POR_BUSCA))
+        async for linha in resultado:
+            yield respostas.linha_ndjson(linha)
+
+@app.get("/async/dados")
+async def listar_dados_async(
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limite: Optional[int] = Query(None, ge=1),
+    formato: Literal["json", "colunar", "ndjson"] = "json",
+    usuario: str = Depends(exigir_usuario),
+    db: AsyncSession = Depends(get_async_db),
+):
+    apos = ler_cursor(cursor)
+    if formato == "ndjson":
+        consulta = consultas.consulta_dados(inicio, fim, apos, limite)
+        return StreamingResponse(transmitir_ndjson_async(consulta), media_type="application/x-ndjson")
+
+    limite = min(limite or LIMITE_PADRAO, LIMITE_MAXIMO)
+    linhas = (await db.execute(consultas.consulta_dados(inicio, fim, apos, limite))).all()
+    return paginar(linhas, limite, formato)
+
+@app.get("/async/dados/agregado")
+async def agregar_dados_async(
+    bucket: Literal[BUCKETS_AGREGADO] = "1h",
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    formato: Literal["json", "colunar"] = "json",
+    usuario: str = Depends(exigir_usuario),
+    db: AsyncSession = Depends(get_async_db),
+):
+    bucket, consulta = consulta_agregado(bucket, inicio, fim)
+    return resposta_agregado(await db.execute(consulta), formato, bucket)
@@ -0,0 +1,257 @@
+"""
+Métricas no formato texto do Prometheus, sem dependências externas.
+
+Contadores e histogramas são atualizados sob um lock curto (uma soma e uma
+busca binária nos limites); gauges com função são lidos só na coleta. A
+exposição fica em GET /metrics (ver main.py).
+
+Com LOG_LENTO_MS definido, requisições mais lentas que o limite são
+registradas no logger "api.lenta" com o SQL executado (sem parâmetros) e o
+tempo de cada comando.
+"""
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+# Limites padrão dos histogramas de latência, em segundos
+LIMITES_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _rotulos(nomes: Sequence[str], valores: Tuple, extra: str = "") -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+
+    def cabecalho(self) -> list:
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores: Dict[Tuple, float] = {}
+
+    def inc(self, valor: float = 1.0, *rotulos):
+        with self._lock:
+            self._valores[rotulos] = self._valores.get(rotulos, 0.0) + valor
+
+    def exportar(self) -> list:
+        with self._lock:
+            valores = list(self._valores.items())
+        return self.cabecalho() + [
+            f"{self.nome}{_rotulos(self.rotulos, chave)} {_numero(valor)}" for chave, valor in valores
+        ]
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = (),
+                 limites: Sequence[float] = LIMITES_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(sorted(limites))
+        # rótulos -> [contagem por faixa..., soma]; a última faixa é +Inf
+        self._series: Dict[Tuple, list] = {}
+
+    def observar(self, valor: float, *rotulos):
+        faixa = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                serie = self._series[rotulos] = [0] * (len(self.limites) + 1) + [0.0]
+            serie[faixa] += 1
+            serie[-1] += valor
+
+    def exportar(self) -> list:
+        with self._lock:
+            series = [(chave, list(serie)) for chave, serie in self._series.items()]
+        linhas = self.cabecalho()
+        for chave, serie in series:
+            acumulado = 0
+            for limite, quantidade in zip(self.limites + (float("inf"),), serie):
+                acumulado += quantidade
+                le = 'le="' + _numero(limite) + '"'
+                linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, chave, le)} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, chave)} {_numero(serie[-1])}")
+            linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, chave)} {acumulado}")
+        return linhas
+
+
+class Gauge(_Metrica):
+    """Valor lido na coleta por `funcao`; ela pode devolver um número ou {rótulos: número}."""
+
+    tipo = "gauge"
+
+    def __init__(self, nome: str, ajuda: str, funcao: Callable, rotulos: Sequence[str] = (),
+                 tipo: Optional[str] = None):
+        super().__init__(nome, ajuda, rotulos)
+        self.funcao = funcao
+        if tipo is not None:
+            self.tipo = tipo
+
+    def exportar(self) -> list:
+        valor = self.funcao()
+        if valor is None:
+            return []
+        itens = valor.items() if isinstance(valor, dict) else [((), valor)]
+        return self.cabecalho() + [
+            f"{self.nome}{_rotulos(self.rotulos, chave if isinstance(chave, tuple) else (chave,))} {_numero(v)}"
+            for chave, v in itens
+        ]
+
+
+class Registro:
+    def __init__(self):
+        self._metricas = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, *args, **kwargs) -> Contador:
+        return self.registrar(Contador(*args, **kwargs))
+
+    def histograma(self, *args, **kwargs) -> Histograma:
+        return self.registrar(Histograma(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.registrar(Gauge(*args, **kwargs))
+
+    def exportar(self) -> str:
+        linhas = []
+        for metrica in self._metricas:
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+registro = Registro()
+
+# Métricas atualizadas por outros módulos (os gauges são registrados em main.py)
+duracao_requisicao = registro.histograma(
+    "api_requisicao_duracao_segundos", "Latência das requisições HTTP por rota",
+    ("metodo", "rota", "status"),
+)
+duracao_consulta = registro.histograma(
+    "db_consulta_duracao_segundos", "Tempo de cada comando SQL", ("engine",),
+)
+linhas_ingeridas = registro.contador(
+    "ingestao_linhas_total", "Leituras gravadas (use rate() para linhas por segundo)", ("origem",),
+)
+duracao_commit = registro.histograma(
+    "ingestao_commit_duracao_segundos", "Latência do commit de cada lote de ingestão", ("origem",),
+)
+
+
+# --- Tempo de SQL e log de requisições lentas ---
+LOG_LENTO_MS = float(os.getenv("LOG_LENTO_MS")) if os.getenv("LOG_LENTO_MS") else None
+LOG_LENTO_MAX_CONSULTAS = int(os.getenv("LOG_LENTO_MAX_CONSULTAS", "50"))
+
+log_lento = logging.getLogger("api.lenta")
+
+
+class _Rastro:
+    """SQL executado durante uma requisição (só existe com o log de lentas ligado)."""
+
+    __slots__ = ("db_s", "consultas")
+
+    def __init__(self):
+        self.db_s = 0.0
+        self.consultas = []
+
+
+# O contexto é copiado para o threadpool das rotas síncronas, e o objeto é o mesmo
+_rastro_atual: contextvars.ContextVar[Optional[_Rastro]] = contextvars.ContextVar("rastro", default=None)
+
+
+def instrumentar_engine(engine, nome: str):
+    """Mede cada comando SQL do engine em db_consulta_duracao_segundos{engine=nome}."""
+
+    # O início fica no contexto de execução: se o comando falhar, ele é descartado junto
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conexao, cursor, comando, parametros, contexto, executemany):
+        contexto._inicio_metricas = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conexao, cursor, comando, parametros, contexto, executemany):
+        duracao = time.perf_counter() - contexto._inicio_metricas
+        duracao_consulta.observar(duracao, nome)
+        rastro = _rastro_atual.get()
+        if rastro is not None:
+            rastro.db_s += duracao
+            if len(rastro.consultas) < LOG_LENTO_MAX_CONSULTAS:
+                rastro.consultas.append({"sql": comando[:1000], "ms": round(duracao * 1000, 3)})
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI: latência por (método, rota, status) e log de lentas.
+    A rota é o modelo do caminho ("/usinas/{usina_id}/dados"), para não
+    criar uma série por id.
+    """
+
+    def __init__(self, app, limite_lento_ms: Optional[float] = LOG_LENTO_MS):
+        self.app = app
+        self.limite_lento_ms = limite_lento_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        rastro = _Rastro() if self.limite_lento_ms is not None else None
+        token = _rastro_atual.set(rastro)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao = time.perf_counter() - inicio
+            _rastro_atual.reset(token)
+            rota = getattr(scope.get("route"), "path", None) or "desconhecida"
+            duracao_requisicao.observar(duracao, scope["method"], rota, str(status))
+            if rastro is not None and duracao * 1000 >= self.limite_lento_ms:
+                log_lento.warning("requisição lenta %s", json.dumps({
+                    "metodo": scope["method"],
+                    "caminho": scope["path"],
+                    "rota": rota,
+                    "status": status,
+                    "duracao_ms": round(duracao * 1000, 3),
+                    "db_ms": round(rastro.db_s * 1000, 3),
+                    "consultas": rastro.consultas,
+                }, ensure_ascii=False))
@@ -0,0 +1,227 @@
+"""
+Migrações versionadas do esquema.
+
+Cada migração é uma função registrada com @migracao(versao, nome) e roda
+uma única vez; as aplicadas ficam em esquema_versao. Elas rodam pela linha
+de comando, antes de subir a API. Os workers só conferem a versão ao
+iniciar (um SELECT) e não executam DDL, então vários sobem em paralelo sem
+disputar o lock de escrita:
+
+    python migracoes.py aplicar [--ate N]
+    python migracoes.py status
+
+Um banco novo e um anterior às migrações seguem o mesmo caminho: a 1 cria
+só o esquema de partida, congelado aqui (não o modelo atual), e cada tabela,
+coluna ou índice que veio depois entra pela migração que o introduziu. Elas
+precisam ser idempotentes, porque bancos anteriores às migrações podem já
+ter parte do que criam (criar_tabelas, adicionar_coluna e criar_indice
+conferem antes). Índices em tabelas grandes usam criar_indice, que roda fora
+da transação da migração: no PostgreSQL com CREATE INDEX CONCURRENTLY; no
+SQLite, que não tem construção concorrente, em uma transação só dele, que
+segura o lock de escrita apenas durante a construção (com WAL as leituras
+continuam). Migrações de dados, como a 4 (carga dos rollups com as leituras
+já gravadas), rodam na transação da migração, junto com o registro da versão.
+"""
+import argparse
+import time
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, String, Table, inspect, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+import arquivo
+import models
+import retencao
+import rollups
+
+metadata_versao = MetaData()
+esquema_versao = Table(
+    "esquema_versao", metadata_versao,
+    Column("versao", Integer, primary_key=True),
+    Column("nome", String, nullable=False),
+    Column("aplicada_em", DateTime, nullable=False),
+    Column("duracao_s", Float, nullable=False),
+)
+
+
+class Migracao(NamedTuple):
+    versao: int
+    nome: str
+    funcao: Callable
+    # False: recebe o Engine e controla as próprias transações (ex.: índices online)
+    transacional: bool
+
+
+MIGRACOES: List[Migracao] = []
+
+
+class EsquemaDesatualizado(RuntimeError):
+    """O banco tem migrações pendentes."""
+
+
+def migracao(versao: int, nome: str, transacional: bool = True):
+    def registrar(funcao):
+        if MIGRACOES and versao <= MIGRACOES[-1].versao:
+            raise ValueError(f"Migração {versao} fora de ordem")
+        MIGRACOES.append(Migracao(versao, nome, funcao, transacional))
+        return funcao
+    return registrar
+
+
+def versao_atual(engine: Engine) -> int:
+    with engine.connect() as conexao:
+        if not inspect(conexao).has_table(esquema_versao.name):
+            return 0
+        return conexao.execute(select(esquema_versao.c.versao).order_by(esquema_versao.c.versao.desc())
+                               .limit(1)).scalar() or 0
+
+
+def pendentes(engine: Engine) -> List[Migracao]:
+    atual = versao_atual(engine)
+    return [m for m in MIGRACOES if m.versao > atual]
+
+
+def verificar(engine: Engine):
+    """Levanta EsquemaDesatualizado se houver migração pendente. Não executa DDL."""
+    faltando = pendentes(engine)
+    if faltando:
+        raise EsquemaDesatualizado(
+            f"Esquema na versão {faltando[0].versao - 1}, esperado {MIGRACOES[-1].versao}: "
+            "rode python migracoes.py aplicar"
+        )
+
+
+def _registrar(conexao: Connection, m: Migracao, inicio: float):
+    conexao.execute(esquema_versao.insert().values(
+        versao=m.versao, nome=m.nome, aplicada_em=datetime.utcnow(), duracao_s=time.perf_counter() - inicio,
+    ))
+
+
+def aplicar(engine: Engine, ate: Optional[int] = None, relatar: Callable = lambda texto: None) -> int:
+    """Aplica as migrações pendentes até `ate` (padrão: todas). Retorna quantas rodaram."""
+    metadata_versao.create_all(engine)
+    aplicadas = 0
+    for m in pendentes(engine):
+        if ate is not None and m.versao > ate:
+            break
+        relatar(f"{m.versao:04d} {m.nome}...")
+        inicio = time.perf_counter()
+        if m.transacional:
+            # DDL do SQLite é transacional: a migração e o registro entram juntos
+            with engine.begin() as conexao:
+                m.funcao(conexao)
+                _registrar(conexao, m, inicio)
+        else:
+            m.funcao(engine)
+            with engine.begin() as conexao:
+                _registrar(conexao, m, inicio)
+        relatar(f"{m.versao:04d} {m.nome}: {time.perf_counter() - inicio:.2f} s")
+        aplicadas += 1
+    return aplicadas
+
+
+# --- Auxiliares idempotentes ---
+
+def adicionar_coluna(conexao: Connection, tabela: str, coluna: str, definicao: str):
+    if coluna not in {c["name"] for c in inspect(conexao).get_columns(tabela)}:
+        conexao.exec_driver_sql(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+
+
+def criar_indice(engine: Engine, indice):
+    """Cria o índice se não existir, sem segurar a transação de outras migrações."""
+    if engine.dialect.name == "postgresql":
+        indice.dialect_kwargs["postgresql_concurrently"] = True
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexao:
+            indice.create(conexao, checkfirst=True)
+        return
+    with engine.begin() as conexao:
+        indice.create(conexao, checkfirst=True)
+
+
+def criar_tabelas(conexao: Connection, *modelos):
+    for modelo in modelos:
+        modelo.__table__.create(conexao, checkfirst=True)
+
+
+# --- Migrações ---
+
+# Esquema de partida, de antes das migrações. Congelado: o que os modelos
+# ganharem depois entra por uma migração nova, nunca por aqui
+metadata_inicial = MetaData()
+Table(
+    "dados_energia", metadata_inicial,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("timestamp", DateTime),
+    Column("gerado_kwh", Float),
+    Column("consumido_kwh", Float),
+)
+Table(
+    "usuarios", metadata_inicial,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True),
+    Column("senha_hash", String),
+)
+
+
+@migracao(1, "tabelas iniciais")
+def _tabelas(conexao):
+    # Bancos criados antes das migrações já têm estas tabelas; create_all só cria as que faltam
+    metadata_inicial.create_all(conexao)
+
+
+@migracao(2, "usinas e dispositivos; dados_energia: dispositivo_id e usina_id")
+def _colunas_dispositivo_usina(conexao):
+    criar_tabelas(conexao, models.Usina, models.Dispositivo)
+    adicionar_coluna(conexao, "dados_energia", "dispositivo_id", "INTEGER REFERENCES dispositivos (id)")
+    adicionar_coluna(conexao, "dados_energia", "usina_id", "INTEGER REFERENCES usinas (id)")
+
+
+@migracao(3, "índices de dados_energia", transacional=False)
+def _indices_dados_energia(engine):
+    for indice in sorted(models.DadoEnergia.__table__.indexes, key=lambda i: i.name):
+        criar_indice(engine, indice)
+
+
+@migracao(4, "rollups: tabelas e carga das leituras já gravadas")
+def _carga_rollups(conexao):
+    criar_tabelas(conexao, *rollups.TABELAS.values(), *rollups.TABELAS_USINA.values(),
+                  rollups.TABELA_15M, rollups.TABELA_USINA_15M)
+    # Os rollups só recebem o que é ingerido depois de existirem; em bancos
+    # anteriores a eles, hora/dia/mês ficariam sem o histórico já gravado.
+    # Se nada saiu do bruto ainda (nível de 15 minutos vazio e sem arquivo
+    # frio), as fontes estão completas e tudo é recalculado; senão, como em
+    # python rollups.py reconstruir, os buckets anteriores à retenção do
+    # nível de 15 minutos são mantidos.
+    compactado = conexao.execute(select(rollups.TABELA_15M.bucket).limit(1)).first() is not None
+    arquivado = arquivo.ARQUIVO_DIR.is_dir() and any(arquivo.ARQUIVO_DIR.iterdir())
+    fontes_desde = retencao.corte(retencao.RETENCAO_15M_DIAS) if compactado or arquivado else None
+    # Sessão sobre a conexão da migração: o commit de reconstruir não fecha a transação dela
+    with Session(bind=conexao) as db:
+        rollups.reconstruir(db, fontes_desde=fontes_desde)
+
+
+@migracao(5, "tokens_revogados")
+def _tokens_revogados(conexao):
+    # Revogações de logout compartilhadas entre os workers (auth.py)
+    criar_tabelas(conexao, models.TokenRevogado)
+
+
+if __name__ == "__main__":
+    import database
+
+    parser = argparse.ArgumentParser(description="Migrações do esquema")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    cmd = sub.add_parser("aplicar", help="Aplica as migrações pendentes")
+    cmd.add_argument("--ate", type=int, help="para na versão informada")
+    sub.add_parser("status", help="Mostra a versão do banco e as migrações pendentes")
+    args = parser.parse_args()
+
+    if args.comando == "aplicar":
+        total = aplicar(database.engine, args.ate, relatar=print)
+        print(f"{total} migração(ões) aplicada(s); versão {versao_atual(database.engine)}.")
+    else:
+        print(f"versão do banco: {versao_atual(database.engine)}")
+        for m in pendentes(database.engine):
+            print(f"pendente: {m.versao:04d} {m.nome}")
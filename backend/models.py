@@ -1,16 +1,90 @@
-from sqlalchemy import Column, Integer, Float, DateTime, String
+from sqlalchemy import Column, Integer, Float, DateTime, String, Index, ForeignKey
 from datetime import datetime
 from database import Base
 
+class Usina(Base):
+    __tablename__ = "usinas"
+    id = Column(Integer, primary_key=True, index=True)
+    nome = Column(String, unique=True, nullable=False)
+    potencia_kwp = Column(Float, nullable=True)
+
+class Dispositivo(Base):
+    __tablename__ = "dispositivos"
+    id = Column(Integer, primary_key=True, index=True)
+    usina_id = Column(Integer, ForeignKey("usinas.id"), nullable=False, index=True)
+    nome = Column(String, nullable=False)
+
 class DadoEnergia(Base):
     __tablename__ = "dados_energia"
     id = Column(Integer, primary_key=True, index=True)
+    # Dispositivo de origem; com ele o timestamp é o da leitura na fonte
+    dispositivo_id = Column(Integer, ForeignKey("dispositivos.id"), nullable=True)
+    # Usina do dispositivo, copiada na ingestão para filtrar sem JOIN
+    usina_id = Column(Integer, ForeignKey("usinas.id"), nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
     gerado_kwh = Column(Float)
     consumido_kwh = Column(Float)
 
+    __table_args__ = (
+        # Atende filtros por período e a paginação keyset de GET /dados
+        Index("ix_dados_energia_timestamp_id", "timestamp", "id"),
+        # Reenvios do gateway não duplicam leituras (NULL não conflita)
+        Index("ux_dados_energia_dispositivo_timestamp", "dispositivo_id", "timestamp", unique=True),
+        # Consultas de uma usina leem só as linhas dela, já em ordem de (timestamp, id)
+        Index("ix_dados_energia_usina_timestamp_id", "usina_id", "timestamp", "id"),
+    )
+
 class Usuario(Base):
     __tablename__ = "usuarios"
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True)
-    senha_hash = Column(String)
\ No newline at end of file
+    senha_hash = Column(String)
+
+class TokenRevogado(Base):
+    __tablename__ = "tokens_revogados"
+    # sha256 do JWT (o token em si não é gravado); lido por todos os workers
+    token_hash = Column(String, primary_key=True)
+    # exp do token: depois dele a linha pode ser apagada; NULL = token sem exp
+    expira_em = Column(DateTime, nullable=True, index=True)
+    revogado_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class ColunasRollup:
+    # Totais pré-agregados por bucket; a média é soma / leituras
+    bucket = Column(DateTime, primary_key=True)
+    leituras = Column(Integer, nullable=False, default=0)
+    gerado_kwh_soma = Column(Float, nullable=False, default=0.0)
+    gerado_kwh_min = Column(Float)
+    gerado_kwh_max = Column(Float)
+    consumido_kwh_soma = Column(Float, nullable=False, default=0.0)
+    consumido_kwh_min = Column(Float)
+    consumido_kwh_max = Column(Float)
+
+class RollupHora(ColunasRollup, Base):
+    __tablename__ = "rollup_hora"
+
+class RollupDia(ColunasRollup, Base):
+    __tablename__ = "rollup_dia"
+
+class RollupMes(ColunasRollup, Base):
+    __tablename__ = "rollup_mes"
+
+# Nível de 15 minutos: só recebe o que a compactação (retencao.py) tira dos
+# dados brutos; o que ainda está em dados_energia é agregado na consulta
+class Rollup15m(ColunasRollup, Base):
+    __tablename__ = "rollup_15m"
+
+class RollupUsina15m(ColunasRollup, Base):
+    __tablename__ = "rollup_usina_15m"
+    usina_id = Column(Integer, primary_key=True)
+
+class RollupUsinaHora(ColunasRollup, Base):
+    __tablename__ = "rollup_usina_hora"
+    usina_id = Column(Integer, primary_key=True)
+
+class RollupUsinaDia(ColunasRollup, Base):
+    __tablename__ = "rollup_usina_dia"
+    usina_id = Column(Integer, primary_key=True)
+
+class RollupUsinaMes(ColunasRollup, Base):
+    __tablename__ = "rollup_usina_mes"
+    usina_id = Column(Integer, primary_key=True)
@@ -0,0 +1,48 @@
+import json
+from datetime import datetime
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele usa o json da biblioteca padrão
+    orjson = None
+
+# Ordem das colunas das linhas vindas de consultas.COLUNAS_DADOS
+CHAVES_DADOS = ("id", "timestamp", "gerado_kwh", "consumido_kwh")
+
+
+def _padrao(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def dumps(conteudo) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(conteudo)
+    return json.dumps(conteudo, default=_padrao, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class RespostaJSON(Response):
+    """JSONResponse que serializa com orjson, sem passar pelo jsonable_encoder."""
+
+    media_type = "application/json"
+
+    def render(self, conteudo) -> bytes:
+        return dumps(conteudo)
+
+
+def registros(linhas, chaves=CHAVES_DADOS) -> list:
+    """Tuplas do banco -> lista de objetos {"coluna": valor}."""
+    return [dict(zip(chaves, linha)) for linha in linhas]
+
+
+def colunar(linhas, chaves=CHAVES_DADOS) -> dict:
+    """Tuplas do banco -> {"coluna": [valores...]}, bem menor que registros."""
+    colunas = list(zip(*linhas)) if linhas else [()] * len(chaves)
+    return {chave: list(valores) for chave, valores in zip(chaves, colunas)}
+
+
+def linha_ndjson(linha, chaves=CHAVES_DADOS) -> bytes:
+    return dumps(dict(zip(chaves, linha))) + b"\n"
@@ -0,0 +1,205 @@
+"""
+Política de retenção dos dados de energia, em níveis:
+
+    bruto (dados_energia)       RETENCAO_BRUTO_DIAS   (padrão 0: no banco para sempre)
+    15 minutos (rollup_15m)     RETENCAO_15M_DIAS     (padrão 730)
+    hora, dia e mês             para sempre
+
+Tirar dados brutos do banco é opcional (RETENCAO_BRUTO_DIAS > 0) e não
+perde leituras: os meses inteiros anteriores ao corte vão primeiro para o
+arquivo frio em Parquet (arquivo.arquivar), que os soma ao nível de 15
+minutos e só depois do arquivo gravado os apaga do banco. O mês que contém
+o corte fica no banco até fechar, e sem pyarrow nada é apagado. Em
+seguida, o nível de 15 minutos mais antigo que o seu corte é apagado; os
+rollups de hora/dia/mês já são mantidos na ingestão, então não perdem nada
+quando os níveis mais finos expiram. O arquivamento do bruto e a expiração
+do nível de 15 minutos andam em lotes de COMPACTACAO_LOTE linhas, com um
+commit por lote, para não segurar o lock de escrita do SQLite; no fim,
+PRAGMA incremental_vacuum devolve as páginas livres ao sistema.
+
+A compactação roda por um agendador só (cron chamando a linha de comando
+abaixo). COMPACTACAO_INTERVALO_MIN > 0 a agenda dentro do processo da API:
+use em um único processo, não em todos os workers.
+
+Uso:
+
+    python retencao.py compactar
+    python retencao.py vacuum-completo   # uma vez, em bancos criados sem auto_vacuum
+"""
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, literal_column, select
+from sqlalchemy.orm import Session
+
+import rollups
+
+# Dias mantidos em cada nível (0 = para sempre)
+RETENCAO_BRUTO_DIAS = int(os.getenv("RETENCAO_BRUTO_DIAS", "0"))
+RETENCAO_15M_DIAS = int(os.getenv("RETENCAO_15M_DIAS", "730"))
+# Linhas por transação da compactação
+COMPACTACAO_LOTE = int(os.getenv("COMPACTACAO_LOTE", "5000"))
+# Intervalo entre execuções agendadas no processo da API (0, o padrão, não agenda)
+COMPACTACAO_INTERVALO_MIN = int(os.getenv("COMPACTACAO_INTERVALO_MIN", "0"))
+# Páginas liberadas por passo do incremental_vacuum
+VACUUM_PAGINAS_POR_PASSO = int(os.getenv("VACUUM_PAGINAS_POR_PASSO", "1000"))
+
+
+def corte(dias: int, agora: Optional[datetime] = None) -> Optional[datetime]:
+    """Início do nível: `dias` antes de agora, alinhado a 15 minutos (None = sem corte)."""
+    if dias <= 0:
+        return None
+    data = (agora or datetime.utcnow()) - timedelta(days=dias)
+    return data.replace(minute=data.minute - data.minute % 15, second=0, microsecond=0)
+
+
+def bucket_automatico(inicio: Optional[datetime], agora: Optional[datetime] = None) -> str:
+    """Nível mais fino que ainda cobre `inicio`: 15m dentro da retenção dele, senão 1h."""
+    limite = corte(RETENCAO_15M_DIAS, agora)
+    if limite is None or (inicio is not None and inicio >= limite):
+        return "15m"
+    return "1h"
+
+
+def arquivar_bruto(db: Session, ate: datetime, lote: int = COMPACTACAO_LOTE) -> dict:
+    """
+    Tira do banco as leituras dos meses inteiros anteriores a `ate`,
+    passando pelo arquivo frio: nada é apagado sem estar no Parquet.
+    Retorna o resumo de arquivo.arquivar.
+    """
+    # Importado aqui: arquivo.py importa este módulo
+    import arquivo
+
+    if not arquivo.disponivel():
+        return {"bruto_mantido": "pyarrow não instalado: sem arquivo frio, os dados brutos ficam no banco"}
+    return arquivo.arquivar(db, ate, lote)
+
+
+def expirar_15m(db: Session, ate: datetime, lote: int = COMPACTACAO_LOTE) -> int:
+    """Apaga o nível de 15 minutos anterior a `ate`, em lotes. Retorna os buckets apagados."""
+    rowid = literal_column("rowid")
+    total = 0
+    for tabela in (rollups.TABELA_15M, rollups.TABELA_USINA_15M):
+        antigos = select(rowid).select_from(tabela).where(tabela.bucket < ate).limit(lote)
+        while True:
+            apagados = db.execute(delete(tabela).where(rowid.in_(antigos))).rowcount
+            db.commit()
+            total += apagados
+            if apagados < lote:
+                break
+    return total
+
+
+def vacuum_incremental(db: Session, paginas_por_passo: int = VACUUM_PAGINAS_POR_PASSO) -> int:
+    """
+    Devolve as páginas livres ao sistema em passos curtos. Só tem efeito com
+    auto_vacuum=INCREMENTAL (perfil "producao"); retorna as páginas liberadas.
+    """
+    conexao = db.connection()
+    if conexao.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+        db.commit()
+        return 0
+    inicial = livres = conexao.exec_driver_sql("PRAGMA freelist_count").scalar()
+    while livres:
+        db.connection().exec_driver_sql(f"PRAGMA incremental_vacuum({paginas_por_passo})")
+        db.commit()
+        restantes = db.connection().exec_driver_sql("PRAGMA freelist_count").scalar()
+        if restantes >= livres:
+            break
+        livres = restantes
+    db.commit()
+    return inicial - livres
+
+
+def compactar(db: Session, agora: Optional[datetime] = None, lote: int = COMPACTACAO_LOTE) -> dict:
+    """Aplica a política inteira; retorna um resumo do que foi feito."""
+    inicio = time.perf_counter()
+    resumo = {"buckets_15m_expirados": 0}
+    corte_bruto = corte(RETENCAO_BRUTO_DIAS, agora)
+    if corte_bruto is not None:
+        resumo.update(arquivar_bruto(db, corte_bruto, lote))
+    corte_15m = corte(RETENCAO_15M_DIAS, agora)
+    if corte_15m is not None:
+        resumo["buckets_15m_expirados"] = expirar_15m(db, corte_15m, lote)
+    resumo["paginas_liberadas"] = vacuum_incremental(db)
+    resumo["duracao_s"] = round(time.perf_counter() - inicio, 3)
+    resumo["executado_em"] = (agora or datetime.utcnow()).isoformat()
+    return resumo
+
+
+class Compactador:
+    """
+    Roda compactar() a cada `intervalo_min` minutos em uma thread própria.
+    `etapas` são funções (db) -> dict executadas antes, na mesma sessão;
+    os resumos delas entram no ultimo_resultado.
+    """
+
+    def __init__(self, session_factory, intervalo_min: int = COMPACTACAO_INTERVALO_MIN, etapas=()):
+        self._session_factory = session_factory
+        self.intervalo = intervalo_min * 60
+        self.etapas = list(etapas)
+        self._parar = threading.Event()
+        self._thread = None
+        self.ultimo_resultado = None
+
+    def iniciar(self):
+        if self.intervalo <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="compactador", daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout: float = 10.0):
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._parar.set()
+        thread.join(timeout)
+
+    def executar_agora(self) -> dict:
+        db = self._session_factory()
+        try:
+            resultado = {}
+            for etapa in self.etapas:
+                resultado.update(etapa(db))
+            resultado.update(compactar(db))
+            self.ultimo_resultado = resultado
+        except Exception as erro:
+            db.rollback()
+            self.ultimo_resultado = {"erro": str(erro), "executado_em": datetime.utcnow().isoformat()}
+        finally:
+            db.close()
+        return self.ultimo_resultado
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            self.executar_agora()
+
+
+if __name__ == "__main__":
+    import database
+    import migracoes
+
+    parser = argparse.ArgumentParser(description="Retenção e compactação dos dados de energia")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    cmd = sub.add_parser("compactar", help="Aplica a política de retenção agora")
+    cmd.add_argument("--lote", type=int, default=COMPACTACAO_LOTE)
+    sub.add_parser("vacuum-completo", help="Liga auto_vacuum=INCREMENTAL e reescreve o arquivo (bloqueia o banco)")
+    args = parser.parse_args()
+
+    migracoes.verificar(database.engine)
+    if args.comando == "compactar":
+        sessao = database.SessionLocal()
+        try:
+            print(compactar(sessao, lote=args.lote))
+        finally:
+            sessao.close()
+    else:
+        with database.engine.connect() as conexao:
+            conexao.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            conexao.exec_driver_sql("VACUUM")
+        print("Banco reescrito com auto_vacuum=INCREMENTAL.")
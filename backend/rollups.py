@@ -0,0 +1,375 @@
+"""
+Tabelas de rollup (hora/dia/mês) mantidas junto com a ingestão.
+
+A ingestão só soma o que entra depois de as tabelas existirem. Ao atualizar
+um banco que já tem leituras, a carga inicial é feita pela migração 4
+(python migracoes.py aplicar), que chama reconstruir(). Fora disso, para
+corrigir um período, a reconstrução a partir dos dados brutos:
+
+    python rollups.py reconstruir --inicio 2025-01-01 --fim 2025-07-01
+
+Buckets anteriores à retenção do nível de 15 minutos (retencao.py) não são
+recalculados: as fontes deles já foram apagadas.
+"""
+import argparse
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import delete, func, select, union_all
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+import consultas
+import models
+
+TABELAS = {
+    "1h": models.RollupHora,
+    "1d": models.RollupDia,
+    "1mo": models.RollupMes,
+}
+# Mesmas granularidades por usina (chave primária usina_id, bucket)
+TABELAS_USINA = {
+    "1h": models.RollupUsinaHora,
+    "1d": models.RollupUsinaDia,
+    "1mo": models.RollupUsinaMes,
+}
+# Nível de 15 minutos, preenchido só pela compactação dos dados brutos
+TABELA_15M = models.Rollup15m
+TABELA_USINA_15M = models.RollupUsina15m
+
+
+def truncar(bucket: str, data: datetime) -> datetime:
+    if bucket == "1h":
+        return data.replace(minute=0, second=0, microsecond=0)
+    if bucket == "1d":
+        return data.replace(hour=0, minute=0, second=0, microsecond=0)
+    return data.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def proximo_bucket(bucket: str, data: datetime) -> datetime:
+    inicio = truncar(bucket, data)
+    if bucket == "1h":
+        return inicio + timedelta(hours=1)
+    if bucket == "1d":
+        return inicio + timedelta(days=1)
+    return (inicio + timedelta(days=32)).replace(day=1)
+
+
+def _parciais(bucket: str, linhas: list, por_usina: bool = False) -> list:
+    """
+    Agrega as linhas de um lote por bucket, em memória. Com `por_usina`
+    agrupa por (usina_id, bucket) e ignora linhas sem usina.
+    """
+    grupos = {}
+    for linha in linhas:
+        inicio = truncar(bucket, linha["timestamp"])
+        if por_usina:
+            if linha.get("usina_id") is None:
+                continue
+            chave = (linha["usina_id"], inicio)
+        else:
+            chave = inicio
+        g, c = linha["gerado_kwh"], linha["consumido_kwh"]
+        parcial = grupos.get(chave)
+        if parcial is None:
+            grupos[chave] = {
+                "bucket": inicio, "leituras": 1,
+                "gerado_kwh_soma": g, "gerado_kwh_min": g, "gerado_kwh_max": g,
+                "consumido_kwh_soma": c, "consumido_kwh_min": c, "consumido_kwh_max": c,
+            }
+            if por_usina:
+                grupos[chave]["usina_id"] = linha["usina_id"]
+            continue
+        parcial["leituras"] += 1
+        parcial["gerado_kwh_soma"] += g
+        parcial["gerado_kwh_min"] = min(parcial["gerado_kwh_min"], g)
+        parcial["gerado_kwh_max"] = max(parcial["gerado_kwh_max"], g)
+        parcial["consumido_kwh_soma"] += c
+        parcial["consumido_kwh_min"] = min(parcial["consumido_kwh_min"], c)
+        parcial["consumido_kwh_max"] = max(parcial["consumido_kwh_max"], c)
+    return list(grupos.values())
+
+
+# Unidade numpy de cada granularidade, usada na agregação vetorizada
+UNIDADES_NUMPY = {"15m": "datetime64[15m]", "1h": "datetime64[h]", "1d": "datetime64[D]", "1mo": "datetime64[M]"}
+
+
+def _parciais_colunas(bucket: str, timestamps: np.ndarray, gerado: np.ndarray, consumido: np.ndarray,
+                      usinas: Optional[np.ndarray] = None) -> list:
+    """
+    Mesmo resultado de _parciais, a partir de arrays (sem laço por linha).
+    Com `usinas` agrupa por (usina_id, bucket); todas as linhas devem ter usina.
+    """
+    instantes = timestamps.astype(UNIDADES_NUMPY[bucket])
+    if usinas is None:
+        chaves, grupo = np.unique(instantes, return_inverse=True)
+    else:
+        compostas = np.empty(len(instantes), dtype=[("usina_id", "<i8"), ("bucket", "<i8")])
+        compostas["usina_id"] = usinas
+        compostas["bucket"] = instantes.astype(np.int64)
+        chaves, grupo = np.unique(compostas, return_inverse=True)
+    n = len(chaves)
+    parciais = {"leituras": np.bincount(grupo, minlength=n)}
+    for nome, valores in (("gerado_kwh", gerado), ("consumido_kwh", consumido)):
+        valores = valores.astype(np.float64)
+        minimos = np.full(n, np.inf)
+        maximos = np.full(n, -np.inf)
+        np.minimum.at(minimos, grupo, valores)
+        np.maximum.at(maximos, grupo, valores)
+        parciais[f"{nome}_soma"] = np.bincount(grupo, weights=valores, minlength=n)
+        parciais[f"{nome}_min"] = minimos
+        parciais[f"{nome}_max"] = maximos
+    if usinas is None:
+        inicios = chaves.astype("datetime64[us]").tolist()
+    else:
+        inicios = chaves["bucket"].astype(UNIDADES_NUMPY[bucket]).astype("datetime64[us]").tolist()
+        parciais["usina_id"] = chaves["usina_id"]
+    colunas = {nome: valores.tolist() for nome, valores in parciais.items()}
+    return [
+        {"bucket": inicio, **{nome: valores[i] for nome, valores in colunas.items()}}
+        for i, inicio in enumerate(inicios)
+    ]
+
+
+def _somar(db: Session, tabela, parciais: list):
+    # UPSERT: soma os parciais ao que já existe no bucket
+    if not parciais:
+        return
+    t = tabela.__table__
+    comando = insert(t)
+    excluido = comando.excluded
+    db.execute(
+        comando.on_conflict_do_update(
+            index_elements=list(t.primary_key.columns),
+            set_={
+                "leituras": t.c.leituras + excluido.leituras,
+                "gerado_kwh_soma": t.c.gerado_kwh_soma + excluido.gerado_kwh_soma,
+                "gerado_kwh_min": func.min(t.c.gerado_kwh_min, excluido.gerado_kwh_min),
+                "gerado_kwh_max": func.max(t.c.gerado_kwh_max, excluido.gerado_kwh_max),
+                "consumido_kwh_soma": t.c.consumido_kwh_soma + excluido.consumido_kwh_soma,
+                "consumido_kwh_min": func.min(t.c.consumido_kwh_min, excluido.consumido_kwh_min),
+                "consumido_kwh_max": func.max(t.c.consumido_kwh_max, excluido.consumido_kwh_max),
+            },
+        ),
+        parciais,
+    )
+
+
+def atualizar_rollups(db: Session, linhas: list) -> dict:
+    """
+    Soma um lote recém-inserido aos rollups gerais e aos de cada usina. Deve
+    rodar na mesma transação do INSERT dos dados brutos (não faz commit).
+    Retorna os parciais gerais somados por granularidade (os deltas do lote).
+    """
+    deltas = {}
+    for bucket, tabela in TABELAS.items():
+        deltas[bucket] = _parciais(bucket, linhas)
+        _somar(db, tabela, deltas[bucket])
+        _somar(db, TABELAS_USINA[bucket], _parciais(bucket, linhas, por_usina=True))
+    return deltas
+
+
+def atualizar_rollups_colunas(db: Session, timestamps: np.ndarray, gerado: np.ndarray,
+                              consumido: np.ndarray, usinas: Optional[np.ndarray] = None) -> dict:
+    """
+    Versão de atualizar_rollups para lotes em arrays (timestamps datetime64).
+    `usinas` traz o usina_id de cada linha, com 0 para "sem usina".
+    """
+    return {
+        bucket: somar_colunas(db, bucket, tabela, TABELAS_USINA[bucket], timestamps, gerado, consumido, usinas)
+        for bucket, tabela in TABELAS.items()
+    }
+
+
+def somar_colunas(db: Session, bucket: str, tabela, tabela_usina, timestamps: np.ndarray,
+                  gerado: np.ndarray, consumido: np.ndarray, usinas: Optional[np.ndarray] = None) -> list:
+    """Soma as linhas em `tabela` e, as que têm usina, em `tabela_usina`."""
+    parciais = _parciais_colunas(bucket, timestamps, gerado, consumido)
+    _somar(db, tabela, parciais)
+    if usinas is not None:
+        com_usina = np.flatnonzero(usinas)
+        if com_usina.size:
+            _somar(db, tabela_usina, _parciais_colunas(
+                bucket, timestamps[com_usina], gerado[com_usina], consumido[com_usina], usinas[com_usina]
+            ))
+    return parciais
+
+
+def consulta_rollup(bucket: str, inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                    usina_id: Optional[int] = None):
+    """
+    Mesmas colunas de consultas.consulta_agregada, lidas do rollup: custo
+    proporcional ao número de buckets. O intervalo é alinhado ao bucket
+    (o bucket que contém `inicio` entra inteiro). Com `usina_id` lê o
+    rollup da usina.
+    """
+    t = TABELAS_USINA[bucket] if usina_id is not None else TABELAS[bucket]
+    consulta = select(
+        t.bucket,
+        t.leituras,
+        t.gerado_kwh_soma,
+        t.gerado_kwh_min,
+        t.gerado_kwh_max,
+        (t.gerado_kwh_soma / t.leituras).label("gerado_kwh_media"),
+        t.consumido_kwh_soma,
+        t.consumido_kwh_min,
+        t.consumido_kwh_max,
+        (t.consumido_kwh_soma / t.leituras).label("consumido_kwh_media"),
+        (t.gerado_kwh_soma - t.consumido_kwh_soma).label("excedente_kwh"),
+    ).order_by(t.bucket)
+    if usina_id is not None:
+        consulta = consulta.where(t.usina_id == usina_id)
+    if inicio is not None:
+        consulta = consulta.where(t.bucket >= truncar(bucket, consultas.normalizar_data(inicio)))
+    if fim is not None:
+        consulta = consulta.where(t.bucket < consultas.normalizar_data(fim))
+    return consulta
+
+
+def consulta_agregada_historica(bucket: str, inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                                usina_id: Optional[int] = None, por_usina: bool = False):
+    """
+    Mesmas colunas de consultas.consulta_agregada, somando aos dados brutos
+    o que a compactação já moveu para o nível de 15 minutos. Cada bucket
+    combina as duas fontes, então o resultado não depende de quanto já foi
+    compactado. Na parte compactada o intervalo é alinhado a 15 minutos.
+    """
+    d = models.DadoEnergia
+    t = TABELA_USINA_15M if (usina_id is not None or por_usina) else TABELA_15M
+    inicio, fim = consultas.normalizar_data(inicio), consultas.normalizar_data(fim)
+
+    bruto_bucket = consultas.expressao_bucket(bucket).label("bucket")
+    grupos = (bruto_bucket, d.usina_id.label("usina_id")) if por_usina else (bruto_bucket,)
+    bruto = select(
+        *grupos,
+        func.count().label("leituras"),
+        func.sum(d.gerado_kwh).label("gerado_kwh_soma"),
+        func.min(d.gerado_kwh).label("gerado_kwh_min"),
+        func.max(d.gerado_kwh).label("gerado_kwh_max"),
+        func.sum(d.consumido_kwh).label("consumido_kwh_soma"),
+        func.min(d.consumido_kwh).label("consumido_kwh_min"),
+        func.max(d.consumido_kwh).label("consumido_kwh_max"),
+    ).group_by(*grupos)
+    compactado = select(
+        consultas.expressao_bucket(bucket, t.bucket).label("bucket"),
+        *((t.usina_id,) if por_usina else ()),
+        t.leituras,
+        t.gerado_kwh_soma,
+        t.gerado_kwh_min,
+        t.gerado_kwh_max,
+        t.consumido_kwh_soma,
+        t.consumido_kwh_min,
+        t.consumido_kwh_max,
+    )
+    if inicio is not None:
+        bruto = bruto.where(d.timestamp >= inicio)
+        compactado = compactado.where(t.bucket >= _truncar_15m(inicio))
+    if fim is not None:
+        bruto = bruto.where(d.timestamp < fim)
+        compactado = compactado.where(t.bucket < fim)
+    if usina_id is not None:
+        bruto = bruto.where(d.usina_id == usina_id)
+        compactado = compactado.where(t.usina_id == usina_id)
+    if por_usina:
+        bruto = bruto.where(d.usina_id.is_not(None))
+
+    u = union_all(bruto, compactado).subquery()
+    chave = (u.c.usina_id, u.c.bucket) if por_usina else (u.c.bucket,)
+    leituras = func.sum(u.c.leituras)
+    gerado, consumido = func.sum(u.c.gerado_kwh_soma), func.sum(u.c.consumido_kwh_soma)
+    return select(
+        *chave,
+        leituras.label("leituras"),
+        gerado.label("gerado_kwh_soma"),
+        func.min(u.c.gerado_kwh_min).label("gerado_kwh_min"),
+        func.max(u.c.gerado_kwh_max).label("gerado_kwh_max"),
+        (gerado / leituras).label("gerado_kwh_media"),
+        consumido.label("consumido_kwh_soma"),
+        func.min(u.c.consumido_kwh_min).label("consumido_kwh_min"),
+        func.max(u.c.consumido_kwh_max).label("consumido_kwh_max"),
+        (consumido / leituras).label("consumido_kwh_media"),
+        (gerado - consumido).label("excedente_kwh"),
+    ).group_by(*chave).order_by(*chave)
+
+
+def _truncar_15m(data: datetime) -> datetime:
+    return data.replace(minute=data.minute - data.minute % 15, second=0, microsecond=0)
+
+
+def _reconstruir_tabela(db: Session, tabela, bucket: str, ini: Optional[datetime],
+                        fim_bucket: Optional[datetime], por_usina: bool):
+    apagar = delete(tabela)
+    if ini is not None:
+        apagar = apagar.where(tabela.bucket >= ini)
+    if fim_bucket is not None:
+        apagar = apagar.where(tabela.bucket < fim_bucket)
+    db.execute(apagar)
+
+    consulta = consulta_agregada_historica(bucket, ini, fim_bucket, por_usina=por_usina)
+    parciais = []
+    for linha in db.execute(consulta).mappings():
+        parcial = {
+            "bucket": datetime.fromisoformat(linha["bucket"]),
+            "leituras": linha["leituras"],
+            "gerado_kwh_soma": linha["gerado_kwh_soma"],
+            "gerado_kwh_min": linha["gerado_kwh_min"],
+            "gerado_kwh_max": linha["gerado_kwh_max"],
+            "consumido_kwh_soma": linha["consumido_kwh_soma"],
+            "consumido_kwh_min": linha["consumido_kwh_min"],
+            "consumido_kwh_max": linha["consumido_kwh_max"],
+        }
+        if por_usina:
+            parcial["usina_id"] = linha["usina_id"]
+        parciais.append(parcial)
+    _somar(db, tabela, parciais)
+
+
+def reconstruir(db: Session, inicio: Optional[datetime] = None, fim: Optional[datetime] = None,
+                fontes_desde: Optional[datetime] = None):
+    """
+    Regera os rollups a partir dos dados brutos (e do nível de 15 minutos,
+    para o que já foi compactado). O intervalo é expandido para buckets
+    inteiros de cada granularidade antes de apagar e recalcular.
+
+    `fontes_desde` é o instante a partir do qual as fontes estão completas
+    (o corte de retenção do nível de 15 minutos): buckets que começam antes
+    dele são mantidos, pois recalculá-los apagaria o histórico expirado.
+    """
+    inicio, fim = consultas.normalizar_data(inicio), consultas.normalizar_data(fim)
+    for bucket in TABELAS:
+        ini = truncar(bucket, inicio) if inicio else None
+        # fim é exclusivo: o bucket que contém o último instante entra inteiro
+        fim_bucket = proximo_bucket(bucket, fim - timedelta(microseconds=1)) if fim else None
+        if fontes_desde is not None:
+            primeiro = truncar(bucket, fontes_desde)
+            if primeiro < fontes_desde:
+                primeiro = proximo_bucket(bucket, fontes_desde)
+            ini = max(ini, primeiro) if ini else primeiro
+            if fim_bucket is not None and fim_bucket <= ini:
+                continue
+        for tabela, por_usina in ((TABELAS[bucket], False), (TABELAS_USINA[bucket], True)):
+            _reconstruir_tabela(db, tabela, bucket, ini, fim_bucket, por_usina)
+    db.commit()
+
+
+if __name__ == "__main__":
+    import database
+    import migracoes
+
+    parser = argparse.ArgumentParser(description="Manutenção das tabelas de rollup")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    cmd = sub.add_parser("reconstruir", help="Regera os rollups a partir dos dados brutos")
+    cmd.add_argument("--inicio", type=datetime.fromisoformat, default=None)
+    cmd.add_argument("--fim", type=datetime.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    import retencao
+
+    migracoes.verificar(database.engine)
+    sessao = database.SessionLocal()
+    try:
+        reconstruir(sessao, args.inicio, args.fim, retencao.corte(retencao.RETENCAO_15M_DIAS))
+    finally:
+        sessao.close()
+    print("Rollups reconstruídos.")
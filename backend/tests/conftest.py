@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Os módulos do backend se importam pelo nome (import database), como quando
+# a API roda de dentro de backend/; o banco precisa estar definido antes
+DIRETORIO_BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, DIRETORIO_BACKEND)
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/teste.db"
+os.environ["ARQUIVO_DIR"] = os.path.join(_tmp, "arquivo")
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import database  # noqa: E402
+import migracoes  # noqa: E402
+
+migracoes.aplicar(database.engine)
+
+
+@pytest.fixture(scope="session")
+def cliente():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as cliente:
+        yield cliente
+
+
+@pytest.fixture(scope="session")
+def autenticacao():
+    import auth
+
+    return {"Authorization": f"Bearer {auth.criar_token({'sub': 'teste@solartrack'})}"}
@@ -0,0 +1,19 @@
+import auth
+import database
+
+
+def test_logout_chega_aos_outros_workers(cliente):
+    token = auth.criar_token({"sub": "logout@solartrack"})
+    resposta = cliente.post("/logout", headers={"Authorization": f"Bearer {token}"})
+    assert resposta.status_code == 200
+    assert auth.verificar_token(token) is None
+
+    # Outro worker: não recebeu o logout, só enxerga o que está no banco
+    with auth._lock_tokens:
+        auth._tokens_revogados.clear()
+        auth._cache_tokens.clear()
+    assert auth.verificar_token(token) == "logout@solartrack"
+
+    outro_worker = auth.SincronizadorRevogacoes(database.SessionLocal, intervalo_s=0)
+    assert outro_worker.sincronizar() >= 1
+    assert auth.verificar_token(token) is None
@@ -0,0 +1,100 @@
+import pytest
+
+import database
+import models
+
+JSON = {"Content-Type": "application/json"}
+
+
+def contar_leituras():
+    with database.SessionLocal() as db:
+        return db.query(models.DadoEnergia).count()
+
+
+@pytest.mark.parametrize("rota,corpo", [
+    ("/dados", '{"gerado_kwh": NaN, "consumido_kwh": 1.0}'),
+    ("/dados", '{"gerado_kwh": 1.0, "consumido_kwh": -Infinity}'),
+    ("/dados/lote", '[{"gerado_kwh": 1.0, "consumido_kwh": 1.0}, {"gerado_kwh": Infinity, "consumido_kwh": 1.0}]'),
+    ("/async/dados/lote", '[{"gerado_kwh": NaN, "consumido_kwh": 1.0}]'),
+])
+def test_recusa_valores_nao_finitos(cliente, rota, corpo):
+    antes = contar_leituras()
+    resposta = cliente.post(rota, content=corpo, headers=JSON)
+    assert resposta.status_code == 422
+    assert resposta.json()["detail"][0]["type"] == "finite_number"
+    assert contar_leituras() == antes
+
+
+def test_dispositivo_exige_timestamp(cliente):
+    sem_hora = [{"gerado_kwh": float(i), "consumido_kwh": 1.0, "dispositivo_id": 7} for i in range(5)]
+    resposta = cliente.post("/dados/lote", json=sem_hora)
+    assert resposta.status_code == 422
+    assert len(resposta.json()["detail"]) == 5
+
+    com_hora = [{**leitura, "timestamp": f"2025-01-01T00:0{i}:00"} for i, leitura in enumerate(sem_hora)]
+    resposta = cliente.post("/dados/lote", json=com_hora)
+    assert resposta.status_code == 200
+    assert (resposta.json()["inseridos"], resposta.json()["duplicados"]) == (5, 0)
+
+
+@pytest.mark.parametrize("rota", ["/dados", "/async/dados"])
+def test_gravacao_nao_confirmada_responde_503_ou_504(cliente, monkeypatch, rota):
+    from concurrent.futures import Future
+
+    from sqlalchemy.exc import OperationalError
+
+    import main
+
+    corpo = {"gerado_kwh": 1.0, "consumido_kwh": 0.5}
+    pendente = Future()
+    monkeypatch.setattr(main, "TIMEOUT_GRAVACAO_S", 0.05)
+    monkeypatch.setattr(main.buffer_ingestao, "enviar", lambda leitura: pendente)
+    resposta = cliente.post(rota, json=corpo)
+    assert resposta.status_code == 504
+    assert resposta.headers["Retry-After"] == "1"
+    # O buffer ainda vai gravar a leitura: o Future dele não pode ser cancelado
+    assert not pendente.cancelled()
+
+    falhou = Future()
+    falhou.set_exception(OperationalError("INSERT", {}, Exception("database is locked")))
+    monkeypatch.setattr(main.buffer_ingestao, "enviar", lambda leitura: falhou)
+    assert cliente.post(rota, json=corpo).status_code == 503
+
+
+def test_mapa_de_dispositivos_nao_fica_velho(cliente, autenticacao, monkeypatch):
+    import ingestao
+
+    def criar(caminho, corpo):
+        resposta = cliente.post(caminho, json=corpo, headers=autenticacao)
+        assert resposta.status_code == 201
+        return resposta.json()["id"]
+
+    def usina_gravada(dispositivo, minuto):
+        leitura = {"dispositivo_id": dispositivo, "timestamp": f"2025-03-01T00:{minuto:02d}:00",
+                   "gerado_kwh": 1.0, "consumido_kwh": 1.0}
+        assert cliente.post("/dados/lote", json=[leitura]).json()["inseridos"] == 1
+        with database.SessionLocal() as db:
+            return db.query(models.DadoEnergia.usina_id).filter_by(dispositivo_id=dispositivo).order_by(
+                models.DadoEnergia.timestamp.desc()).first()[0]
+
+    usina_a = criar("/usinas", {"nome": "cache-a"})
+    usina_b = criar("/usinas", {"nome": "cache-b"})
+    dispositivo = criar(f"/usinas/{usina_a}/dispositivos", {"nome": "inversor"})
+    assert usina_gravada(dispositivo, 0) == usina_a
+
+    # Apagado fora da API e recriado em outra usina com o mesmo id: a rota de cadastro limpa o mapa
+    with database.SessionLocal() as db:
+        db.query(models.DadoEnergia).filter_by(dispositivo_id=dispositivo).delete()
+        db.query(models.Dispositivo).filter_by(id=dispositivo).delete()
+        db.commit()
+    assert criar(f"/usinas/{usina_b}/dispositivos", {"nome": "inversor"}) == dispositivo
+    assert usina_gravada(dispositivo, 1) == usina_b
+
+    # Movido por outro processo: vale depois do TTL
+    with database.SessionLocal() as db:
+        db.query(models.Dispositivo).filter_by(id=dispositivo).update({"usina_id": usina_a})
+        db.commit()
+    assert usina_gravada(dispositivo, 2) == usina_b
+    agora = ingestao.time.monotonic()
+    monkeypatch.setattr(ingestao.time, "monotonic", lambda: agora + ingestao.CACHE_DISPOSITIVOS_TTL_S + 1)
+    assert usina_gravada(dispositivo, 3) == usina_a
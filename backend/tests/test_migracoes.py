@@ -0,0 +1,68 @@
+import os
+import tempfile
+
+from sqlalchemy import create_engine, func, inspect, select
+
+import migracoes
+import models
+
+
+def test_migracao_carrega_rollups_de_banco_antigo():
+    # Esquema de antes das migrações: só dados_energia e usuarios, sem rollups
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'antigo.db')}")
+    with engine.begin() as conexao:
+        conexao.exec_driver_sql("CREATE TABLE dados_energia (id INTEGER PRIMARY KEY, timestamp DATETIME, "
+                                "gerado_kwh FLOAT, consumido_kwh FLOAT)")
+        conexao.exec_driver_sql("CREATE TABLE usuarios (id INTEGER PRIMARY KEY, email VARCHAR, senha_hash VARCHAR)")
+        conexao.exec_driver_sql(
+            "INSERT INTO dados_energia (timestamp, gerado_kwh, consumido_kwh) VALUES "
+            "('2025-01-10 10:05:00.000000', 2.0, 1.0), ('2025-01-10 10:40:00.000000', 3.0, 1.0), "
+            "('2025-02-01 08:00:00.000000', 1.0, 4.0)"
+        )
+
+    migracoes.aplicar(engine)
+
+    with engine.connect() as conexao:
+        for tabela in (models.RollupHora, models.RollupDia, models.RollupMes):
+            leituras, gerado = conexao.execute(
+                select(func.sum(tabela.leituras), func.sum(tabela.gerado_kwh_soma))
+            ).one()
+            assert (leituras, gerado) == (3, 6.0)
+        assert conexao.execute(select(func.count()).select_from(models.RollupHora)).scalar() == 2
+    engine.dispose()
+
+
+def esquema(engine):
+    inspetor = inspect(engine)
+    return {
+        tabela: (
+            sorted((c["name"], str(c["type"])) for c in inspetor.get_columns(tabela)),
+            sorted((i["name"], tuple(i["column_names"]), bool(i["unique"])) for i in inspetor.get_indexes(tabela)),
+        )
+        for tabela in inspetor.get_table_names()
+    }
+
+
+def test_banco_novo_e_antigo_terminam_no_mesmo_esquema_do_modelo():
+    diretorio = tempfile.mkdtemp()
+    novo = create_engine(f"sqlite:///{os.path.join(diretorio, 'novo.db')}")
+    antigo = create_engine(f"sqlite:///{os.path.join(diretorio, 'antigo.db')}")
+    with antigo.begin() as conexao:
+        conexao.exec_driver_sql("CREATE TABLE dados_energia (id INTEGER PRIMARY KEY, timestamp DATETIME, "
+                                "gerado_kwh FLOAT, consumido_kwh FLOAT)")
+        conexao.exec_driver_sql("CREATE INDEX ix_dados_energia_id ON dados_energia (id)")
+        conexao.exec_driver_sql("CREATE TABLE usuarios (id INTEGER PRIMARY KEY, email VARCHAR, senha_hash VARCHAR)")
+        conexao.exec_driver_sql("CREATE INDEX ix_usuarios_id ON usuarios (id)")
+        conexao.exec_driver_sql("CREATE UNIQUE INDEX ix_usuarios_email ON usuarios (email)")
+
+    # A migração 1 não segue o modelo atual: o banco novo parte do mesmo esquema do antigo
+    migracoes.aplicar(novo, ate=1)
+    assert set(inspect(novo).get_table_names()) == {"dados_energia", "usuarios", "esquema_versao"}
+
+    migracoes.aplicar(novo)
+    migracoes.aplicar(antigo)
+    assert esquema(novo) == esquema(antigo)
+    modelo = {tabela.name: {c.name for c in tabela.columns} for tabela in models.Base.metadata.sorted_tables}
+    assert {t: {c for c, _ in colunas} for t, (colunas, _) in esquema(novo).items() if t in modelo} == modelo
+    novo.dispose()
+    antigo.dispose()
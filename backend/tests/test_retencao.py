@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import arquivo
+import database
+import ingestao
+import models
+import retencao
+import rollups
+
+
+def test_compactacao_nao_perde_historico(monkeypatch):
+    agora = datetime.utcnow()
+    registros = np.zeros(4000, dtype=ingestao.DTYPE_REGISTRO)
+    registros["timestamp"] = (agora - timedelta(days=200)).timestamp() + np.arange(4000) * 4320.0
+    registros["gerado_kwh"] = 1.0
+    registros["consumido_kwh"] = 0.5
+    with database.SessionLocal() as db:
+        ingestao.inserir_colunas(db, registros)
+        total = sum(arquivo.agregar(db, "1d")["leituras"])
+
+        # Padrão: nada sai do banco
+        retencao.compactar(db)
+        assert db.query(models.DadoEnergia).count() == total
+
+        monkeypatch.setattr(retencao, "RETENCAO_BRUTO_DIAS", 90)
+        resumo = retencao.compactar(db)
+        assert resumo["linhas_arquivadas"] > 0
+        assert db.query(models.DadoEnergia).count() == total - resumo["linhas_arquivadas"]
+        assert sum(arquivo.agregar(db, "1d")["leituras"]) == total
+        assert arquivo.meses_incompletos(db) == []
+
+
+def test_aponta_meses_compactados_sem_arquivo(cliente, autenticacao):
+    # Como a compactação antiga: soma ao nível de 15 minutos e apaga o bruto, sem Parquet
+    instantes = np.array(["2020-03-10T12:00", "2020-03-10T12:20"], dtype="datetime64[us]")
+    with database.SessionLocal() as db:
+        rollups.somar_colunas(db, "15m", rollups.TABELA_15M, rollups.TABELA_USINA_15M,
+                              instantes, np.ones(2), np.ones(2), np.zeros(2, dtype=np.int64))
+        db.commit()
+        assert arquivo.meses_incompletos(db, datetime(2020, 1, 1), datetime(2020, 6, 1)) == ["2020-03"]
+        assert arquivo.meses_incompletos(db, datetime(2020, 4, 1), datetime(2020, 6, 1)) == []
+
+    resposta = cliente.get("/historico/agregado", params={"inicio": "2020-01-01T00:00:00"},
+                           headers=autenticacao)
+    assert resposta.status_code == 200
+    assert resposta.headers["X-Historico-Incompleto"] == "2020-03"
+
+
+
+def test_arquivamento_em_lotes_retoma_interrompido(monkeypatch):
+    mes = datetime(2019, 5, 1)
+    registros = np.zeros(1000, dtype=ingestao.DTYPE_REGISTRO)
+    registros["timestamp"] = mes.replace(tzinfo=timezone.utc).timestamp() + np.arange(1000) * 600.0
+    registros["gerado_kwh"] = 1.0
+    monkeypatch.setattr(arquivo, "LINHAS_POR_ROW_GROUP", 256)
+    d = models.DadoEnergia
+    filtro = [d.timestamp >= mes, d.timestamp < datetime(2019, 6, 1), d.usina_id.is_(None)]
+    with database.SessionLocal() as db:
+        ingestao.inserir_colunas(db, registros)
+        # Interrompido depois de gravar o Parquet e apagar só parte do banco
+        colunas = [getattr(d, coluna) for coluna in arquivo.COLUNAS]
+        arquivo._gravar(arquivo._lotes(db, filtro, colunas, 100), arquivo.caminho_particao(0, 2019, 5))
+        db.query(d).filter(*filtro, d.timestamp < datetime(2019, 5, 3)).delete()
+        db.commit()
+
+        restantes = db.query(d).filter(*filtro).count()
+        assert 0 < restantes < 1000
+        assert arquivo.arquivar_particao(db, None, mes, lote=64) == restantes
+        assert db.query(d).filter(*filtro).count() == 0
+        ids = arquivo.pq.read_table(arquivo.caminho_particao(0, 2019, 5), columns=["id"])["id"].to_pylist()
+        assert len(ids) == len(set(ids)) == 1000
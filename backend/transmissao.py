@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+import respostas
+
+# Eventos pendentes por assinante; acima disso os mais antigos são descartados
+TAMANHO_FILA_ASSINANTE = 256
+
+
+class Assinante:
+    def __init__(self, tamanho_fila: int):
+        self.fila = asyncio.Queue(maxsize=tamanho_fila)
+        self.perdidos = 0
+
+
+class Difusor:
+    """
+    Distribui eventos de ingestão (leituras novas e deltas de rollup) para os
+    clientes conectados ao stream SSE. Cada assinante tem uma fila limitada:
+    um cliente lento perde os eventos mais antigos e é avisado, sem atrasar a
+    ingestão nem os demais. Vale para o processo atual (um difusor por worker).
+    """
+
+    def __init__(self, tamanho_fila: int = TAMANHO_FILA_ASSINANTE):
+        self.tamanho_fila = tamanho_fila
+        self._assinantes = set()
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @property
+    def total_assinantes(self) -> int:
+        return len(self._assinantes)
+
+    def assinar(self) -> Assinante:
+        # Chamado dentro do event loop, que passa a receber as publicações
+        assinante = Assinante(self.tamanho_fila)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._assinantes.add(assinante)
+        return assinante
+
+    def cancelar(self, assinante: Assinante):
+        with self._lock:
+            self._assinantes.discard(assinante)
+
+    def publicar(self, evento: str, dados):
+        """Pode ser chamado de qualquer thread (ex.: a do group commit)."""
+        with self._lock:
+            loop = self._loop if self._assinantes else None
+        if loop is None or loop.is_closed():
+            return
+        # Serializa uma única vez, fora do event loop
+        mensagem = b"event: " + evento.encode() + b"\ndata: " + respostas.dumps(dados) + b"\n\n"
+        loop.call_soon_threadsafe(self._entregar, mensagem)
+
+    def _entregar(self, mensagem: bytes):
+        with self._lock:
+            assinantes = list(self._assinantes)
+        for assinante in assinantes:
+            if assinante.fila.full():
+                assinante.fila.get_nowait()
+                assinante.perdidos += 1
+            assinante.fila.put_nowait(mensagem)
+
+    def publicar_lote(self, colunas: dict, deltas: dict):
+        """Ouvinte da ingestão: um evento por commit, não por linha."""
+        if not self._assinantes:
+            return
+        self.publicar("leituras", colunas)
+        self.publicar("rollups", deltas)
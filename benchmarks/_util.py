@@ -0,0 +1,59 @@
+"""
+Auxiliares comuns dos benchmarks desta pasta. Os scripts rodam como
+python benchmarks/bench_*.py, então a pasta já está no sys.path:
+
+    from _util import DIRETORIO_BACKEND, cronometrar, percentil
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+
+DIRETORIO_BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+
+def cronometrar(funcao, repeticoes=3):
+    """Melhor tempo (s) entre `repeticoes` execuções e o resultado da última."""
+    melhor, resultado = float("inf"), None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) de `valores`, pelo posto mais próximo."""
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def subir_servidor(caminho_db, porta):
+    """Aplica as migrações em `caminho_db` e sobe um uvicorn da API; retorna (processo, url)."""
+    # httpx só é necessário nos benchmarks da API
+    import httpx
+
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{caminho_db}")
+    # Como em produção: o esquema é criado pelas migrações antes de a API subir
+    subprocess.run([sys.executable, "migracoes.py", "aplicar"], cwd=DIRETORIO_BACKEND, env=env,
+                   check=True, stdout=subprocess.DEVNULL)
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(porta), "--log-level", "warning"],
+        cwd=DIRETORIO_BACKEND, env=env,
+    )
+    url = f"http://127.0.0.1:{porta}"
+    for _ in range(100):
+        try:
+            httpx.get(url + "/")
+            return processo, url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    processo.terminate()
+    raise RuntimeError("uvicorn não respondeu")
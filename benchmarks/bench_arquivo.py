@@ -0,0 +1,105 @@
+"""
+Benchmark de relatórios de vários anos: SQLite (linhas) vs arquivo Parquet.
+
+Gera leituras periódicas de várias usinas ao longo de alguns anos em um SQLite
+temporário, mede os relatórios direto no banco, arquiva tudo em Parquet
+(arquivo.arquivar) e mede os mesmos relatórios pelo arquivo.ler/agregar:
+
+    python benchmarks/bench_arquivo.py --usinas 10 --anos 2 --intervalo-min 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from _util import DIRETORIO_BACKEND, cronometrar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--usinas", type=int, default=10)
+    parser.add_argument("--anos", type=int, default=2)
+    parser.add_argument("--intervalo-min", type=int, default=5, help="minutos entre leituras")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["ARQUIVO_DIR"] = os.path.join(tmp, "arquivo")
+        sys.path.insert(0, DIRETORIO_BACKEND)
+        from sqlalchemy import select
+
+        import arquivo
+        import consultas
+        import database
+        import migracoes
+        import ingestao
+        import models
+
+        migracoes.aplicar(database.engine)
+        db = database.SessionLocal()
+        for i in range(args.usinas):
+            usina = models.Usina(nome=f"Usina {i}")
+            db.add(usina)
+            db.flush()
+            db.add(models.Dispositivo(usina_id=usina.id, nome="inversor"))
+        db.commit()
+
+        fim = datetime(2026, 1, 1)
+        inicio = fim - timedelta(days=365 * args.anos)
+        passo = args.intervalo_min * 60
+        instantes = inicio.timestamp() + np.arange(int((fim - inicio).total_seconds() // passo)) * float(passo)
+        rng = np.random.default_rng(0)
+        for dispositivo in range(1, args.usinas + 1):
+            for parte in np.array_split(instantes, max(1, len(instantes) // 50000)):
+                registros = np.zeros(len(parte), dtype=ingestao.DTYPE_REGISTRO)
+                registros["timestamp"] = parte
+                registros["dispositivo_id"] = dispositivo
+                registros["gerado_kwh"] = rng.uniform(0, 8, len(parte))
+                registros["consumido_kwh"] = rng.uniform(0, 6, len(parte))
+                ingestao.inserir_colunas(db, registros)
+        total = args.usinas * len(instantes)
+        d = models.DadoEnergia
+
+        relatorios = {
+            "série de 1 usina (colunas)": (
+                lambda: db.execute(select(d.timestamp, d.gerado_kwh).where(d.usina_id == 1)).all(),
+                lambda: arquivo.ler(db, usina_id=1, colunas=("timestamp", "gerado_kwh")),
+            ),
+            "diário de 1 usina": (
+                lambda: db.execute(consultas.consulta_agregada("1d", usina_id=1)).all(),
+                lambda: arquivo.agregar(db, "1d", usina_id=1),
+            ),
+            "mensal da frota": (
+                lambda: db.execute(consultas.consulta_agregada("1mo")).all(),
+                lambda: arquivo.agregar(db, "1mo"),
+            ),
+        }
+        tempos_sqlite = {nome: cronometrar(sqlite, args.repeticoes)[0] for nome, (sqlite, _) in relatorios.items()}
+        tamanho_sqlite = os.path.getsize(os.path.join(tmp, "bench.db"))
+
+        inicio_arquivo = time.perf_counter()
+        resumo = arquivo.arquivar(db, fim)
+        duracao_arquivo = time.perf_counter() - inicio_arquivo
+        tamanho_parquet = sum(
+            os.path.getsize(os.path.join(raiz, nome))
+            for raiz, _, nomes in os.walk(os.environ["ARQUIVO_DIR"]) for nome in nomes
+        )
+        tempos_arquivo = {nome: cronometrar(parquet, args.repeticoes)[0] for nome, (_, parquet) in relatorios.items()}
+        db.close()
+
+    print(f"leituras: {total} ({args.usinas} usinas x {args.anos} anos, a cada {args.intervalo_min} min)")
+    print(f"arquivamento: {resumo['particoes_arquivadas']} partições em {duracao_arquivo:.1f} s; "
+          f"SQLite {tamanho_sqlite / 2**20:.1f} MiB -> Parquet {tamanho_parquet / 2**20:.1f} MiB")
+    print(f"{'relatório':<30} {'SQLite ms':>10} {'Parquet ms':>11} {'ganho':>7}")
+    for nome in relatorios:
+        t_sqlite, t_arquivo = tempos_sqlite[nome], tempos_arquivo[nome]
+        print(f"{nome:<30} {t_sqlite * 1000:>10.1f} {t_arquivo * 1000:>11.1f} {t_sqlite / t_arquivo:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
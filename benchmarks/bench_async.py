@@ -0,0 +1,83 @@
+"""
+Benchmark do caminho síncrono (/dados) vs assíncrono (/async/dados).
+
+Sobe um uvicorn local contra um SQLite temporário e mede requisições/s e
+latência p99 com 50, 200 e 1000 clientes concorrentes:
+
+    python benchmarks/bench_async.py --duracao 5 --clientes 50 200 1000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+from _util import DIRETORIO_BACKEND, percentil, porta_livre, subir_servidor
+
+ROTAS = [
+    ("GET", "/dados?limite=100"),
+    ("GET", "/async/dados?limite=100"),
+    ("POST", "/dados"),
+    ("POST", "/async/dados"),
+]
+
+
+async def medir(url, metodo, rota, clientes, duracao, cabecalhos):
+    latencias, erros = [], 0
+    limites = httpx.Limits(max_connections=clientes, max_keepalive_connections=clientes)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=30, headers=cabecalhos) as cliente:
+        prazo = time.perf_counter() + duracao
+
+        async def trabalhador():
+            nonlocal erros
+            while time.perf_counter() < prazo:
+                inicio = time.perf_counter()
+                try:
+                    if metodo == "GET":
+                        r = await cliente.get(rota)
+                    else:
+                        r = await cliente.post(rota, json={"gerado_kwh": 3.2, "consumido_kwh": 2.1})
+                    if r.status_code >= 400:
+                        erros += 1
+                except httpx.HTTPError:
+                    erros += 1
+                latencias.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabalhador() for _ in range(clientes)))
+        total = time.perf_counter() - inicio
+    return len(latencias) / total, percentil(latencias, 99) * 1000, erros
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duracao", type=float, default=5.0, help="segundos por cenário")
+    parser.add_argument("--clientes", type=int, nargs="+", default=[50, 200, 1000])
+    args = parser.parse_args()
+
+    sys.path.insert(0, DIRETORIO_BACKEND)
+    import auth
+
+    cabecalhos = {"Authorization": "Bearer " + auth.criar_token({"sub": "benchmark"})}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        processo, url = subir_servidor(os.path.join(tmp, "bench.db"), porta_livre())
+        try:
+            leituras = [{"gerado_kwh": 1.0, "consumido_kwh": 0.5}] * 5000
+            httpx.post(url + "/dados/lote", json=leituras, timeout=60).raise_for_status()
+
+            print(f"{'clientes':>8}  {'rota':<28} {'req/s':>9} {'p99 (ms)':>9} {'erros':>6}")
+            for clientes in args.clientes:
+                for metodo, rota in ROTAS:
+                    rps, p99, erros = asyncio.run(medir(url, metodo, rota, clientes, args.duracao, cabecalhos))
+                    print(f"{clientes:>8}  {metodo + ' ' + rota:<28} {rps:>9.0f} {p99:>9.1f} {erros:>6}")
+        finally:
+            processo.terminate()
+            processo.wait()
+
+
+if __name__ == "__main__":
+    main()
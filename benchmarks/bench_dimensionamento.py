@@ -0,0 +1,94 @@
+"""
+Benchmark do otimizador de dimensionamento (painel_admin/dimensionamento.py).
+
+Compara a busca por refinamento de grade com a força bruta em uma grade
+densa (avaliar em todos os pontos, um candidato por chamada, como o
+simulador faria mudando o slider de potência) e confere que os ótimos
+coincidem dentro do passo da grade densa:
+
+    python benchmarks/bench_dimensionamento.py --passo-kwp 0.05 --passo-kwh 0.5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from _util import cronometrar
+
+DIRETORIO_PAINEL = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "painel_admin"))
+
+# (rótulo, objetivo, bateria máxima em kWh, parâmetros de custo e tarifa)
+CASOS = (
+    ("payback, sem bateria", "payback", 0.0, {}),
+    ("VPL, compensação baixa", "vpl", 0.0, {"tarifa_compensacao": 0.10, "custo_kwp": 4500.0}),
+    ("VPL, bateria até 30 kWh", "vpl", 30.0, {"tarifa_compensacao": 0.10, "custo_bateria_kwh": 1500.0}),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--passo-kwp", type=float, default=0.05)
+    parser.add_argument("--passo-kwh", type=float, default=0.5)
+    parser.add_argument("--amostra", type=int, default=20, help="pontos avaliados um a um para extrapolar")
+    args = parser.parse_args()
+
+    sys.path.insert(0, DIRETORIO_PAINEL)
+    import dimensionamento
+    import fotovoltaico
+    import sensibilidade
+
+    base = sensibilidade.BASE
+    instantes = fotovoltaico.instantes_ano(base["ano"])
+    geracao_kwp = fotovoltaico.simular(
+        instantes, 1.0, latitude=base["latitude"], longitude=base["longitude"], inclinacao=base["inclinacao"],
+        azimute=base["azimute"], transmitancia=base["intensidade_sol"] / 100,
+        temperatura_ambiente=fotovoltaico.temperatura_tipica(instantes),
+    ).energia_kwh
+    consumido = sensibilidade._perfil_consumo([base["consumo_base"]], len(instantes), 0)[:, 0]
+    hora = np.arange(len(instantes)) % 24
+    pico = (hora >= 18) & (hora <= 21)
+    potencia_max = 2 * consumido.sum() / geracao_kwp.sum()
+
+    print(f"{'caso':<28} {'pontos':>8} {'força bruta':>12} {'otimizar':>10} {'ganho':>8}  ótimo (kWp / kWh)")
+    for rotulo, objetivo, bateria_max, parametros in CASOS:
+        tarifas = {"tarifa_normal": base["tarifa_normal"], "tarifa_pico": base["tarifa_pico"],
+                   "tarifa_compensacao": base["tarifa_compensacao"]}
+        tarifas.update((k, parametros.pop(k)) for k in list(parametros) if k in tarifas)
+        potencias = np.arange(0.5, potencia_max + 1e-9, args.passo_kwp)
+        baterias = np.arange(0.0, bateria_max + 1e-9, args.passo_kwh) if bateria_max > 0 else np.zeros(1)
+        potencia, bateria = (g.ravel() for g in np.meshgrid(potencias, baterias, indexing="ij"))
+
+        def avaliar(indices):
+            return dimensionamento.avaliar(geracao_kwp, consumido, pico, potencia[indices], bateria[indices],
+                                           **tarifas, **parametros)
+
+        # Força bruta: um candidato por chamada, extrapolado da amostra; ótimo pela grade inteira em lote
+        amostra = np.random.default_rng(0).choice(len(potencia), min(args.amostra, len(potencia)), replace=False)
+        inicio = time.perf_counter()
+        for i in amostra:
+            avaliar([i])
+        t_bruta = (time.perf_counter() - inicio) / len(amostra) * len(potencia)
+        # Em blocos: com bateria a grade densa passa de 10^4 candidatos x 8760 horas
+        blocos = [avaliar(bloco) for bloco in np.array_split(np.arange(len(potencia)), -(-len(potencia) // 2000))]
+        densa = dimensionamento.Avaliacao(*(np.concatenate(campo) for campo in zip(*blocos)))
+        criterio = densa.vpl if objetivo == "vpl" else -densa.payback_anos
+        referencia = np.argmax(criterio)
+
+        t_otimizar, resultado = cronometrar(lambda: dimensionamento.otimizar(
+            geracao_kwp, consumido, pico, objetivo=objetivo, potencia_max=potencia_max, bateria_max=bateria_max,
+            **tarifas, **parametros), repeticoes=1)
+        otimo = resultado.otimo
+        valor = otimo.vpl if objetivo == "vpl" else -otimo.payback_anos
+        # A busca não pode ficar atrás da grade densa (objetivo plano perto do ótimo: 0,1%)
+        assert valor >= criterio[referencia] - 1e-3 * abs(criterio[referencia]), \
+            (rotulo, otimo, potencia[referencia], bateria[referencia])
+
+        print(f"{rotulo:<28} {len(potencia):>8} {t_bruta:>11.2f}s {t_otimizar:>9.2f}s {t_bruta / t_otimizar:>7.0f}x"
+              f"  {otimo.potencia_kwp:.2f} / {otimo.bateria_kwh:.1f}"
+              f"  (densa: {potencia[referencia]:.2f} / {bateria[referencia]:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark do motor financeiro do simulador: df.apply por linha vs financeiro.py.
+
+Compara a versão antiga de calcular_financeiro (quatro df.apply(axis=1))
+com financeiro.calcular em um ano horário, e com financeiro.totais em uma
+matriz 8760 x N de cenários (geração, consumo e tarifa variando por
+cenário). O apply é medido em --amostra cenários e extrapolado para N:
+
+    python benchmarks/bench_financeiro.py --cenarios 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from _util import cronometrar
+
+DIRETORIO_PAINEL = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "painel_admin"))
+
+HORAS_ANO = 8760
+
+
+def calcular_financeiro_apply(df, tarifa_normal, tarifa_pico, tarifa_compensacao):
+    # Cópia da versão anterior de pages/1_Simulador.py, usada como referência
+    df["Economia_Consumo"] = df.apply(
+        lambda row: min(row["Gerado (kWh)"], row["Consumido (kWh)"]) * (tarifa_pico if row["Horario_Pico"] else tarifa_normal),
+        axis=1
+    )
+    df["Ganho_Excedente"] = df.apply(
+        lambda row: max(0, row["Excedente (kWh)"]) * tarifa_compensacao,
+        axis=1
+    )
+    df["Custo_Sem_Solar"] = df.apply(
+        lambda row: row["Consumido (kWh)"] * (tarifa_pico if row["Horario_Pico"] else tarifa_normal),
+        axis=1
+    )
+    df["Custo_Real"] = df.apply(
+        lambda row: max(0, row["Consumido (kWh)"] - row["Gerado (kWh)"]) * (tarifa_pico if row["Horario_Pico"] else tarifa_normal),
+        axis=1
+    )
+    df["Economia_Total"] = df["Economia_Consumo"] + df["Ganho_Excedente"]
+    return df
+
+
+def quadro(gerado, consumido, pico):
+    df = pd.DataFrame({"Gerado (kWh)": gerado, "Consumido (kWh)": consumido, "Horario_Pico": pico})
+    df["Excedente (kWh)"] = np.round(df["Gerado (kWh)"] - df["Consumido (kWh)"], 2)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cenarios", type=int, default=1000, help="colunas da matriz 8760 x N")
+    parser.add_argument("--amostra", type=int, default=3, help="cenários rodados com apply para extrapolar")
+    args = parser.parse_args()
+
+    sys.path.insert(0, DIRETORIO_PAINEL)
+    import financeiro
+
+    rng = np.random.default_rng(0)
+    hora = np.arange(HORAS_ANO) % 24
+    pico = (hora >= 18) & (hora <= 21)
+    sol = np.clip(np.sin((hora - 6) / 12 * np.pi), 0, None)
+    gerado = np.round(sol[:, None] * rng.uniform(0, 8, (HORAS_ANO, args.cenarios)), 2)
+    consumido = np.round(np.clip(rng.normal(4, 1.2, (HORAS_ANO, args.cenarios)), 0, None), 2)
+    tarifa_normal = rng.uniform(0.55, 0.80, args.cenarios)
+    tarifa_pico, tarifa_compensacao = 0.85, 0.50
+
+    # Um ano horário, um cenário
+    t_apply, df = cronometrar(
+        lambda: calcular_financeiro_apply(quadro(gerado[:, 0], consumido[:, 0], pico), tarifa_normal[0],
+                                          tarifa_pico, tarifa_compensacao), repeticoes=1)
+    t_vetor, resultado = cronometrar(
+        lambda: financeiro.calcular(gerado[:, 0], consumido[:, 0], pico, tarifa_normal[0], tarifa_pico,
+                                    tarifa_compensacao), repeticoes=20)
+    np.testing.assert_allclose(resultado.economia_total, df["Economia_Total"], atol=1e-9)
+    np.testing.assert_allclose(resultado.custo_real, df["Custo_Real"], atol=1e-9)
+
+    # Matriz 8760 x N: apply medido na amostra e extrapolado
+    amostra = min(args.amostra, args.cenarios)
+    inicio = time.perf_counter()
+    referencia = [
+        calcular_financeiro_apply(quadro(gerado[:, j], consumido[:, j], pico), tarifa_normal[j],
+                                  tarifa_pico, tarifa_compensacao)["Economia_Total"].sum()
+        for j in range(amostra)
+    ]
+    t_apply_n = (time.perf_counter() - inicio) / amostra * args.cenarios
+    t_totais, totais = cronometrar(
+        lambda: financeiro.totais(gerado, consumido, pico, tarifa_normal, tarifa_pico, tarifa_compensacao))
+    np.testing.assert_allclose(totais.economia_total[:amostra], referencia, rtol=1e-9)
+
+    print(f"{'caso':<34} {'apply':>12} {'NumPy':>12} {'ganho':>10}")
+    print(f"{'1 cenário x 8760 h (calcular)':<34} {t_apply * 1000:>10.1f}ms {t_vetor * 1000:>10.3f}ms "
+          f"{t_apply / t_vetor:>9.0f}x")
+    print(f"{f'{args.cenarios} cenários x 8760 h (totais)':<34} {t_apply_n:>11.1f}s {t_totais * 1000:>10.1f}ms "
+          f"{t_apply_n / t_totais:>9.0f}x  (apply extrapolado de {amostra})")
+
+
+if __name__ == "__main__":
+    main()
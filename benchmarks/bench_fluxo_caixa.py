@@ -0,0 +1,92 @@
+"""
+Benchmark do fluxo de caixa e dos indicadores (VPL, TIR, payback) de financeiro.py.
+
+Compara o laço por cenário (fluxo montado ano a ano e TIR pelas raízes
+do polinômio, como o antigo numpy.irr) com fluxo_caixa + indicadores em
+uma chamada para N conjuntos de premissas:
+
+    python benchmarks/bench_fluxo_caixa.py --cenarios 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from _util import cronometrar
+
+DIRETORIO_PAINEL = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "painel_admin"))
+
+
+def fluxo_laco(economia, investimento, anos, reajuste, degradacao, om, inflacao, ano_inversor, inversor):
+    fluxos = [-investimento]
+    for ano in range(1, anos + 1):
+        valor = economia * (1 + reajuste) ** (ano - 1) * (1 - degradacao) ** (ano - 1)
+        valor -= investimento * om * (1 + inflacao) ** (ano - 1)
+        if ano == ano_inversor:
+            valor -= investimento * inversor * (1 + inflacao) ** (ano - 1)
+        fluxos.append(valor)
+    return np.array(fluxos)
+
+
+def tir_raizes(fluxos):
+    # Raízes reais positivas de sum(f_t x^t) com x = 1/(1+r); a mais próxima de r = 0
+    raizes = np.roots(fluxos[::-1])
+    reais = raizes[(raizes.imag == 0) & (raizes.real > 0)].real
+    if len(reais) == 0:
+        return np.nan
+    taxas = 1 / reais - 1
+    return taxas[np.argmin(np.abs(taxas))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cenarios", type=int, default=10000)
+    parser.add_argument("--anos", type=int, default=25)
+    parser.add_argument("--amostra", type=int, default=1000, help="cenários rodados no laço para extrapolar")
+    args = parser.parse_args()
+
+    sys.path.insert(0, DIRETORIO_PAINEL)
+    import financeiro
+
+    rng = np.random.default_rng(0)
+    n = args.cenarios
+    premissas = {
+        "economia": rng.uniform(1500, 6000, n), "investimento": rng.uniform(10000, 40000, n),
+        "reajuste": rng.uniform(0.03, 0.09, n), "degradacao": rng.uniform(0.0, 0.01, n),
+        "om": rng.uniform(0.0, 0.02, n), "inflacao": rng.uniform(0.03, 0.06, n),
+        "ano_inversor": rng.integers(8, 16, n), "inversor": rng.uniform(0.10, 0.20, n),
+    }
+    taxa = rng.uniform(0.05, 0.12, n)
+
+    amostra = min(args.amostra, n)
+    inicio = time.perf_counter()
+    referencia = []
+    for i in range(amostra):
+        fluxos = fluxo_laco(*(premissas[k][i] for k in ("economia", "investimento")), args.anos,
+                            *(premissas[k][i] for k in ("reajuste", "degradacao", "om", "inflacao",
+                                                         "ano_inversor", "inversor")))
+        referencia.append((np.sum(fluxos / (1 + taxa[i]) ** np.arange(len(fluxos))), tir_raizes(fluxos)))
+    t_laco = (time.perf_counter() - inicio) / amostra * n
+
+    def vetorizado():
+        fluxos = financeiro.fluxo_caixa(
+            financeiro.economias_anuais(premissas["economia"], args.anos, premissas["reajuste"]),
+            premissas["investimento"], premissas["degradacao"], premissas["om"], premissas["inflacao"],
+            premissas["ano_inversor"], premissas["inversor"],
+        )
+        return financeiro.indicadores(fluxos, taxa)
+
+    t_vetor, resultado = cronometrar(vetorizado)
+    vpl_ref, tir_ref = np.array(referencia).T
+    np.testing.assert_allclose(resultado.vpl[:amostra], vpl_ref, rtol=1e-9)
+    np.testing.assert_allclose(resultado.tir[:amostra], tir_ref, rtol=1e-6, atol=1e-9)
+
+    print(f"{'caso':<36} {'laço':>10} {'NumPy':>10} {'ganho':>8}")
+    print(f"{f'{n} cenários x {args.anos} anos':<36} {t_laco:>9.2f}s {t_vetor * 1000:>8.1f}ms "
+          f"{t_laco / t_vetor:>7.0f}x  (laço extrapolado de {amostra})")
+
+
+if __name__ == "__main__":
+    main()
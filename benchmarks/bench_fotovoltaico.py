@@ -0,0 +1,48 @@
+"""
+Benchmark do modelo fotovoltaico (painel_admin/fotovoltaico.py).
+
+Mede um ano inteiro, horário e de 15 minutos, para um sistema e para N
+sistemas no mesmo local (potência, inclinação e azimute variando):
+
+    python benchmarks/bench_fotovoltaico.py --sistemas 1000
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from _util import cronometrar
+
+DIRETORIO_PAINEL = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "painel_admin"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sistemas", type=int, default=1000)
+    parser.add_argument("--ano", type=int, default=2025)
+    args = parser.parse_args()
+
+    sys.path.insert(0, DIRETORIO_PAINEL)
+    import fotovoltaico
+
+    rng = np.random.default_rng(0)
+    potencia = rng.uniform(5, 100, args.sistemas)
+    inclinacao = rng.uniform(0, 40, args.sistemas)
+    azimute = rng.uniform(-60, 60, args.sistemas)
+
+    print(f"{'caso':<36} {'tempo':>10} {'kWh/kWp':>9}")
+    for passo in (60, 15):
+        instantes = fotovoltaico.instantes_ano(args.ano, passo)
+        temperatura = fotovoltaico.temperatura_tipica(instantes)
+        tempo, r = cronometrar(lambda: fotovoltaico.simular(instantes, 75.0, temperatura_ambiente=temperatura))
+        print(f"{f'1 sistema x {len(instantes)} intervalos':<36} {tempo * 1000:>8.1f}ms "
+              f"{r.energia_kwh.sum() / 75.0:>9.0f}")
+        tempo, r = cronometrar(lambda: fotovoltaico.simular(
+            instantes, potencia, inclinacao=inclinacao, azimute=azimute, temperatura_ambiente=temperatura))
+        print(f"{f'{args.sistemas} sistemas x {len(instantes)} intervalos':<36} {tempo * 1000:>8.1f}ms "
+              f"{np.median(r.energia_kwh.sum(axis=0) / potencia):>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark de ingestão: POST /dados/lote (JSON) vs POST /dados/binario.
+
+Envia lotes com os mesmos campos (dispositivo_id, timestamp, gerado e
+consumido) nos dois formatos para um SQLite temporário e mede o tempo da
+requisição e o tamanho do corpo. Cada envio usa timestamps novos: com a
+deduplicação por (dispositivo_id, timestamp), repetir o mesmo lote mediria
+só a checagem de duplicados.
+
+    python benchmarks/bench_ingestao_binaria.py --linhas 50000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from _util import DIRETORIO_BACKEND
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, default=50000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        sys.path.insert(0, DIRETORIO_BACKEND)
+        from fastapi.testclient import TestClient
+
+        import database
+        import ingestao
+        import main as app_main
+        import migracoes
+
+        migracoes.aplicar(database.engine)
+
+        rng = np.random.default_rng(0)
+        agora = int(time.time())
+
+        def gerar_lote(indice):
+            # Cada lote ocupa a sua própria faixa de minutos, sem repetir (dispositivo_id, timestamp)
+            registros = np.zeros(args.linhas, dtype=ingestao.DTYPE_REGISTRO)
+            registros["timestamp"] = agora - (indice * args.linhas + np.arange(args.linhas)[::-1]) * 60
+            registros["dispositivo_id"] = rng.integers(1, 500, args.linhas)
+            registros["gerado_kwh"] = rng.uniform(0, 8, args.linhas)
+            registros["consumido_kwh"] = rng.uniform(0, 6, args.linhas)
+            return registros
+
+        def corpo_json(registros):
+            return json.dumps([
+                {"dispositivo_id": int(d), "timestamp": datetime.fromtimestamp(t, timezone.utc).isoformat(),
+                 "gerado_kwh": float(g), "consumido_kwh": float(c)}
+                for t, d, g, c in registros.tolist()
+            ]).encode()
+
+        corpos = {"json": [], "binario": []}
+        for repeticao in range(args.repeticoes):
+            corpos["json"].append(corpo_json(gerar_lote(2 * repeticao)))
+            corpos["binario"].append(gerar_lote(2 * repeticao + 1).tobytes())
+
+        rotas = {"json": ("/dados/lote", "application/json"),
+                 "binario": ("/dados/binario", "application/octet-stream")}
+        tempos = {"json": [], "binario": []}
+        with TestClient(app_main.app) as cliente:
+            for repeticao in range(args.repeticoes):
+                for formato, (rota, tipo) in rotas.items():
+                    inicio = time.perf_counter()
+                    resposta = cliente.post(rota, content=corpos[formato][repeticao], headers={"Content-Type": tipo})
+                    tempos[formato].append(time.perf_counter() - inicio)
+                    resposta.raise_for_status()
+                    # Todo envio grava o lote inteiro: nada foi descartado como duplicado
+                    assert resposta.json()["inseridos"] == args.linhas, resposta.json()
+
+    t_json, t_bin = min(tempos["json"]), min(tempos["binario"])
+    corpo_json, corpo_binario = corpos["json"][0], corpos["binario"][0]
+    print(f"linhas: {args.linhas}")
+    print(f"{'formato':<10} {'corpo (bytes)':>14} {'tempo ms':>10} {'linhas/s':>12}")
+    print(f"{'json':<10} {len(corpo_json):>14} {t_json * 1000:>10.1f} {args.linhas / t_json:>12.0f}")
+    print(f"{'binario':<10} {len(corpo_binario):>14} {t_bin * 1000:>10.1f} {args.linhas / t_bin:>12.0f}")
+    print(f"ganho: {t_json / t_bin:.1f}x no tempo, {len(corpo_json) / len(corpo_binario):.1f}x no tamanho")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark de ingestão: POST /dados (uma linha por requisição) vs POST /dados/lote.
+
+Roda contra um SQLite temporário, sem tocar no dados.db do projeto:
+
+    python benchmarks/bench_ingestao_lote.py --linhas 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from _util import DIRETORIO_BACKEND
+
+
+def carregar_app(caminho_db):
+    os.environ["DATABASE_URL"] = f"sqlite:///{caminho_db}"
+    # Sem janela de group commit: cada POST /dados vira um commit próprio,
+    # que é o caminho por linha usado como referência
+    os.environ.setdefault("INGESTAO_INTERVALO_MS", "0")
+    sys.path.insert(0, DIRETORIO_BACKEND)
+    import database
+    import main
+    import migracoes
+
+    migracoes.aplicar(database.engine)
+    from fastapi.testclient import TestClient
+
+    return TestClient(main.app)
+
+
+def gerar_leituras(n):
+    return [
+        {"gerado_kwh": round(random.uniform(0, 8), 3), "consumido_kwh": round(random.uniform(0, 6), 3)}
+        for _ in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cliente = carregar_app(os.path.join(tmp, "bench.db"))
+        leituras = gerar_leituras(args.linhas)
+
+        inicio = time.perf_counter()
+        for leitura in leituras:
+            cliente.post("/dados", json=leitura).raise_for_status()
+        tempo_linha = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        resposta = cliente.post("/dados/lote", json=leituras)
+        resposta.raise_for_status()
+        tempo_lote = time.perf_counter() - inicio
+
+    taxa_linha = args.linhas / tempo_linha
+    taxa_lote = args.linhas / tempo_lote
+    print(f"linhas:              {args.linhas}")
+    print(f"POST /dados:         {tempo_linha:8.3f} s  ({taxa_linha:10.0f} linhas/s)")
+    print(f"POST /dados/lote:    {tempo_lote:8.3f} s  ({taxa_lote:10.0f} linhas/s)")
+    print(f"  (servidor reportou {resposta.json()['linhas_por_segundo']} linhas/s)")
+    print(f"ganho:               {taxa_lote / taxa_linha:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Teste de estresse leitura/escrita concorrente por perfil de armazenamento.
+
+Enquanto threads leitoras rodam agregações longas sobre todos os dados
+brutos, uma thread escritora grava lotes pequenos (como o group commit do
+POST /dados) e mede a latência de cada commit. Cada perfil roda em um
+processo separado, com SQLite temporário:
+
+    python benchmarks/bench_leitura_escrita.py --linhas 300000 --duracao 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from _util import DIRETORIO_BACKEND, percentil
+
+PERFIS = ["padrao", "producao"]
+
+
+def executar_perfil(linhas, duracao, leitores):
+    # Roda dentro do subprocesso, com DATABASE_URL/PERFIL_ARMAZENAMENTO já definidos
+    sys.path.insert(0, DIRETORIO_BACKEND)
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import insert
+
+    import consultas
+    import database
+    import migracoes
+    import ingestao
+    import models
+
+    migracoes.aplicar(database.engine)
+    base = datetime(2024, 1, 1)
+    with database.SessionLocal() as db:
+        for inicio in range(0, linhas, 50000):
+            db.execute(insert(models.DadoEnergia), [
+                {"timestamp": base + timedelta(minutes=i), "gerado_kwh": 1.0, "consumido_kwh": 0.5}
+                for i in range(inicio, min(linhas, inicio + 50000))
+            ])
+        db.commit()
+
+    parar = threading.Event()
+    consultas_lidas = [0]
+
+    def leitor():
+        while not parar.is_set():
+            with database.SessionLeitura() as db:
+                db.execute(consultas.consulta_agregada("15m")).all()
+            consultas_lidas[0] += 1
+
+    latencias, erros = [], 0
+    threads = [threading.Thread(target=leitor, daemon=True) for _ in range(leitores)]
+    for t in threads:
+        t.start()
+    prazo = time.perf_counter() + duracao
+    while time.perf_counter() < prazo:
+        inicio = time.perf_counter()
+        try:
+            with database.SessionLocal() as db:
+                ingestao.inserir_lote(db, [{"gerado_kwh": 2.0, "consumido_kwh": 1.0}] * 20)
+        except Exception:
+            erros += 1
+        latencias.append(time.perf_counter() - inicio)
+    parar.set()
+    for t in threads:
+        t.join()
+
+    return {
+        "commits": len(latencias),
+        "erros": erros,
+        "escrita_p50_ms": percentil(latencias, 50) * 1000,
+        "escrita_p99_ms": percentil(latencias, 99) * 1000,
+        "escrita_max_ms": max(latencias) * 1000,
+        "agregacoes_lidas": consultas_lidas[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, default=300000)
+    parser.add_argument("--duracao", type=float, default=10.0)
+    parser.add_argument("--leitores", type=int, default=2)
+    parser.add_argument("--perfil", choices=PERFIS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.perfil:
+        print(json.dumps(executar_perfil(args.linhas, args.duracao, args.leitores)))
+        return
+
+    print(f"{'perfil':<10} {'commits':>8} {'erros':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'leituras':>9}")
+    for perfil in PERFIS:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, PERFIL_ARMAZENAMENTO=perfil,
+                       DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'estresse.db')}")
+            saida = subprocess.run(
+                [sys.executable, __file__, "--perfil", perfil, "--linhas", str(args.linhas),
+                 "--duracao", str(args.duracao), "--leitores", str(args.leitores)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+        r = json.loads(saida.strip().splitlines()[-1])
+        print(f"{perfil:<10} {r['commits']:>8} {r['erros']:>6} {r['escrita_p50_ms']:>8.1f} "
+              f"{r['escrita_p99_ms']:>8.1f} {r['escrita_max_ms']:>8.1f} {r['agregacoes_lidas']:>9}")
+
+
+if __name__ == "__main__":
+    main()
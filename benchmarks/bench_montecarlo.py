@@ -0,0 +1,80 @@
+"""
+Benchmark do Monte Carlo de retorno (painel_admin/montecarlo.py).
+
+Compara com a forma direta: para cada cenário e ano, expandir os fatores
+diários de clima e consumo para as 8760 horas e somar com financeiro.totais.
+A forma direta é medida em --amostra anos-cenário e extrapolada; o
+montecarlo.simular roda inteiro, com 1 processo e com todos os núcleos:
+
+    python benchmarks/bench_montecarlo.py --cenarios 10000 --anos 25
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from _util import cronometrar
+
+DIRETORIO_PAINEL = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "painel_admin"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cenarios", type=int, default=10000)
+    parser.add_argument("--anos", type=int, default=25)
+    parser.add_argument("--amostra", type=int, default=500, help="anos-cenário rodados da forma direta")
+    parser.add_argument("--repeticoes", type=int, default=1)
+    args = parser.parse_args()
+
+    sys.path.insert(0, DIRETORIO_PAINEL)
+    import financeiro
+    import fotovoltaico
+    import montecarlo
+
+    instantes = fotovoltaico.instantes_ano(2025)
+    gerado = fotovoltaico.simular(instantes, 5.0, transmitancia=0.75,
+                                  temperatura_ambiente=fotovoltaico.temperatura_tipica(instantes)).energia_kwh
+    hora = np.arange(len(gerado)) % 24
+    pico = (hora >= 18) & (hora <= 21)
+    consumido = np.clip(np.random.default_rng(0).normal(1.2, 0.4, len(gerado)), 0, None)
+    tarifas = (0.65, 0.85, 0.50)
+    investimento = 15000.0
+
+    # Forma direta: fatores diários expandidos para horas, um ano-cenário por coluna
+    rng = np.random.default_rng(1)
+    dias = len(gerado) // 24
+    clima = np.exp(rng.normal(-0.3**2 / 2, 0.3, (dias, args.amostra)))
+    consumo = np.exp(rng.normal(-0.15**2 / 2, 0.15, (dias, args.amostra)))
+    t_direto, direto = cronometrar(lambda: financeiro.totais(
+        gerado[:, None] * np.repeat(clima, 24, axis=0), consumido[:, None] * np.repeat(consumo, 24, axis=0),
+        pico, *tarifas).economia_total, repeticoes=1)
+    t_direto_total = t_direto / args.amostra * args.cenarios * args.anos
+
+    def rodar(processos):
+        return montecarlo.simular(gerado, consumido, pico, *tarifas, investimento, cenarios=args.cenarios,
+                                  anos=args.anos, clima_desvio_anual=0.0, consumo_desvio_anual=0.0,
+                                  processos=processos)
+
+    nucleos = os.cpu_count() or 1
+    t_serial, resultado = cronometrar(lambda: rodar(1), args.repeticoes)
+
+    # Mesma distribuição de clima/consumo: a economia média do 1º ano deve bater
+    media_direta, media_mc = direto.mean(), resultado.fluxos[:, 1].mean()
+    print(f"economia média no ano 1: direta {media_direta:,.2f}  Monte Carlo {media_mc:,.2f} "
+          f"({(media_mc / media_direta - 1) * 100:+.2f}%)")
+    print(f"{'caso':<40} {'tempo':>10} {'ganho':>9}")
+    caso = f"{args.cenarios} cenários x {args.anos} anos"
+    print(f"{caso + ' (direto, extrap.)':<40} {t_direto_total:>9.1f}s")
+    print(f"{caso + ' (1 processo)':<40} {t_serial:>9.2f}s {t_direto_total / t_serial:>8.0f}x")
+    if nucleos > 1:
+        t_paralelo, _ = cronometrar(lambda: rodar(nucleos), args.repeticoes)
+        print(f"{caso + f' ({nucleos} processos)':<40} {t_paralelo:>9.2f}s {t_direto_total / t_paralelo:>8.0f}x")
+    resumo = resultado.percentis()
+    for nome in ("payback_anos", "vpl", "tir"):
+        print(f"  {nome:<13}" + "  ".join(f"{p} {v:>12,.3f}" for p, v in resumo[nome].items()))
+    print(f"  {'sem TIR':<13}{resumo['fracao_sem_tir']:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
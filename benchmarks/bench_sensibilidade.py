@@ -0,0 +1,89 @@
+"""
+Benchmark da varredura de sensibilidade (painel_admin/sensibilidade.py).
+
+Compara com o que o simulador faz a cada mudança de slider: modelo
+fotovoltaico do ano, totais financeiros e fluxo de caixa de um ponto.
+O ponto a ponto é medido em --amostra pontos e extrapolado para a grade;
+sensibilidade.varrer roda a grade inteira:
+
+    python benchmarks/bench_sensibilidade.py --grade 50 50 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from _util import cronometrar
+
+DIRETORIO_PAINEL = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "painel_admin"))
+
+FAIXAS = {
+    "intensidade_sol": (50, 150),
+    "potencia_kwp": (1, 20),
+    "consumo_base": (1, 10),
+    "tarifa_normal": (0.4, 1.0),
+}
+GRADES = (
+    ("intensidade_sol", "consumo_base", "tarifa_normal"),
+    ("intensidade_sol", "potencia_kwp", "consumo_base"),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--grade", type=int, nargs=3, default=[50, 50, 20], metavar="N")
+    parser.add_argument("--amostra", type=int, default=20, help="pontos avaliados um a um para extrapolar")
+    args = parser.parse_args()
+
+    sys.path.insert(0, DIRETORIO_PAINEL)
+    import financeiro
+    import fotovoltaico
+    import sensibilidade
+
+    base = sensibilidade.BASE
+    instantes = fotovoltaico.instantes_ano(base["ano"])
+    temperatura = fotovoltaico.temperatura_tipica(instantes)
+    hora = np.arange(len(instantes)) % 24
+    pico = (hora >= 18) & (hora <= 21)
+
+    def ponto(parametros):
+        p = {**base, **parametros}
+        gerado = fotovoltaico.simular(instantes, p["potencia_kwp"], latitude=p["latitude"], longitude=p["longitude"],
+                                      inclinacao=p["inclinacao"], azimute=p["azimute"],
+                                      transmitancia=p["intensidade_sol"] / 100, temperatura_ambiente=temperatura)
+        consumido = sensibilidade._perfil_consumo([p["consumo_base"]], len(instantes), 0)[:, 0]
+        economia = financeiro.totais(gerado.energia_kwh, consumido, pico, p["tarifa_normal"], p["tarifa_pico"],
+                                     p["tarifa_compensacao"]).economia_total
+        fluxos = financeiro.fluxo_caixa(financeiro.economias_anuais(economia, reajuste=p["reajuste"]),
+                                        p["investimento"])
+        return financeiro.payback(fluxos)
+
+    print(f"{'grade':<56} {'ponto a ponto':>14} {'varrer':>10} {'ganho':>8}")
+    for nomes in GRADES:
+        faixas = {nome: np.linspace(*FAIXAS[nome], n) for nome, n in zip(nomes, args.grade)}
+        pontos = int(np.prod(args.grade))
+        rng = np.random.default_rng(0)
+        amostra = [{nome: rng.choice(valores) for nome, valores in faixas.items()} for _ in range(args.amostra)]
+        inicio = time.perf_counter()
+        for parametros in amostra:
+            ponto(parametros)
+        t_ponto = (time.perf_counter() - inicio) / args.amostra * pontos
+        t_varrer, resultado = cronometrar(lambda: sensibilidade.varrer(faixas), repeticoes=1)
+
+        # Confere um ponto da grade contra o cálculo direto
+        indice = tuple(n // 3 for n in args.grade)
+        direto = ponto({nome: faixas[nome][i] for nome, i in zip(nomes, indice)})
+        np.testing.assert_allclose(resultado.payback_anos[indice], direto, rtol=1e-9)
+
+        caso = " x ".join(f"{nome} {n}" for nome, n in zip(nomes, args.grade))
+        print(f"{caso:<56} {t_ponto:>13.1f}s {t_varrer:>9.2f}s {t_ponto / t_varrer:>7.0f}x")
+
+    faixas = {nome: np.linspace(*limites, 2) for nome, limites in FAIXAS.items()}
+    t_tornado, _ = cronometrar(lambda: sensibilidade.tornado(faixas))
+    print(f"{f'tornado ({len(faixas)} parâmetros)':<56} {'':>14} {t_tornado:>9.2f}s")
+
+
+if __name__ == "__main__":
+    main()
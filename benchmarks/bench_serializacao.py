@@ -0,0 +1,70 @@
+"""
+Benchmark de serialização do GET /dados por 100 mil linhas.
+
+Compara o caminho antigo (objetos ORM -> jsonable_encoder -> json) com as
+tuplas serializadas por respostas.py (registros e colunar), num SQLite
+temporário:
+
+    python benchmarks/bench_serializacao.py --linhas 100000
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+
+from _util import DIRETORIO_BACKEND, cronometrar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        sys.path.insert(0, DIRETORIO_BACKEND)
+        from datetime import datetime, timedelta
+
+        from fastapi.encoders import jsonable_encoder
+        from sqlalchemy import insert
+
+        import consultas
+        import database
+        import migracoes
+        import models
+        import respostas
+
+        migracoes.aplicar(database.engine)
+        base = datetime(2025, 1, 1)
+        with database.SessionLocal() as db:
+            db.execute(insert(models.DadoEnergia), [
+                {"timestamp": base + timedelta(minutes=i), "gerado_kwh": i % 800 / 100, "consumido_kwh": 2.5}
+                for i in range(args.linhas)
+            ])
+            db.commit()
+
+            t_orm, objetos = cronometrar(lambda: db.query(models.DadoEnergia).all())
+            db.expunge_all()
+            t_tuplas, tuplas = cronometrar(lambda: db.execute(consultas.consulta_dados()).all())
+
+        t_antes, corpo_antes = cronometrar(lambda: json.dumps(jsonable_encoder(objetos)).encode())
+        t_registros, corpo_registros = cronometrar(lambda: respostas.dumps(respostas.registros(tuplas)))
+        t_colunar, corpo_colunar = cronometrar(lambda: respostas.dumps(respostas.colunar(tuplas)))
+
+    motor = "orjson" if respostas.orjson is not None else "json (orjson não instalado)"
+    print(f"linhas: {args.linhas}   serializador: {motor}")
+    print(f"{'caminho':<34} {'leitura ms':>11} {'serializar ms':>14} {'bytes':>11} {'gzip':>10}")
+    for nome, t_leitura, t_serial, corpo in [
+        ("ORM + jsonable_encoder (antes)", t_orm, t_antes, corpo_antes),
+        ("tuplas + registros", t_tuplas, t_registros, corpo_registros),
+        ("tuplas + colunar", t_tuplas, t_colunar, corpo_colunar),
+    ]:
+        print(f"{nome:<34} {t_leitura * 1000:>11.1f} {t_serial * 1000:>14.1f} "
+              f"{len(corpo):>11} {len(gzip.compress(corpo, 6)):>10}")
+    print(f"ganho na serialização: {t_antes / t_registros:.1f}x (registros), {t_antes / t_colunar:.1f}x (colunar)")
+
+
+if __name__ == "__main__":
+    main()
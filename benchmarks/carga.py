@@ -0,0 +1,292 @@
+"""
+Teste de carga da API: N gateways enviando leituras e M painéis consultando.
+
+Sobe um uvicorn local contra um SQLite temporário (nada externo, nada do
+dados.db do projeto), cadastra uma usina por gateway e roda um estágio de
+carga para cada tamanho de tabela pedido em --linhas-iniciais, completando
+o histórico antes de cada estágio. Assim dá para ver a vazão de ingestão e
+como as leituras degradam conforme dados_energia cresce:
+
+    python benchmarks/carga.py --gateways 20 --paineis 10 --duracao 30 \\
+        --linhas-iniciais 0 1000000 --saida carga.json
+
+O relatório é um JSON (versão em "versao_relatorio") com os parâmetros, o
+commit do git e, por estágio e operação: requisições, vazão, leituras/s,
+taxa de erro por status e latência p50/p95/p99/máx em ms. O gerador roda
+em um único processo asyncio; com muitos clientes em uma máquina pequena
+ele mesmo pode virar o gargalo, então compare relatórios da mesma máquina.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+import numpy as np
+
+from _util import DIRETORIO_BACKEND, porta_livre, subir_servidor
+
+VERSAO_RELATORIO = 1
+
+# Relógio simulado: o histórico pré-carregado fica antes de T0 e os gateways
+# escrevem a partir de T0, um passo por envio
+T0 = datetime(2026, 1, 1)
+PASSO = timedelta(minutes=5)
+
+# Consultas de cada painel, em rodízio; {usina} é a usina acompanhada pelo painel
+CONSULTAS_PAINEL = [
+    ("GET /dados", "/dados?limite=1000"),
+    ("GET /usinas/{id}/dados", "/usinas/{usina}/dados?limite=500&inicio={recente}"),
+    ("GET /usinas/{id}/agregado", "/usinas/{usina}/agregado?bucket=1h&inicio={semana}"),
+    ("GET /dados/agregado", "/dados/agregado?bucket=1d&inicio={semana}"),
+]
+
+
+def commit_git():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=DIRETORIO_BACKEND,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Medicoes:
+    """Latências e status por operação de um estágio."""
+
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.status = defaultdict(Counter)
+        self.leituras = Counter()
+
+    def registrar(self, operacao, inicio, status, leituras=0):
+        self.latencias[operacao].append(time.perf_counter() - inicio)
+        self.status[operacao][status] += 1
+        if status < 400:
+            self.leituras[operacao] += leituras
+
+    def resumo(self, duracao):
+        operacoes = {}
+        for operacao, latencias in sorted(self.latencias.items()):
+            ms = np.array(latencias) * 1000
+            erros = sum(n for status, n in self.status[operacao].items() if status >= 400 or status == 0)
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            operacoes[operacao] = {
+                "requisicoes": len(ms),
+                "erros": erros,
+                "taxa_erro": round(erros / len(ms), 6),
+                # status 0 = erro de transporte (conexão recusada, timeout)
+                "status": {str(status): n for status, n in sorted(self.status[operacao].items())},
+                "req_s": round(len(ms) / duracao, 2),
+                "leituras_s": round(self.leituras[operacao] / duracao, 2) if self.leituras[operacao] else None,
+                "latencia_ms": {
+                    "p50": round(float(p50), 3),
+                    "p95": round(float(p95), 3),
+                    "p99": round(float(p99), 3),
+                    "max": round(float(ms.max()), 3),
+                    "media": round(float(ms.mean()), 3),
+                },
+            }
+        return operacoes
+
+
+async def requisitar(cliente, medicoes, operacao, metodo, rota, leituras=0, **kwargs):
+    inicio = time.perf_counter()
+    try:
+        resposta = await cliente.request(metodo, rota, **kwargs)
+        status = resposta.status_code
+    except httpx.HTTPError:
+        status = 0
+    medicoes.registrar(operacao, inicio, status, leituras)
+
+
+def corpo_gateway(modo, dispositivos, instante, rng):
+    gerado = rng.uniform(0, 8, len(dispositivos))
+    consumido = rng.uniform(0, 6, len(dispositivos))
+    if modo == "binario":
+        registros = np.zeros(len(dispositivos), dtype=[
+            ("timestamp", "<f8"), ("dispositivo_id", "<u4"), ("gerado_kwh", "<f4"), ("consumido_kwh", "<f4"),
+        ])
+        registros["timestamp"] = instante.timestamp()
+        registros["dispositivo_id"] = dispositivos
+        registros["gerado_kwh"] = gerado
+        registros["consumido_kwh"] = consumido
+        return {"content": registros.tobytes(), "headers": {"Content-Type": "application/octet-stream"}}
+    leituras = [
+        {"dispositivo_id": int(d), "timestamp": instante.isoformat(),
+         "gerado_kwh": round(float(g), 3), "consumido_kwh": round(float(c), 3)}
+        for d, g, c in zip(dispositivos, gerado, consumido)
+    ]
+    return {"json": leituras[0] if modo == "unitario" else leituras}
+
+
+ROTA_GATEWAY = {"lote": "/dados/lote", "binario": "/dados/binario", "unitario": "/dados"}
+
+
+async def gateway(cliente, medicoes, args, dispositivos, passos, prazo, rng):
+    """Um envio por intervalo com uma leitura de cada dispositivo (no modo unitário, uma por requisição)."""
+    operacao = f"POST {ROTA_GATEWAY[args.modo_gateway]}"
+    while time.perf_counter() < prazo:
+        inicio = time.perf_counter()
+        instante = T0 + PASSO * passos[0]
+        passos[0] += 1
+        if args.modo_gateway == "unitario":
+            for dispositivo in dispositivos:
+                await requisitar(cliente, medicoes, operacao, "POST", "/dados", 1,
+                                 **corpo_gateway("unitario", [dispositivo], instante, rng))
+        else:
+            await requisitar(cliente, medicoes, operacao, "POST", ROTA_GATEWAY[args.modo_gateway],
+                             len(dispositivos), **corpo_gateway(args.modo_gateway, dispositivos, instante, rng))
+        await asyncio.sleep(max(0.0, args.intervalo_gateway - (time.perf_counter() - inicio)))
+
+
+async def painel(cliente, medicoes, args, usina, deslocamento, prazo):
+    parametros = {
+        "usina": usina,
+        "recente": (T0 - timedelta(days=1)).isoformat(),
+        "semana": (T0 - timedelta(days=7)).isoformat(),
+    }
+    i = deslocamento
+    while time.perf_counter() < prazo:
+        inicio = time.perf_counter()
+        operacao, rota = CONSULTAS_PAINEL[i % len(CONSULTAS_PAINEL)]
+        i += 1
+        await requisitar(cliente, medicoes, operacao, "GET", rota.format(**parametros))
+        await asyncio.sleep(max(0.0, args.intervalo_painel - (time.perf_counter() - inicio)))
+
+
+async def preencher(cliente, dispositivos, de, ate, rng):
+    """Histórico antes de T0 pelo POST /dados/binario: a linha j vai para o dispositivo j % n."""
+    n = len(dispositivos)
+    for inicio in range(de, ate, 50000):
+        j = np.arange(inicio, min(ate, inicio + 50000))
+        registros = np.zeros(len(j), dtype=[
+            ("timestamp", "<f8"), ("dispositivo_id", "<u4"), ("gerado_kwh", "<f4"), ("consumido_kwh", "<f4"),
+        ])
+        registros["timestamp"] = T0.timestamp() - (j // n + 1) * PASSO.total_seconds()
+        registros["dispositivo_id"] = np.asarray(dispositivos)[j % n]
+        registros["gerado_kwh"] = rng.uniform(0, 8, len(j))
+        registros["consumido_kwh"] = rng.uniform(0, 6, len(j))
+        resposta = await cliente.post("/dados/binario", content=registros.tobytes(),
+                                      headers={"Content-Type": "application/octet-stream"})
+        resposta.raise_for_status()
+
+
+async def cadastrar(cliente, args):
+    """Uma usina por gateway, com --dispositivos-por-gateway dispositivos. Retorna [(usina, [dispositivos])]."""
+    frota = []
+    for g in range(args.gateways):
+        usina = (await cliente.post("/usinas", json={"nome": f"Usina carga {g}"})).raise_for_status().json()["id"]
+        dispositivos = []
+        for d in range(args.dispositivos_por_gateway):
+            resposta = await cliente.post(f"/usinas/{usina}/dispositivos", json={"nome": f"inversor {d}"})
+            dispositivos.append(resposta.raise_for_status().json()["id"])
+        frota.append((usina, dispositivos))
+    return frota
+
+
+async def executar(url, args, cabecalhos):
+    rng = np.random.default_rng(args.semente)
+    limites = httpx.Limits(max_connections=args.gateways + args.paineis + 1)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=args.timeout, headers=cabecalhos) as cliente:
+        frota = await cadastrar(cliente, args)
+        todos = [d for _, dispositivos in frota for d in dispositivos]
+        passos = [[0] for _ in frota]
+        estagios, preenchidas = [], 0
+        for linhas_iniciais in sorted(args.linhas_iniciais):
+            inicio = time.perf_counter()
+            await preencher(cliente, todos, preenchidas, linhas_iniciais, rng)
+            duracao_preenchimento = time.perf_counter() - inicio
+            preenchidas = max(preenchidas, linhas_iniciais)
+
+            medicoes = Medicoes()
+            inicio = time.perf_counter()
+            prazo = inicio + args.duracao
+            await asyncio.gather(
+                *(gateway(cliente, medicoes, args, dispositivos, passos[g], prazo, rng)
+                  for g, (_, dispositivos) in enumerate(frota)),
+                *(painel(cliente, medicoes, args, frota[p % len(frota)][0], p, prazo)
+                  for p in range(args.paineis)),
+            )
+            duracao = time.perf_counter() - inicio
+            estagios.append({
+                "linhas_iniciais": linhas_iniciais,
+                "preenchimento_s": round(duracao_preenchimento, 3),
+                "duracao_s": round(duracao, 3),
+                "operacoes": medicoes.resumo(duracao),
+            })
+            print(f"estágio com {linhas_iniciais} linhas iniciais concluído", file=sys.stderr)
+    return estagios
+
+
+def imprimir_tabela(estagios):
+    print(f"{'linhas':>10}  {'operação':<28} {'req/s':>8} {'leit/s':>9} "
+          f"{'p50':>8} {'p95':>8} {'p99':>8} {'erro %':>7}", file=sys.stderr)
+    for estagio in estagios:
+        for operacao, r in estagio["operacoes"].items():
+            lat = r["latencia_ms"]
+            print(f"{estagio['linhas_iniciais']:>10}  {operacao:<28} {r['req_s']:>8.1f} "
+                  f"{r['leituras_s'] or 0:>9.0f} {lat['p50']:>8.1f} {lat['p95']:>8.1f} {lat['p99']:>8.1f} "
+                  f"{r['taxa_erro'] * 100:>7.2f}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--gateways", type=int, default=10)
+    parser.add_argument("--dispositivos-por-gateway", type=int, default=4)
+    parser.add_argument("--modo-gateway", choices=sorted(ROTA_GATEWAY), default="lote",
+                        help="lote: POST /dados/lote; binario: POST /dados/binario; unitario: um POST /dados por leitura")
+    parser.add_argument("--intervalo-gateway", type=float, default=0.0,
+                        help="segundos entre envios de cada gateway (0 = o mais rápido possível)")
+    parser.add_argument("--paineis", type=int, default=5)
+    parser.add_argument("--intervalo-painel", type=float, default=0.0,
+                        help="segundos entre consultas de cada painel (0 = o mais rápido possível)")
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos de carga por estágio")
+    parser.add_argument("--linhas-iniciais", type=int, nargs="+", default=[0],
+                        help="tamanhos de dados_energia antes de cada estágio")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", help="arquivo do relatório JSON (padrão: stdout)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, DIRETORIO_BACKEND)
+    import auth
+
+    cabecalhos = {"Authorization": "Bearer " + auth.criar_token({"sub": "carga"})}
+    with tempfile.TemporaryDirectory() as tmp:
+        processo, url = subir_servidor(os.path.join(tmp, "carga.db"), porta_livre())
+        try:
+            estagios = asyncio.run(executar(url, args, cabecalhos))
+        finally:
+            processo.terminate()
+            processo.wait()
+
+    relatorio = {
+        "versao_relatorio": VERSAO_RELATORIO,
+        "gerado_em": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "commit": commit_git(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parametros": {chave: valor for chave, valor in vars(args).items() if chave != "saida"},
+        "estagios": estagios,
+    }
+    imprimir_tabela(estagios)
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Dimensionamento do sistema: potência (kWp) e, opcionalmente, bateria (kWh).
+
+Procura o tamanho que maximiza o VPL ou minimiza o payback para o perfil
+de consumo e as tarifas do cliente. Cada rodada avalia uma grade
+potência x bateria de uma vez (avaliar) e a seguinte refina a grade em
+volta do melhor ponto, até o passo ficar abaixo da tolerância. Todos os
+pontos avaliados voltam como fronteira.
+
+Modelo de cada candidato:
+
+    geração     perfil de 1 kWp (H,) x potência; a produção é linear na potência
+    bateria     despacho guloso de autoconsumo: carrega com o excedente,
+                descarrega no déficit, limitada à potência (C-rate) e à
+                eficiência de carga; o que ela desloca deixa de ser
+                compensado e passa a evitar compra na tarifa do horário
+    custo       custo_fixo + custo_kwp x kWp + custo_bateria_kwh x kWh
+    retorno     financeiro.fluxo_caixa / vpl / payback
+"""
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+import financeiro
+
+# Padrões de custo: com 5 kWp dão os R$ 15.000 do simulador
+CUSTO_FIXO = 3000.0          # projeto, homologação, instalação
+CUSTO_KWP = 2400.0           # R$/kWp
+CUSTO_BATERIA_KWH = 3500.0   # R$/kWh
+EFICIENCIA_BATERIA = 0.90    # energia armazenada / energia de carga
+C_RATE = 0.5                 # potência máxima da bateria / capacidade
+PONTOS_POTENCIA = 17
+PONTOS_BATERIA = 9
+RODADAS = 8
+
+
+class Avaliacao(NamedTuple):
+    potencia_kwp: np.ndarray
+    bateria_kwh: np.ndarray
+    investimento: np.ndarray
+    economia_anual: np.ndarray   # R$ no ano 1
+    payback_anos: np.ndarray     # inf quando não se paga no horizonte
+    vpl: np.ndarray
+
+
+class ResultadoDimensionamento(NamedTuple):
+    otimo: Avaliacao       # um ponto, campos escalares
+    fronteira: Avaliacao   # todos os pontos avaliados, por potência e bateria
+    rodadas: int
+    no_limite: bool        # ótimo no limite superior da potência ou da bateria: a faixa pode estar curta
+
+
+def _despachar(geracao, consumido, pico, capacidade, eficiencia, c_rate):
+    """Carga total e descarga fora de ponta/ponta (N,) de cada bateria, hora a hora."""
+    limite = capacidade * c_rate
+    carga_maxima = capacidade / eficiencia
+    estado = np.zeros_like(capacidade)
+    carga_total = np.zeros_like(capacidade)
+    descarga = np.zeros((2, len(capacidade)))
+    for hora in range(geracao.shape[0]):
+        saldo = geracao[hora] - consumido[hora]
+        carga = np.minimum(np.minimum(np.maximum(saldo, 0.0), limite), carga_maxima - estado / eficiencia)
+        saida = np.minimum(np.minimum(np.maximum(-saldo, 0.0), limite), estado)
+        estado += carga * eficiencia - saida
+        carga_total += carga
+        descarga[int(pico[hora])] += saida
+    return carga_total, descarga
+
+
+def avaliar(geracao_kwp, consumido, pico, potencia_kwp, bateria_kwh, tarifa_normal, tarifa_pico,
+            tarifa_compensacao, custo_fixo: float = CUSTO_FIXO, custo_kwp: float = CUSTO_KWP,
+            custo_bateria_kwh: float = CUSTO_BATERIA_KWH, eficiencia_bateria: float = EFICIENCIA_BATERIA,
+            c_rate: float = C_RATE, taxa_desconto: float = financeiro.TAXA_DESCONTO,
+            reajuste: float = financeiro.REAJUSTE_TARIFA, **premissas_fluxo) -> Avaliacao:
+    """
+    Avalia os candidatos (N,) de potência e bateria de uma vez sobre o ano
+    `geracao_kwp` (produção de 1 kWp) e `consumido` (H,); `premissas_fluxo`
+    segue financeiro.fluxo_caixa.
+    """
+    geracao_kwp = np.asarray(geracao_kwp, dtype=np.float64)
+    consumido = np.asarray(consumido, dtype=np.float64)
+    pico = np.asarray(pico, dtype=bool)
+    potencia_kwp, bateria_kwh = (np.array(v, dtype=np.float64) for v in np.broadcast_arrays(
+        np.atleast_1d(potencia_kwp), np.atleast_1d(bateria_kwh)))
+    geracao = geracao_kwp[:, None] * potencia_kwp
+    somas = financeiro.somas_energia(geracao, consumido, pico)
+
+    # Com bateria, a energia deslocada soma ao autoconsumo e sai do excedente
+    # (gerado' = gerado - carga + descarga mantém o excedente de valorar())
+    com_bateria = np.flatnonzero(bateria_kwh > 0)
+    if len(com_bateria):
+        carga, descarga = _despachar(geracao[:, com_bateria], consumido[:, None], pico, bateria_kwh[com_bateria],
+                                     eficiencia_bateria, c_rate)
+        somas.autoconsumo_fora[com_bateria] += descarga[0]
+        somas.autoconsumo_ponta[com_bateria] += descarga[1]
+        somas.gerado[com_bateria] += descarga.sum(axis=0) - carga
+
+    economia_anual = financeiro.valorar(somas, tarifa_normal, tarifa_pico, tarifa_compensacao).economia_total
+    investimento = custo_fixo + custo_kwp * potencia_kwp + custo_bateria_kwh * bateria_kwh
+    fluxos = financeiro.fluxo_caixa(financeiro.economias_anuais(economia_anual, reajuste=reajuste), investimento,
+                                    **premissas_fluxo)
+    return Avaliacao(potencia_kwp, bateria_kwh, investimento, economia_anual, financeiro.payback(fluxos),
+                     financeiro.vpl(fluxos, taxa_desconto))
+
+
+def otimizar(geracao_kwp, consumido, pico, tarifa_normal, tarifa_pico, tarifa_compensacao,
+             objetivo: str = "vpl", potencia_min: float = 0.5, potencia_max: Optional[float] = None,
+             bateria_max: float = 0.0, pontos_potencia: int = PONTOS_POTENCIA,
+             pontos_bateria: int = PONTOS_BATERIA, rodadas: int = RODADAS, tolerancia_kwp: float = 0.05,
+             tolerancia_kwh: float = 0.1, **parametros) -> ResultadoDimensionamento:
+    """
+    Maximiza o VPL (`objetivo="vpl"`) ou minimiza o payback (`"payback"`)
+    em [potencia_min, potencia_max] x [0, bateria_max] por refinamento de
+    grade. `potencia_max` padrão: o sistema que gera o dobro do consumo
+    anual. `parametros` vão para avaliar().
+    """
+    if objetivo not in ("vpl", "payback"):
+        raise ValueError("objetivo deve ser 'vpl' ou 'payback'")
+    if potencia_max is None:
+        potencia_max = 2 * np.sum(consumido) / max(np.sum(geracao_kwp), 1e-9)
+    potencia_max = max(potencia_max, potencia_min)
+    limites = np.array([[potencia_min, potencia_max], [0.0, bateria_max]], dtype=np.float64)
+    faixa = limites.copy()
+    pontos = (pontos_potencia, pontos_bateria if bateria_max > 0 else 1)
+    avaliados = []
+    for rodada in range(1, rodadas + 1):
+        eixos = [np.linspace(*faixa[i], pontos[i]) for i in range(2)]
+        potencia, bateria = (grade.ravel() for grade in np.meshgrid(*eixos, indexing="ij"))
+        avaliacao = avaliar(geracao_kwp, consumido, pico, potencia, bateria, tarifa_normal, tarifa_pico,
+                            tarifa_compensacao, **parametros)
+        avaliados.append(avaliacao)
+        melhor = np.argmax(avaliacao.vpl) if objetivo == "vpl" else np.argmin(avaliacao.payback_anos)
+        # Próxima grade: um passo para cada lado do melhor ponto, dentro dos limites
+        passos = np.array([e[1] - e[0] if len(e) > 1 else 0.0 for e in eixos])
+        centro = np.array([potencia[melhor], bateria[melhor]])
+        faixa = np.clip(np.stack([centro - passos, centro + passos], axis=1), limites[:, :1], limites[:, 1:])
+        if passos[0] <= tolerancia_kwp and passos[1] <= tolerancia_kwh:
+            break
+
+    fronteira = Avaliacao(*(np.concatenate(campo) for campo in zip(*avaliados)))
+    _, unicos = np.unique(np.stack([fronteira.potencia_kwp, fronteira.bateria_kwh]), axis=1, return_index=True)
+    fronteira = Avaliacao(*(campo[unicos] for campo in fronteira))
+    criterio = fronteira.vpl if objetivo == "vpl" else -fronteira.payback_anos
+    otimo = Avaliacao(*(float(campo[np.argmax(criterio)]) for campo in fronteira))
+    no_limite = bool(np.isclose(otimo.potencia_kwp, potencia_max)
+                     or (bateria_max > 0 and np.isclose(otimo.bateria_kwh, bateria_max)))
+    return ResultadoDimensionamento(otimo, fronteira, rodada, no_limite)
@@ -0,0 +1,262 @@
+"""
+Motor financeiro do simulador, sem dependência do Streamlit.
+
+Trabalha com arrays NumPy: `gerado` e `consumido` têm uma linha por
+intervalo (24 horas, 8760 horas de um ano ou 35040 quartos de hora) e,
+opcionalmente, uma coluna por cenário; `pico` marca os intervalos do
+horário de ponta. As tarifas podem ser escalares ou ter um valor por
+cenário. Tudo é combinado por broadcasting:
+
+    gerado (H,) ou (H, N)   consumido (H,) ou (H, N)   pico (H,)
+    tarifas escalares ou (N,)
+
+calcular() devolve os valores de cada intervalo; totais() devolve só a soma
+por cenário, em blocos de colunas, sem materializar as matrizes H x N.
+
+Para o horizonte do investimento (25 anos), fluxo_caixa() monta o fluxo
+anual com degradação, reajuste, O&M e troca do inversor, e indicadores()
+calcula VPL, TIR e payback de todos os conjuntos de premissas de uma vez.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+# Cenários por bloco em totais(): 8760 x 512 float64 ocupam ~36 MB por matriz
+BLOCO_CENARIOS = 512
+
+# Premissas padrão do fluxo de caixa (frações ao ano, exceto onde indicado)
+HORIZONTE_ANOS = 25
+TAXA_DESCONTO = 0.08
+REAJUSTE_TARIFA = 0.06
+DEGRADACAO_ANUAL = 0.005
+INFLACAO = 0.045
+OM_FRACAO = 0.01            # O&M anual, fração do investimento (preços do ano 1)
+ANO_TROCA_INVERSOR = 12
+INVERSOR_FRACAO = 0.15      # custo da troca do inversor, fração do investimento (preços do ano 1)
+
+
+class ResultadoFinanceiro(NamedTuple):
+    economia_consumo: np.ndarray   # energia autoconsumida x tarifa do horário
+    ganho_excedente: np.ndarray    # excedente injetado x tarifa de compensação
+    custo_sem_solar: np.ndarray    # consumo inteiro x tarifa do horário
+    custo_real: np.ndarray         # consumo não coberto pela geração x tarifa do horário
+    economia_total: np.ndarray     # economia_consumo + ganho_excedente
+
+
+def _preparar(gerado, consumido, pico, *tarifas):
+    gerado = np.asarray(gerado, dtype=np.float64)
+    consumido = np.asarray(consumido, dtype=np.float64)
+    pico = np.asarray(pico, dtype=bool)
+    if gerado.ndim > 2 or consumido.ndim > 2 or pico.ndim != 1:
+        raise ValueError("gerado/consumido devem ser (H,) ou (H, N) e pico (H,)")
+    if len(gerado) != len(pico) or len(consumido) != len(pico):
+        raise ValueError("gerado, consumido e pico precisam do mesmo número de intervalos")
+    cenarios = np.broadcast_shapes(gerado.shape[1:], consumido.shape[1:], *(np.shape(t) for t in tarifas))
+    if len(cenarios) > 1:
+        raise ValueError("as tarifas devem ser escalares ou ter um valor por cenário (N,)")
+    return gerado, consumido, pico, cenarios
+
+
+def calcular(gerado, consumido, pico, tarifa_normal, tarifa_pico, tarifa_compensacao) -> ResultadoFinanceiro:
+    """Valores de cada intervalo, com o formato (H,) ou (H, N) da entrada."""
+    gerado, consumido, pico, cenarios = _preparar(
+        gerado, consumido, pico, tarifa_normal, tarifa_pico, tarifa_compensacao
+    )
+    if cenarios:
+        pico = pico[:, None]
+        gerado = gerado if gerado.ndim == 2 else gerado[:, None]
+        consumido = consumido if consumido.ndim == 2 else consumido[:, None]
+    tarifa = np.where(pico, tarifa_pico, tarifa_normal)
+    autoconsumo = np.minimum(gerado, consumido)
+    economia_consumo = autoconsumo * tarifa
+    # max(g - c, 0) == g - min(g, c) e max(c - g, 0) == c - min(g, c), sem outro máximo
+    ganho_excedente = (gerado - autoconsumo) * tarifa_compensacao
+    custo_sem_solar = consumido * tarifa
+    custo_real = (consumido - autoconsumo) * tarifa
+    return ResultadoFinanceiro(
+        economia_consumo, ganho_excedente, custo_sem_solar, custo_real, economia_consumo + ganho_excedente
+    )
+
+
+class SomasEnergia(NamedTuple):
+    autoconsumo_fora: np.ndarray   # kWh, fora de ponta
+    autoconsumo_ponta: np.ndarray
+    consumo_fora: np.ndarray
+    consumo_ponta: np.ndarray
+    gerado: np.ndarray
+
+
+def somas_energia(gerado, consumido, pico, bloco: int = BLOCO_CENARIOS) -> SomasEnergia:
+    """
+    Somas de energia por cenário (N,) que bastam para valorar() qualquer
+    conjunto de tarifas: as tarifas são constantes dentro de cada horário,
+    então basta uma passada por bloco para o autoconsumo (min) e produtos
+    matriciais para as somas de ponta/fora de ponta.
+    """
+    gerado, consumido, pico, _ = _preparar(gerado, consumido, pico)
+    # Linha 0: fora de ponta; linha 1: ponta
+    pesos = np.stack([~pico, pico]).astype(np.float64)
+    colunas = max(gerado.shape[1] if gerado.ndim == 2 else 1, consumido.shape[1] if consumido.ndim == 2 else 1)
+    soma_auto = np.empty((2, colunas))
+    soma_consumo = np.empty((2, colunas))
+    soma_gerado = np.empty(colunas)
+    for inicio in range(0, colunas, bloco):
+        fatia = slice(inicio, min(colunas, inicio + bloco))
+        g = gerado[:, fatia] if gerado.ndim == 2 and gerado.shape[1] > 1 else gerado.reshape(len(pico), -1)
+        c = consumido[:, fatia] if consumido.ndim == 2 and consumido.shape[1] > 1 else consumido.reshape(len(pico), -1)
+        soma_auto[:, fatia] = pesos @ np.minimum(g, c)
+        soma_consumo[:, fatia] = pesos @ c
+        soma_gerado[fatia] = g.sum(axis=0)
+    return SomasEnergia(soma_auto[0], soma_auto[1], soma_consumo[0], soma_consumo[1], soma_gerado)
+
+
+def valorar(somas: SomasEnergia, tarifa_normal, tarifa_pico, tarifa_compensacao) -> ResultadoFinanceiro:
+    """Totais em R$ a partir das somas de energia; somas e tarifas combinadas por broadcasting."""
+    economia_consumo = tarifa_normal * somas.autoconsumo_fora + tarifa_pico * somas.autoconsumo_ponta
+    ganho_excedente = tarifa_compensacao * (somas.gerado - somas.autoconsumo_fora - somas.autoconsumo_ponta)
+    custo_sem_solar = tarifa_normal * somas.consumo_fora + tarifa_pico * somas.consumo_ponta
+    custo_real = custo_sem_solar - economia_consumo
+    return ResultadoFinanceiro(
+        economia_consumo, ganho_excedente, custo_sem_solar, custo_real, economia_consumo + ganho_excedente
+    )
+
+
+def totais(gerado, consumido, pico, tarifa_normal, tarifa_pico, tarifa_compensacao,
+           bloco: int = BLOCO_CENARIOS) -> ResultadoFinanceiro:
+    """
+    Soma de cada campo de calcular() ao longo dos intervalos, por cenário:
+    arrays (N,), ou escalares se não houver eixo de cenários. As tarifas
+    entram só no fim (somas_energia + valorar).
+    """
+    gerado, consumido, pico, cenarios = _preparar(
+        gerado, consumido, pico, tarifa_normal, tarifa_pico, tarifa_compensacao
+    )
+    campos = valorar(somas_energia(gerado, consumido, pico, bloco), tarifa_normal, tarifa_pico, tarifa_compensacao)
+    if not cenarios:
+        return ResultadoFinanceiro(*(float(np.ravel(campo)[0]) for campo in campos))
+    return ResultadoFinanceiro(*(np.broadcast_to(campo, cenarios).copy() for campo in campos))
+
+
+# --- Fluxo de caixa e indicadores de investimento ---
+# `fluxos` tem o ano 0 (investimento, negativo) na primeira coluna e uma
+# linha por cenário: (T+1,) ou (N, T+1). As premissas podem ser escalares
+# ou ter um valor por cenário (N,).
+
+class Indicadores(NamedTuple):
+    vpl: np.ndarray
+    tir: np.ndarray            # NaN quando não existe
+    payback_anos: np.ndarray   # inf quando não se paga no horizonte
+    saldo: np.ndarray          # soma dos fluxos, investimento incluído
+    roi: np.ndarray            # saldo / investimento
+
+
+def _coluna(valor):
+    # Premissa escalar ou (N,) -> broadcast contra o eixo dos anos
+    return np.asarray(valor, dtype=np.float64)[..., None]
+
+
+def economias_anuais(economia_ano1, anos: int = HORIZONTE_ANOS, reajuste=REAJUSTE_TARIFA) -> np.ndarray:
+    """Economia de cada ano (..., anos) com a tarifa reajustada a partir do ano 2."""
+    return _coluna(economia_ano1) * (1.0 + _coluna(reajuste)) ** np.arange(anos)
+
+
+def fluxo_caixa(economias, investimento, degradacao=DEGRADACAO_ANUAL, om_fracao=OM_FRACAO,
+                inflacao=INFLACAO, ano_troca_inversor=ANO_TROCA_INVERSOR,
+                inversor_fracao=INVERSOR_FRACAO) -> np.ndarray:
+    """
+    Fluxo anual (..., anos + 1) a partir das economias de cada ano (..., anos)
+    já com o reajuste tarifário (ver economias_anuais): a geração cai
+    `degradacao` ao ano, e a economia junto (aproximação: economia
+    proporcional à geração); O&M e troca do inversor são frações do
+    investimento corrigidas pela `inflacao`. `ano_troca_inversor` = 0 desliga
+    a troca.
+    """
+    economias = np.asarray(economias, dtype=np.float64)
+    investimento = _coluna(investimento)
+    anos = economias.shape[-1]
+    t = np.arange(anos)  # ano 1 = índice 0
+    correcao = (1.0 + _coluna(inflacao)) ** t
+    custos = investimento * _coluna(om_fracao) * correcao
+    custos = custos + np.where(t + 1 == _coluna(ano_troca_inversor), investimento * _coluna(inversor_fracao), 0.0) * correcao
+    operacao = economias * (1.0 - _coluna(degradacao)) ** t - custos
+    inicio = np.broadcast_to(-investimento, operacao.shape[:-1] + (1,))
+    return np.concatenate([inicio, operacao], axis=-1)
+
+
+def indicadores(fluxos, taxa=TAXA_DESCONTO) -> Indicadores:
+    """VPL, TIR, payback, saldo e ROI de cada linha de `fluxos`, em uma chamada."""
+    fluxos = np.asarray(fluxos, dtype=np.float64)
+    saldo = fluxos.sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi = saldo / -fluxos[..., 0]
+    return Indicadores(vpl(fluxos, taxa), tir(fluxos), payback(fluxos), saldo, roi)
+
+
+def vpl(fluxos, taxa):
+    """Valor presente líquido à `taxa` anual (escalar ou uma por cenário)."""
+    fluxos = np.asarray(fluxos, dtype=np.float64)
+    desconto = (1.0 + np.asarray(taxa, dtype=np.float64))[..., None] ** -np.arange(fluxos.shape[-1])
+    return (fluxos * desconto).sum(axis=-1)
+
+
+# Taxas onde o VPL é avaliado para achar o intervalo de cada raiz (mais denso perto de 0)
+GRADE_TIR = np.array([-0.99, -0.9, -0.75, -0.5, -0.3, -0.2, -0.1, -0.05, 0.0, 0.05, 0.1, 0.15, 0.2,
+                      0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0])
+
+
+def tir(fluxos, iteracoes: int = 60, tolerancia: float = 1e-10):
+    """
+    Taxa interna de retorno de cada cenário. O VPL é avaliado na GRADE_TIR
+    (um produto matricial) e, com mais de uma troca de sinal, fica o
+    intervalo mais perto de 0%; dentro dele, Newton vetorizado com bisseção
+    quando o passo sai do intervalo. NaN onde o VPL não muda de sinal.
+    """
+    fluxos = np.asarray(fluxos, dtype=np.float64)
+    planos = fluxos.reshape(-1, fluxos.shape[-1])
+    t = np.arange(planos.shape[1])
+    linhas = np.arange(len(planos))
+    valores = planos @ (1.0 + GRADE_TIR) ** -t[:, None]
+    troca = np.sign(valores[:, :-1]) != np.sign(valores[:, 1:])
+    distancia = np.abs(GRADE_TIR[:-1] + GRADE_TIR[1:])
+    k = np.argmin(np.where(troca, distancia, np.inf), axis=1)
+    sem_raiz = ~troca.any(axis=1)
+    baixo, alto = GRADE_TIR[k], GRADE_TIR[k + 1]
+    vpl_baixo = valores[linhas, k]
+    taxa = (baixo + alto) / 2
+    for _ in range(iteracoes):
+        desconto = (1.0 + taxa)[:, None] ** -t
+        valor = (planos * desconto).sum(axis=1)
+        derivada = -(t * planos * desconto).sum(axis=1) / (1.0 + taxa)
+        # A raiz fica entre o extremo de sinal oposto e a taxa atual
+        mesmo_lado = np.sign(valor) == np.sign(vpl_baixo)
+        baixo = np.where(mesmo_lado, taxa, baixo)
+        vpl_baixo = np.where(mesmo_lado, valor, vpl_baixo)
+        alto = np.where(mesmo_lado, alto, taxa)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            nova = taxa - valor / derivada
+        fora = ~((nova >= baixo) & (nova <= alto))
+        nova = np.where(fora, (baixo + alto) / 2, nova)
+        convergiu = np.abs(nova - taxa) < tolerancia
+        taxa = nova
+        if convergiu.all():
+            break
+    taxa[sem_raiz] = np.nan
+    return taxa.reshape(fluxos.shape[:-1])
+
+
+def payback(fluxos):
+    """
+    Anos até o fluxo acumulado ficar positivo, interpolando dentro do ano
+    da virada; inf se não se paga no horizonte.
+    """
+    fluxos = np.asarray(fluxos, dtype=np.float64)
+    acumulado = np.cumsum(fluxos, axis=-1)
+    positivo = acumulado >= 0
+    ano = np.argmax(positivo, axis=-1)
+    pagou = positivo.any(axis=-1) & (ano > 0)
+    ano = np.maximum(ano, 1)
+    anterior = np.take_along_axis(acumulado, (ano - 1)[..., None], axis=-1)[..., 0]
+    fluxo_ano = np.take_along_axis(fluxos, ano[..., None], axis=-1)[..., 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        anos = ano - 1 + (-anterior / fluxo_ano)
+    return np.where(positivo[..., 0], 0.0, np.where(pagou, anos, np.inf))
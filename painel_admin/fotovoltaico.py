@@ -0,0 +1,189 @@
+"""
+Modelo físico de produção fotovoltaica, vetorizado em NumPy.
+
+Para cada intervalo do ano (8760 horas ou 35040 quartos de hora):
+
+    posição do sol     equações de Spencer/NOAA (declinação, equação do tempo)
+    céu claro          Haurwitz (GHI), separado em DNI/DHI pela correlação de Erbs
+    plano do módulo    transposição de Hay-Davies + reflexão do solo (albedo)
+    temperatura        célula pelo NOCT, coeficiente de potência por °C
+    inversor           curva de eficiência do PVWatts, limitada à potência CA
+
+Os parâmetros dos sistemas (potência, inclinação, azimute, local, perdas)
+podem ser escalares ou arrays (N,); com algum array o resultado é (H, N),
+um sistema por coluna. O céu claro é o limite superior da irradiância:
+`transmitancia` escala a GHI para representar nebulosidade média.
+
+Convenções: azimute a partir do norte, no sentido horário (0 = norte,
+90 = leste, 180 = sul); horários no fuso local padrão, `fuso_horas` em
+relação ao UTC (Brasília = -3).
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+CONSTANTE_SOLAR = 1367.0  # W/m²
+
+
+class ResultadoFV(NamedTuple):
+    energia_kwh: np.ndarray          # energia CA em cada intervalo
+    irradiancia_plano: np.ndarray    # W/m² no plano do módulo
+    temperatura_celula: np.ndarray   # °C
+
+
+def instantes_ano(ano: int, passo_min: int = 60) -> np.ndarray:
+    """Início de cada intervalo do ano, em datetime64[m] (hora local padrão)."""
+    inicio = np.datetime64(f"{ano}-01-01T00:00", "m")
+    fim = np.datetime64(f"{ano + 1}-01-01T00:00", "m")
+    return np.arange(inicio, fim, np.timedelta64(passo_min, "m"))
+
+
+def _angulo_dia(instantes: np.ndarray) -> tuple:
+    """Ângulo do ano (rad) de Spencer e hora local decimal de cada instante."""
+    segundos = instantes.astype("datetime64[s]")
+    dias = segundos.astype("datetime64[D]")
+    dia_do_ano = (dias - dias.astype("datetime64[Y]")).astype(np.float64)  # 0 = 1º de janeiro
+    hora = (segundos - dias).astype(np.float64) / 3600.0
+    return 2 * np.pi / 365.0 * (dia_do_ano + (hora - 12) / 24), hora
+
+
+def posicao_solar(instantes, latitude, longitude, fuso_horas):
+    """
+    Cosseno do zênite, azimute do sol (graus, a partir do norte) e irradiância
+    extraterrestre normal (W/m²). `instantes` é (H,); com latitude ou longitude
+    (N,), o resultado é (H, N).
+    """
+    gama, hora = _angulo_dia(np.asarray(instantes))
+    latitude = np.radians(np.asarray(latitude, dtype=np.float64))
+    longitude = np.asarray(longitude, dtype=np.float64)
+    if latitude.ndim or longitude.ndim or np.ndim(fuso_horas):
+        gama, hora = gama[:, None], hora[:, None]
+
+    cos1, sin1, cos2, sin2 = np.cos(gama), np.sin(gama), np.cos(2 * gama), np.sin(2 * gama)
+    equacao_tempo = 229.18 * (0.000075 + 0.001868 * cos1 - 0.032077 * sin1 - 0.014615 * cos2 - 0.040849 * sin2)
+    declinacao = (0.006918 - 0.399912 * cos1 + 0.070257 * sin1 - 0.006758 * cos2 + 0.000907 * sin2
+                  - 0.002697 * np.cos(3 * gama) + 0.00148 * np.sin(3 * gama))
+    extraterrestre = CONSTANTE_SOLAR * (1.00011 + 0.034221 * cos1 + 0.00128 * sin1 + 0.000719 * cos2
+                                        + 0.000077 * sin2)
+
+    tempo_solar = hora * 60 + equacao_tempo + 4 * longitude - 60 * np.asarray(fuso_horas)
+    angulo_horario = np.radians(tempo_solar / 4 - 180)
+    sin_lat, cos_lat = np.sin(latitude), np.cos(latitude)
+    cos_zenite = sin_lat * np.sin(declinacao) + cos_lat * np.cos(declinacao) * np.cos(angulo_horario)
+    azimute = np.degrees(np.arctan2(
+        np.sin(angulo_horario), np.cos(angulo_horario) * sin_lat - np.tan(declinacao) * cos_lat
+    )) + 180.0
+    return np.clip(cos_zenite, -1.0, 1.0), azimute, extraterrestre
+
+
+def ceu_claro(cos_zenite, extraterrestre, transmitancia=1.0):
+    """GHI de Haurwitz (x transmitancia) separada em DNI e DHI pela correlação de Erbs."""
+    acima = cos_zenite > 0
+    cz = np.where(acima, cos_zenite, 1.0)
+    ghi = np.where(acima, 1098.0 * cz * np.exp(-0.057 / cz), 0.0) * transmitancia
+    # Perto do horizonte a divisão por cos(z) explode; 0.065 ~ 86,3°
+    cz = np.maximum(cz, 0.065)
+    kt = np.clip(ghi / (extraterrestre * cz), 0.0, 1.0)
+    fracao_difusa = np.where(
+        kt <= 0.22, 1.0 - 0.09 * kt,
+        np.where(kt <= 0.80,
+                 0.9511 - 0.1604 * kt + 4.388 * kt**2 - 16.638 * kt**3 + 12.336 * kt**4,
+                 0.165),
+    )
+    dhi = ghi * fracao_difusa
+    dni = np.minimum((ghi - dhi) / cz, extraterrestre)
+    return ghi, dni, dhi
+
+
+def irradiancia_plano(ghi, dni, dhi, cos_zenite, azimute_sol, extraterrestre,
+                      inclinacao, azimute, albedo=0.2):
+    """
+    Irradiância no plano do módulo (W/m²) pela transposição de Hay-Davies.
+
+    Os termos que só dependem do sol (H,) e os que só dependem do módulo (N,)
+    são calculados à parte; o cruzamento H x N fica em somas de produtos,
+    sem funções trigonométricas por elemento.
+    """
+    beta, gama = np.radians(inclinacao), np.radians(azimute)
+    cos_beta, sin_beta = np.cos(beta), np.sin(beta)
+    sin_zenite = np.sqrt(np.maximum(0.0, 1.0 - cos_zenite**2))
+    azimute_sol = np.radians(azimute_sol)
+    # cos(az_sol - az) = cos(az_sol)cos(az) + sin(az_sol)sin(az)
+    cos_incidencia = (cos_zenite * cos_beta
+                      + (sin_zenite * np.cos(azimute_sol)) * (sin_beta * np.cos(gama))
+                      + (sin_zenite * np.sin(azimute_sol)) * (sin_beta * np.sin(gama)))
+    np.maximum(cos_incidencia, 0.0, out=cos_incidencia)
+    # Direta + parte circunsolar da difusa (índice de anisotropia = DNI/extraterrestre)
+    anisotropia = dni / extraterrestre
+    feixe = dni + dhi * anisotropia / np.maximum(cos_zenite, 0.065)
+    isotropica = dhi * (1 - anisotropia)
+    return cos_incidencia * feixe + isotropica * ((1 + cos_beta) / 2) + ghi * (albedo * (1 - cos_beta) / 2)
+
+
+def simular(instantes, potencia_kwp, latitude=-23.55, longitude=-46.63, fuso_horas=-3,
+            inclinacao=None, azimute=0.0, transmitancia=1.0, temperatura_ambiente=25.0,
+            albedo=0.2, noct=45.0, coef_temperatura=-0.004, perdas=0.14,
+            razao_cc_ca=1.2, eficiencia_inversor=0.96) -> ResultadoFV:
+    """
+    Produção CA de um ou vários sistemas em cada intervalo de `instantes`
+    (igualmente espaçados, ver instantes_ano). O sol é avaliado no meio do
+    intervalo. `inclinacao` padrão = |latitude|; `temperatura_ambiente` pode
+    ser escalar, (H,) ou (H, N); `perdas` reúne sujeira, cabos, mismatch e
+    reflexão (padrão do PVWatts).
+    """
+    instantes = np.asarray(instantes).astype("datetime64[s]")
+    passo = (instantes[1] - instantes[0]) if len(instantes) > 1 else np.timedelta64(3600, "s")
+    horas_intervalo = passo.astype(np.float64) / 3600.0
+    if inclinacao is None:
+        inclinacao = np.abs(latitude)
+    sistemas = np.broadcast_shapes(*(np.shape(p) for p in (
+        potencia_kwp, latitude, longitude, fuso_horas, inclinacao, azimute, transmitancia, albedo, noct,
+        coef_temperatura, perdas, razao_cc_ca, eficiencia_inversor,
+    )), np.shape(temperatura_ambiente)[1:])
+    formato = (len(instantes),) + sistemas
+
+    cos_zenite, azimute_sol, extraterrestre = posicao_solar(instantes + passo / 2, latitude, longitude, fuso_horas)
+    temperatura_ambiente = np.asarray(temperatura_ambiente, dtype=np.float64)
+    if temperatura_ambiente.ndim == 1 and sistemas:
+        temperatura_ambiente = temperatura_ambiente[:, None]
+    # Com um só local, o sol é (H,): as contas H x N ficam só nas linhas com sol
+    dia = slice(None)
+    if cos_zenite.ndim == 1:
+        dia = np.flatnonzero(cos_zenite > 0)
+        cos_zenite, azimute_sol, extraterrestre = cos_zenite[dia], azimute_sol[dia], extraterrestre[dia]
+        if sistemas:
+            cos_zenite, azimute_sol, extraterrestre = cos_zenite[:, None], azimute_sol[:, None], extraterrestre[:, None]
+    ghi, dni, dhi = ceu_claro(cos_zenite, extraterrestre, transmitancia)
+    poa = irradiancia_plano(ghi, dni, dhi, cos_zenite, azimute_sol, extraterrestre, inclinacao, azimute, albedo)
+    ambiente_dia = temperatura_ambiente[dia] if temperatura_ambiente.ndim else temperatura_ambiente
+
+    # Célula pelo NOCT; potência CC com o coeficiente de temperatura e as perdas
+    aquecimento = (np.asarray(noct) - 20.0) / 800.0
+    celula = ambiente_dia + poa * aquecimento
+    potencia_cc = poa * (np.asarray(potencia_kwp) * (1 - np.asarray(perdas)) / 1000.0)
+    potencia_cc *= 1 + coef_temperatura * (celula - 25.0)
+
+    # Inversor: curva do PVWatts (eficiência de referência 0,9637), na forma
+    # eta(carga) * Pcc = (eta_n / 0,9637) * (0,9858 Pcc - 0,0162 Pcc²/Pcc0 - 0,0059 Pcc0),
+    # sem divisão por elemento, limitada a [0, potência CA nominal]
+    potencia_ca_nominal = np.asarray(potencia_kwp) / razao_cc_ca
+    potencia_cc_nominal = potencia_ca_nominal / eficiencia_inversor
+    escala = np.asarray(eficiencia_inversor) / 0.9637
+    potencia_ca = potencia_cc * (escala * 0.9858 - escala * 0.0162 / potencia_cc_nominal * potencia_cc)
+    potencia_ca -= escala * 0.0059 * potencia_cc_nominal
+    np.clip(potencia_ca, 0.0, potencia_ca_nominal, out=potencia_ca)
+
+    energia = np.zeros(formato)
+    irradiancia = np.zeros(formato)
+    temperatura = np.empty(formato)
+    temperatura[...] = temperatura_ambiente
+    energia[dia] = potencia_ca * horas_intervalo
+    irradiancia[dia] = poa
+    temperatura[dia] = celula
+    return ResultadoFV(energia, irradiancia, temperatura)
+
+
+def temperatura_tipica(instantes, media=25.0, amplitude=5.0, hora_maxima=15.0):
+    """Perfil diário senoidal de temperatura ambiente (°C) quando não há medição."""
+    _, hora = _angulo_dia(np.asarray(instantes))
+    return media + amplitude * np.cos(2 * np.pi * (hora - hora_maxima) / 24)
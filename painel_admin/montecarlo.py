@@ -0,0 +1,163 @@
+"""
+Monte Carlo de retorno do investimento (payback, VPL e TIR) em lote.
+
+Cada cenário sorteia, para cada ano do horizonte e cada dia do ano, um
+fator de clima (sobre a geração esperada) e um fator de consumo, além do
+reajuste tarifário de cada ano. Em vez de recalcular 8760 horas por
+cenário e ano, aproveita que a economia de um dia é homogênea de grau 1
+em (geração, consumo):
+
+    economia_dia(w·g, k·c) = k · economia_dia((w/k)·g, c)
+
+Então basta uma tabela economia_dia(r) por dia, calculada uma vez pelo
+motor horário (financeiro.calcular) em uma grade de razões r = w/k; os
+cenários viram interpolação nessa tabela, em arrays (cenários, anos, dias).
+As economias anuais sorteadas passam por financeiro.fluxo_caixa
+(degradação, O&M, troca do inversor), como no cálculo determinístico.
+
+Os cenários são processados em blocos de tamanho fixo, cada um com a sua
+semente derivada (SeedSequence.spawn): o resultado não depende de quantos
+processos rodaram. Com `processos` > 1 (padrão: todos os núcleos a partir
+de CENARIOS_PARALELO cenários) os blocos vão para um ProcessPoolExecutor.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+import financeiro
+
+# Grade de razões clima/consumo da tabela diária
+RAZAO_MAXIMA = 4.0
+PONTOS_RAZAO = 513
+# Cenários por bloco: 500 x 25 anos x 365 dias ~ 36 MB por array float64
+CENARIOS_POR_BLOCO = 500
+# A partir daqui o padrão é usar todos os núcleos
+CENARIOS_PARALELO = 5000
+PERCENTIS = (10, 50, 90)
+
+
+class ResultadoMonteCarlo(NamedTuple):
+    payback_anos: np.ndarray   # (N,), inf quando não se paga no horizonte
+    vpl: np.ndarray            # (N,)
+    tir: np.ndarray            # (N,), NaN quando não existe
+    fluxos: np.ndarray         # (N, anos + 1), ano 0 = -investimento
+
+    def percentis(self, percentis=PERCENTIS) -> dict:
+        """
+        {indicador: {"P10": valor, ...}} e "fracao_sem_tir". Cenários sem TIR
+        (NaN) ficam fora dos percentis da TIR e são contados à parte, para não
+        se misturarem com TIR baixa (NaN nos percentis se nenhum tem TIR);
+        payback inf (não se paga) entra como o maior valor, e inverted_cdf
+        não interpola com ele.
+        """
+        resumo = {}
+        for nome in ("payback_anos", "vpl", "tir"):
+            valores = getattr(self, nome)
+            valores = valores[~np.isnan(valores)]
+            quantis = (np.percentile(valores, percentis, method="inverted_cdf") if valores.size
+                       else np.full(len(percentis), np.nan))
+            resumo[nome] = {f"P{p}": float(v) for p, v in zip(percentis, quantis)}
+        resumo["fracao_sem_tir"] = float(np.isnan(self.tir).mean()) if self.tir.size else 0.0
+        return resumo
+
+
+def tabela_diaria(gerado, consumido, pico, tarifa_normal, tarifa_pico, tarifa_compensacao,
+                  intervalos_por_dia: int = 24) -> np.ndarray:
+    """Economia de cada dia (D, PONTOS_RAZAO) com a geração multiplicada por cada razão da grade."""
+    razoes = np.linspace(0.0, RAZAO_MAXIMA, PONTOS_RAZAO)
+    gerado = np.asarray(gerado, dtype=np.float64)
+    dias = len(gerado) // intervalos_por_dia
+    tabela = np.empty((dias, PONTOS_RAZAO))
+    # Algumas razões por vez, para não montar a matriz H x PONTOS_RAZAO inteira
+    for inicio in range(0, PONTOS_RAZAO, 64):
+        fatia = slice(inicio, inicio + 64)
+        economia = financeiro.calcular(gerado[:, None] * razoes[fatia], consumido, pico,
+                                       tarifa_normal, tarifa_pico, tarifa_compensacao).economia_total
+        tabela[:, fatia] = economia[:dias * intervalos_por_dia].reshape(dias, intervalos_por_dia, -1).sum(axis=1)
+    return tabela
+
+
+def _log_fator(rng, desvio_diario, desvio_anual, formato):
+    """Log de um fator lognormal de média 1: diário x anual, em float32 (o sorteio é o gargalo)."""
+    logs = rng.standard_normal(formato, dtype=np.float32)
+    logs *= desvio_diario
+    anual = rng.standard_normal(formato[:2] + (1,), dtype=np.float32) * desvio_anual
+    logs += anual - (desvio_diario**2 + desvio_anual**2) / 2
+    return logs
+
+
+def _economias_bloco(base, incremento, cenarios, anos, premissas, semente):
+    """Economia anual (cenários, anos) já com o índice de reajuste tarifário."""
+    rng = np.random.default_rng(semente)
+    dias = base.shape[0]
+    formato = (cenarios, anos, dias)
+    log_clima = _log_fator(rng, premissas["clima_desvio_diario"], premissas["clima_desvio_anual"], formato)
+    log_consumo = _log_fator(rng, premissas["consumo_desvio_diario"], premissas["consumo_desvio_anual"], formato)
+
+    # Interpolação linear na grade uniforme de razões clima/consumo: o índice
+    # sai direto da razão e a fração fica no próprio array da razão
+    log_clima -= log_consumo
+    posicao = np.exp(log_clima, out=log_clima)
+    np.clip(posicao, 0.0, RAZAO_MAXIMA, out=posicao)
+    posicao *= (PONTOS_RAZAO - 1) / RAZAO_MAXIMA
+    inteiro = np.floor(posicao)
+    indice = inteiro.astype(np.int32)
+    indice += np.arange(dias, dtype=np.int32) * PONTOS_RAZAO  # linha do dia na tabela achatada
+    posicao -= inteiro
+    economia_dia = np.take(incremento, indice)
+    economia_dia *= posicao
+    economia_dia += np.take(base, indice)
+    economia_dia *= np.exp(log_consumo, out=log_consumo)
+    economia = economia_dia.sum(axis=2, dtype=np.float64)
+
+    reajuste = rng.normal(premissas["reajuste_medio"], premissas["reajuste_desvio"], (cenarios, anos - 1))
+    indice_tarifa = np.concatenate([np.ones((cenarios, 1)), np.cumprod(1.0 + reajuste, axis=1)], axis=1)
+    return economia * indice_tarifa
+
+
+def simular(gerado, consumido, pico, tarifa_normal, tarifa_pico, tarifa_compensacao, investimento,
+            cenarios: int = 10000, anos: int = financeiro.HORIZONTE_ANOS,
+            taxa_desconto: float = financeiro.TAXA_DESCONTO,
+            reajuste_medio: float = financeiro.REAJUSTE_TARIFA, reajuste_desvio: float = 0.02,
+            clima_desvio_diario: float = 0.30, clima_desvio_anual: float = 0.04,
+            consumo_desvio_diario: float = 0.15, consumo_desvio_anual: float = 0.05,
+            degradacao: float = financeiro.DEGRADACAO_ANUAL, om_fracao: float = financeiro.OM_FRACAO,
+            inflacao: float = financeiro.INFLACAO, ano_troca_inversor: int = financeiro.ANO_TROCA_INVERSOR,
+            inversor_fracao: float = financeiro.INVERSOR_FRACAO,
+            intervalos_por_dia: int = 24, semente: Optional[int] = 0,
+            processos: Optional[int] = None) -> ResultadoMonteCarlo:
+    """
+    `gerado` e `consumido` são o ano esperado (H,), como em financeiro.calcular;
+    os desvios são dos fatores lognormais de média 1 (diário e anual) e o
+    reajuste tarifário é normal por ano, acumulado a partir do ano 2. As
+    demais premissas seguem financeiro.fluxo_caixa.
+    """
+    tabela = tabela_diaria(gerado, consumido, pico, tarifa_normal, tarifa_pico, tarifa_compensacao,
+                           intervalos_por_dia)
+    premissas = {
+        "clima_desvio_diario": clima_desvio_diario, "clima_desvio_anual": clima_desvio_anual,
+        "consumo_desvio_diario": consumo_desvio_diario, "consumo_desvio_anual": consumo_desvio_anual,
+        "reajuste_medio": reajuste_medio, "reajuste_desvio": reajuste_desvio,
+    }
+    tamanhos = [min(CENARIOS_POR_BLOCO, cenarios - inicio) for inicio in range(0, cenarios, CENARIOS_POR_BLOCO)]
+    sementes = np.random.SeedSequence(semente).spawn(len(tamanhos))
+    if processos is None:
+        processos = (os.cpu_count() or 1) if cenarios >= CENARIOS_PARALELO else 1
+    # float32 basta para a economia de um dia; o incremento até o ponto
+    # seguinte da grade (0 no último) dispensa um segundo acesso à tabela
+    base = tabela.astype(np.float32)
+    incremento = np.zeros_like(base)
+    incremento[:, :-1] = np.diff(base, axis=1)
+    argumentos = [(base, incremento, n, anos, premissas, s) for n, s in zip(tamanhos, sementes)]
+    if processos > 1 and len(argumentos) > 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            blocos = list(executor.map(_economias_bloco, *zip(*argumentos)))
+    else:
+        blocos = [_economias_bloco(*a) for a in argumentos]
+
+    fluxos = financeiro.fluxo_caixa(np.concatenate(blocos), investimento, degradacao, om_fracao, inflacao,
+                                    ano_troca_inversor, inversor_fracao)
+    resultado = financeiro.indicadores(fluxos, taxa_desconto)
+    return ResultadoMonteCarlo(resultado.payback_anos, resultado.vpl, resultado.tir, fluxos)
@@ -5,6 +5,11 @@ import plotly.express as px
 from datetime import datetime
 import locale
 from shared import aplicar_estilo_solar
+import financeiro
+import montecarlo
+import sensibilidade
+import dimensionamento
+import fotovoltaico
 
 # --- CONFIGURAÇÃO INICIAL ---
 # Troquei o solzinho por um ícone de raio (mais técnico) ou poderia ser o logo da empresa
@@ -47,7 +52,12 @@ with st.sidebar:
         "Captação Solar", 
         color="#FF8C00"
     )
-    intensidade_sol = st.slider("Eficiência (%)", 50, 150, 100, help="100% considera irradiação plena.")
+    intensidade_sol = st.slider("Eficiência (%)", 50, 150, 100, help="100% considera irradiação plena (céu claro).")
+    potencia_kwp = st.number_input("Potência do Sistema (kWp)", value=5.0, min_value=0.5, step=0.5, format="%.1f")
+    latitude = st.number_input("Latitude", value=-23.55, min_value=-90.0, max_value=90.0, step=0.5, format="%.2f")
+    longitude = st.number_input("Longitude", value=-46.63, min_value=-180.0, max_value=180.0, step=0.5, format="%.2f")
+    inclinacao = st.slider("Inclinação dos Módulos (°)", 0, 60, int(round(abs(latitude))))
+    azimute = st.slider("Azimute (°, 0 = Norte)", 0, 359, 0 if latitude < 0 else 180)
     
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -70,59 +80,96 @@ with st.sidebar:
     tarifa_pico = st.number_input("Tarifa Pico (R$/kWh)", value=0.85, step=0.01, format="%.2f")
     tarifa_compensacao = st.number_input("Tarifa Compensação (R$/kWh)", value=0.50, step=0.01, format="%.2f")
     investimento_inicial = st.number_input("Investimento Inicial (R$)", value=15000.0, step=500.0, format="%.2f")
+    taxa_desconto = st.number_input("Taxa de Desconto (% a.a.)", value=8.0, step=0.5, format="%.1f")
+    reajuste_tarifa = st.number_input("Reajuste Tarifário Médio (% a.a.)", value=6.0, step=0.5, format="%.1f")
+    cenarios = st.select_slider("Cenários (Monte Carlo)", options=[1000, 2000, 5000, 10000, 20000], value=10000)
+
+    with st.expander("Premissas do Fluxo de Caixa"):
+        degradacao = st.number_input("Degradação dos Módulos (% a.a.)", value=financeiro.DEGRADACAO_ANUAL * 100,
+                                     step=0.1, format="%.1f")
+        om_percentual = st.number_input("O&M (% do investimento a.a.)", value=financeiro.OM_FRACAO * 100,
+                                        step=0.5, format="%.1f")
+        inflacao = st.number_input("Inflação (% a.a.)", value=financeiro.INFLACAO * 100, step=0.5, format="%.1f")
+        ano_troca_inversor = st.slider("Troca do Inversor (ano, 0 = sem troca)", 0, financeiro.HORIZONTE_ANOS,
+                                       financeiro.ANO_TROCA_INVERSOR)
+        inversor_percentual = st.number_input("Custo do Inversor (% do investimento)",
+                                              value=financeiro.INVERSOR_FRACAO * 100, step=1.0, format="%.1f")
+    premissas_fluxo = {
+        "degradacao": degradacao / 100, "om_fracao": om_percentual / 100, "inflacao": inflacao / 100,
+        "ano_troca_inversor": ano_troca_inversor, "inversor_fracao": inversor_percentual / 100,
+    }
 
 # --- LÓGICA DE DADOS (MANTIDA 100% IGUAL) ---
 @st.cache_data
-def gerar_dados(data, intensidade, consumo_medio):
-    horas = pd.date_range(start=pd.Timestamp(data), periods=24, freq="h")
-    # Pequeno ajuste para garantir que não gere negativo na aleatoriedade
-    gerado = np.maximum(0, np.random.uniform(0, 8, size=24) * (intensidade / 100))
-    # Zera geração à noite (aprox 19h as 06h) para realismo
-    horas_noite = [h.hour < 6 or h.hour > 18 for h in horas]
-    gerado[horas_noite] = 0
-    
-    consumido = np.maximum(0, np.random.normal(loc=consumo_medio, scale=1.2, size=24))
-    
-    horarios_pico = [(h.hour >= 18 and h.hour <= 21) for h in horas]
-    
+def gerar_dados(ano, intensidade, consumo_medio, potencia_kwp, latitude, longitude, inclinacao, azimute):
+    # Ano inteiro, hora a hora: geração pelo modelo físico (fotovoltaico.py),
+    # com a intensidade escalando a irradiação de céu claro
+    instantes = fotovoltaico.instantes_ano(ano)
+    producao = fotovoltaico.simular(
+        instantes, potencia_kwp, latitude=latitude, longitude=longitude, inclinacao=inclinacao,
+        azimute=azimute, transmitancia=intensidade / 100,
+        temperatura_ambiente=fotovoltaico.temperatura_tipica(instantes),
+    )
+    horas = pd.DatetimeIndex(instantes)
+
+    consumido = np.maximum(0, np.random.normal(loc=consumo_medio, scale=1.2, size=len(horas)))
+
+    horarios_pico = (horas.hour >= 18) & (horas.hour <= 21)
+
     df = pd.DataFrame({
         "Hora": horas,
-        "Gerado (kWh)": np.round(gerado, 2),
+        "Gerado (kWh)": np.round(producao.energia_kwh, 2),
         "Consumido (kWh)": np.round(consumido, 2),
         "Horario_Pico": horarios_pico
     })
-    
+
     df["Excedente (kWh)"] = np.round(df["Gerado (kWh)"] - df["Consumido (kWh)"], 2)
     return df
 
 @st.cache_data
 def calcular_financeiro(df, tarifa_normal, tarifa_pico, tarifa_compensacao):
-    df["Economia_Consumo"] = df.apply(
-        lambda row: min(row["Gerado (kWh)"], row["Consumido (kWh)"]) * (tarifa_pico if row["Horario_Pico"] else tarifa_normal), 
-        axis=1
+    # Motor vetorizado (financeiro.py): uma passada NumPy em vez de quatro df.apply por linha
+    resultado = financeiro.calcular(
+        df["Gerado (kWh)"].to_numpy(),
+        df["Consumido (kWh)"].to_numpy(),
+        df["Horario_Pico"].to_numpy(),
+        tarifa_normal, tarifa_pico, tarifa_compensacao,
     )
-    
-    df["Ganho_Excedente"] = df.apply(
-        lambda row: max(0, row["Excedente (kWh)"]) * tarifa_compensacao,
-        axis=1
+    return df.assign(
+        Economia_Consumo=resultado.economia_consumo,
+        Ganho_Excedente=resultado.ganho_excedente,
+        Custo_Sem_Solar=resultado.custo_sem_solar,
+        Custo_Real=resultado.custo_real,
+        Economia_Total=resultado.economia_total,
     )
-    
-    df["Custo_Sem_Solar"] = df.apply(
-        lambda row: row["Consumido (kWh)"] * (tarifa_pico if row["Horario_Pico"] else tarifa_normal),
-        axis=1
+
+@st.cache_data
+def projetar_retorno(df, tarifa_normal, tarifa_pico, tarifa_compensacao, investimento, taxa_desconto,
+                     reajuste, cenarios, premissas_fluxo):
+    # Monte Carlo (montecarlo.py): clima, consumo e reajuste sorteados ano a ano em 25 anos
+    resultado = montecarlo.simular(
+        df["Gerado (kWh)"].to_numpy(), df["Consumido (kWh)"].to_numpy(), df["Horario_Pico"].to_numpy(),
+        tarifa_normal, tarifa_pico, tarifa_compensacao, investimento,
+        cenarios=cenarios, taxa_desconto=taxa_desconto / 100, reajuste_medio=reajuste / 100, **premissas_fluxo,
     )
-    
-    df["Custo_Real"] = df.apply(
-        lambda row: max(0, row["Consumido (kWh)"] - row["Gerado (kWh)"]) * (tarifa_pico if row["Horario_Pico"] else tarifa_normal),
-        axis=1
+    return resultado.percentis()
+
+def montar_fluxo_caixa(economia_anual, investimento, reajuste, premissas_fluxo):
+    # Fluxo esperado (financeiro.fluxo_caixa), ano a ano, para o gráfico e a tabela
+    fluxos = financeiro.fluxo_caixa(
+        financeiro.economias_anuais(economia_anual, reajuste=reajuste / 100), investimento, **premissas_fluxo
     )
-    
-    df["Economia_Total"] = df["Economia_Consumo"] + df["Ganho_Excedente"]
-    return df
+    return pd.DataFrame({
+        "Ano": np.arange(len(fluxos)),
+        "Fluxo (R$)": fluxos,
+        "Acumulado (R$)": np.cumsum(fluxos),
+    })
 
-# Processamento
-dados = gerar_dados(data_base, intensidade_sol, consumo_base)
-dados_financeiro = calcular_financeiro(dados, tarifa_normal, tarifa_pico, tarifa_compensacao)
+# Processamento: o ano da data de referência inteiro; gráficos e tabela mostram o dia
+dados_ano = gerar_dados(data_base.year, intensidade_sol, consumo_base, potencia_kwp, latitude, longitude,
+                        inclinacao, azimute)
+financeiro_ano = calcular_financeiro(dados_ano, tarifa_normal, tarifa_pico, tarifa_compensacao)
+dados_financeiro = financeiro_ano[financeiro_ano["Hora"].dt.date == data_base].reset_index(drop=True)
 
 # --- INTERFACE PRINCIPAL ---
 # Título limpo, sem emoji
@@ -175,9 +222,21 @@ c4.metric("Economia Hoje", format_currency(dados_financeiro['Economia_Total'].su
 
 # --- PROJEÇÕES FINANCEIRAS ---
 economia_diaria = dados_financeiro['Economia_Total'].sum()
-economia_mensal = economia_diaria * 30
-economia_anual = economia_diaria * 365
-tempo_retorno = investimento_inicial / economia_anual if economia_anual > 0 else float('inf')
+economia_anual = financeiro_ano['Economia_Total'].sum()
+economia_mensal = economia_anual / 12
+producao_anual = financeiro_ano['Gerado (kWh)'].sum()
+retorno = projetar_retorno(dados_ano, tarifa_normal, tarifa_pico, tarifa_compensacao, investimento_inicial,
+                           taxa_desconto, reajuste_tarifa, cenarios, premissas_fluxo)
+payback, vpl, tir = retorno["payback_anos"], retorno["vpl"], retorno["tir"]
+tempo_retorno = payback["P50"]
+fluxo_caixa = montar_fluxo_caixa(economia_anual, investimento_inicial, reajuste_tarifa, premissas_fluxo)
+economia_horizonte = fluxo_caixa["Fluxo (R$)"].iloc[1:].sum()
+
+def format_anos(value):
+    return f"{value:.1f} anos" if np.isfinite(value) else "> 25 anos"
+
+def format_taxa(value):
+    return f"{value * 100:.1f}%" if np.isfinite(value) else "—"
 
 st.markdown("<br>", unsafe_allow_html=True)
 
@@ -188,15 +247,216 @@ with st.container(border=True): # Caixa bonita
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Economia Mensal", format_currency(economia_mensal))
     col2.metric("Economia Anual", format_currency(economia_anual))
-    col3.metric("Payback Estimado", f"{tempo_retorno:.1f} anos", 
-                delta="Bom" if tempo_retorno < 5 else "Médio", delta_color="inverse")
-    col4.metric("Economia em 25 Anos", format_currency(economia_anual * 25))
+    col3.metric("Payback Estimado (P50)", format_anos(tempo_retorno),
+                delta="Bom" if tempo_retorno < 5 else "Médio", delta_color="inverse",
+                help=f"P10–P90: {format_anos(payback['P10'])} a {format_anos(payback['P90'])}")
+    col4.metric("Economia em 25 Anos", format_currency(economia_horizonte),
+                help="Fluxo esperado: reajuste tarifário e degradação, já descontados O&M e troca do inversor")
+
+    col5, col6, col7 = st.columns(3)
+    col5.metric("VPL (P50)", format_currency(vpl["P50"]),
+                help=f"P10–P90: {format_currency(vpl['P10'])} a {format_currency(vpl['P90'])}")
+    col6.metric("TIR (P50)", format_taxa(tir["P50"]),
+                help=f"P10–P90: {format_taxa(tir['P10'])} a {format_taxa(tir['P90'])}, entre os cenários com TIR; "
+                     f"{retorno['fracao_sem_tir']:.0%} dos cenários não têm TIR")
+    col7.metric("Cenários Simulados", f"{cenarios:,}".replace(",", "."))
+    st.caption(f"Faixa P10–P90 do payback: {format_anos(payback['P10'])} a {format_anos(payback['P90'])}; "
+               f"clima, consumo e reajuste tarifário sorteados em cada cenário.")
+
+    fig_fluxo = px.bar(
+        fluxo_caixa.assign(Situacao=np.where(fluxo_caixa["Acumulado (R$)"] < 0, "A recuperar", "Recuperado")),
+        x="Ano",
+        y="Acumulado (R$)",
+        color="Situacao",
+        color_discrete_map={"A recuperar": "#1E3A8A", "Recuperado": "#10B981"},
+        labels={"Acumulado (R$)": "Fluxo Acumulado (R$)", "Situacao": "Investimento"}
+    )
+    fig_fluxo.update_layout(legend=dict(orientation="h", y=1.1, x=0), margin=dict(l=0, r=0, t=0, b=0))
+    st.plotly_chart(fig_fluxo, use_container_width=True)
 
     # Barra de Progresso
     if tempo_retorno < 20:
         progresso = min(1.0, max(0.0, 1 - (tempo_retorno / 10))) 
         st.progress(progresso, text=f"Viabilidade do Investimento: {progresso*100:.0f}%")
 
+# --- ANÁLISE DE SENSIBILIDADE ---
+# Parâmetros que a varredura aceita: rótulo -> (nome em sensibilidade.py, escala da tela, valor atual)
+PARAMETROS_VARREDURA = {
+    "Eficiência (%)": ("intensidade_sol", 1, intensidade_sol),
+    "Potência do Sistema (kWp)": ("potencia_kwp", 1, potencia_kwp),
+    "Média Horária de Consumo (kWh)": ("consumo_base", 1, consumo_base),
+    "Tarifa Normal (R$/kWh)": ("tarifa_normal", 1, tarifa_normal),
+    "Tarifa Pico (R$/kWh)": ("tarifa_pico", 1, tarifa_pico),
+    "Tarifa Compensação (R$/kWh)": ("tarifa_compensacao", 1, tarifa_compensacao),
+    "Investimento Inicial (R$)": ("investimento", 1, investimento_inicial),
+    "Taxa de Desconto (% a.a.)": ("taxa_desconto", 100, taxa_desconto),
+    "Reajuste Tarifário (% a.a.)": ("reajuste", 100, reajuste_tarifa),
+}
+METRICAS_VARREDURA = {
+    "Payback (anos)": "payback_anos",
+    "Economia em 25 Anos (R$)": "economia_horizonte",
+    "Economia Anual (R$)": "economia_anual",
+    "VPL (R$)": "vpl",
+}
+
+@st.cache_data
+def rodar_varredura(faixas, base):
+    return sensibilidade.varrer(faixas, base)
+
+@st.cache_data
+def rodar_tornado(faixas, metrica, base):
+    return sensibilidade.tornado(faixas, metrica, base)
+
+st.markdown("<br>", unsafe_allow_html=True)
+# SVG: Sliders
+render_icon('<line x1="4" y1="21" x2="4" y2="14"></line><line x1="4" y1="10" x2="4" y2="3"></line><line x1="12" y1="21" x2="12" y2="12"></line><line x1="12" y1="8" x2="12" y2="3"></line><line x1="20" y1="21" x2="20" y2="16"></line><line x1="20" y1="12" x2="20" y2="3"></line><line x1="1" y1="14" x2="7" y2="14"></line><line x1="9" y1="8" x2="15" y2="8"></line><line x1="17" y1="16" x2="23" y2="16"></line>', "Análise de Sensibilidade", "#FF8C00")
+
+if st.toggle("Modo Varredura", help="Avalia a grade completa de faixas dos parâmetros de uma só vez"):
+    selecionados = st.multiselect(
+        "Parâmetros Varridos", list(PARAMETROS_VARREDURA),
+        default=["Eficiência (%)", "Média Horária de Consumo (kWh)", "Tarifa Normal (R$/kWh)"],
+    )
+    with st.form("form_varredura"):
+        faixas_tela = {}
+        for rotulo in selecionados:
+            _, _, atual = PARAMETROS_VARREDURA[rotulo]
+            col_faixa, col_pontos = st.columns([3, 1])
+            minimo, maximo = col_faixa.slider(rotulo, 0.0, float(atual) * 2 or 1.0,
+                                              (float(atual) * 0.5, float(atual) * 1.5))
+            pontos = col_pontos.number_input(f"Pontos ({rotulo})", value=50 if len(faixas_tela) < 2 else 20,
+                                             min_value=2, max_value=100, label_visibility="collapsed")
+            faixas_tela[rotulo] = np.linspace(minimo, maximo, int(pontos))
+        metrica_rotulo = st.selectbox("Métrica", list(METRICAS_VARREDURA))
+        submitted = st.form_submit_button("Rodar Varredura", type="primary", use_container_width=True)
+
+    if submitted:
+        st.session_state["varredura"] = (faixas_tela, metrica_rotulo)
+
+    if st.session_state.get("varredura") and st.session_state["varredura"][0]:
+        faixas_tela, metrica_rotulo = st.session_state["varredura"]
+        metrica = METRICAS_VARREDURA[metrica_rotulo]
+        base_varredura = {
+            "ano": data_base.year, "latitude": latitude, "longitude": longitude,
+            "inclinacao": inclinacao, "azimute": azimute, **premissas_fluxo,
+            **{nome: atual / escala for nome, escala, atual in PARAMETROS_VARREDURA.values()},
+        }
+        faixas = {PARAMETROS_VARREDURA[r][0]: v / PARAMETROS_VARREDURA[r][1] for r, v in faixas_tela.items()}
+        varredura = rodar_varredura(faixas, base_varredura)
+        st.caption(f"{varredura.payback_anos.size:,} combinações avaliadas".replace(",", "."))
+
+        tab_tornado, tab_mapa = st.tabs(["Tornado", "Mapa de Calor"])
+        with tab_tornado:
+            tornado = rodar_tornado(faixas, metrica, base_varredura)
+            rotulos = {PARAMETROS_VARREDURA[r][0]: r for r in faixas_tela}
+            df_tornado = pd.DataFrame({
+                "Parâmetro": [rotulos[nome] for nome in tornado.parametros] * 2,
+                "Variação": np.concatenate([tornado.no_minimo, tornado.no_maximo]) - tornado.base,
+                "Faixa": ["Mínimo"] * len(tornado.parametros) + ["Máximo"] * len(tornado.parametros),
+            }).replace([np.inf, -np.inf], np.nan)
+            fig_tornado = px.bar(
+                df_tornado, x="Variação", y="Parâmetro", color="Faixa", orientation="h", barmode="overlay",
+                color_discrete_map={"Mínimo": "#1E3A8A", "Máximo": "#FF8C00"},
+                labels={"Variação": f"{metrica_rotulo} — variação sobre a base ({tornado.base:,.2f})"},
+            )
+            fig_tornado.update_layout(yaxis=dict(autorange="reversed"), margin=dict(l=0, r=0, t=0, b=0))
+            st.plotly_chart(fig_tornado, use_container_width=True)
+        with tab_mapa:
+            if len(faixas_tela) >= 2:
+                col_x, col_y = st.columns(2)
+                rotulo_x = col_x.selectbox("Eixo X", list(faixas_tela), index=0)
+                rotulo_y = col_y.selectbox("Eixo Y", [r for r in faixas_tela if r != rotulo_x], index=0)
+                x, y = PARAMETROS_VARREDURA[rotulo_x][0], PARAMETROS_VARREDURA[rotulo_y][0]
+                # Demais eixos no ponto da grade mais próximo do valor atual
+                fixos = {
+                    PARAMETROS_VARREDURA[r][0]: int(np.argmin(np.abs(v - PARAMETROS_VARREDURA[r][2])))
+                    for r, v in faixas_tela.items()
+                }
+                matriz = varredura.fatia(metrica, x, y, fixos)
+                fig_mapa = px.imshow(
+                    np.where(np.isfinite(matriz), matriz, np.nan), x=faixas_tela[rotulo_x], y=faixas_tela[rotulo_y],
+                    origin="lower", aspect="auto", color_continuous_scale="RdYlGn_r" if metrica == "payback_anos" else "RdYlGn",
+                    labels=dict(x=rotulo_x, y=rotulo_y, color=metrica_rotulo),
+                )
+                fig_mapa.update_layout(margin=dict(l=0, r=0, t=0, b=0))
+                st.plotly_chart(fig_mapa, use_container_width=True)
+            else:
+                rotulo = next(iter(faixas_tela))
+                fig_linha = px.line(
+                    x=faixas_tela[rotulo], y=np.where(np.isfinite(getattr(varredura, metrica)),
+                                                      getattr(varredura, metrica), np.nan),
+                    labels={"x": rotulo, "y": metrica_rotulo}, markers=True,
+                )
+                st.plotly_chart(fig_linha, use_container_width=True)
+
+# --- DIMENSIONAMENTO ÓTIMO ---
+@st.cache_data
+def dimensionar(df, potencia_atual, tarifa_normal, tarifa_pico, tarifa_compensacao, objetivo, potencia_max,
+                bateria_max, custos, taxa_desconto, reajuste, premissas_fluxo):
+    # Perfil de 1 kWp a partir do ano simulado (a produção é linear na potência)
+    return dimensionamento.otimizar(
+        df["Gerado (kWh)"].to_numpy() / potencia_atual, df["Consumido (kWh)"].to_numpy(),
+        df["Horario_Pico"].to_numpy(), tarifa_normal, tarifa_pico, tarifa_compensacao,
+        objetivo=objetivo, potencia_max=potencia_max, bateria_max=bateria_max,
+        taxa_desconto=taxa_desconto / 100, reajuste=reajuste / 100, **custos, **premissas_fluxo,
+    )
+
+st.markdown("<br>", unsafe_allow_html=True)
+# SVG: Alvo
+render_icon('<circle cx="12" cy="12" r="10"></circle><circle cx="12" cy="12" r="6"></circle><circle cx="12" cy="12" r="2"></circle>', "Dimensionamento Ótimo", "#10B981")
+
+with st.expander("Qual tamanho de sistema comprar?"):
+    with st.form("form_dimensionamento"):
+        col_a, col_b, col_c = st.columns(3)
+        objetivo_rotulo = col_a.selectbox("Objetivo", ["Maior VPL", "Menor Payback"])
+        custo_fixo = col_b.number_input("Custo Fixo (R$)", value=dimensionamento.CUSTO_FIXO, step=500.0, format="%.2f")
+        custo_kwp = col_c.number_input(
+            "Custo por kWp (R$)", step=100.0, format="%.2f",
+            value=max(investimento_inicial - dimensionamento.CUSTO_FIXO, 0.0) / potencia_kwp or dimensionamento.CUSTO_KWP,
+        )
+        consumo_anual = dados_ano["Consumido (kWh)"].sum()
+        # Padrão: o sistema que gera o dobro do consumo anual
+        potencia_dobro = 2 * consumo_anual / max(producao_anual / potencia_kwp, 1.0)
+        potencia_max = st.slider("Potência Máxima Avaliada (kWp)", 1.0, 200.0,
+                                 float(np.clip(round(potencia_dobro), 1.0, 200.0)), step=0.5)
+        col_d, col_e, col_f = st.columns(3)
+        incluir_bateria = col_d.checkbox("Avaliar Bateria", value=False)
+        bateria_max = col_e.number_input("Bateria Máxima (kWh)", value=20.0, min_value=0.0, step=5.0, format="%.1f")
+        custo_bateria = col_f.number_input("Custo da Bateria (R$/kWh)", value=dimensionamento.CUSTO_BATERIA_KWH,
+                                           step=100.0, format="%.2f")
+        otimizar_agora = st.form_submit_button("Otimizar", type="primary", use_container_width=True)
+
+    if otimizar_agora:
+        objetivo = "vpl" if objetivo_rotulo == "Maior VPL" else "payback"
+        dimensionado = dimensionar(
+            dados_ano, potencia_kwp, tarifa_normal, tarifa_pico, tarifa_compensacao, objetivo, potencia_max,
+            bateria_max if incluir_bateria else 0.0,
+            {"custo_fixo": custo_fixo, "custo_kwp": custo_kwp, "custo_bateria_kwh": custo_bateria},
+            taxa_desconto, reajuste_tarifa, premissas_fluxo,
+        )
+        otimo = dimensionado.otimo
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Potência Ideal", f"{otimo.potencia_kwp:.2f} kWp", f"Atual: {potencia_kwp:.1f} kWp",
+                    delta_color="off")
+        col2.metric("Bateria", f"{otimo.bateria_kwh:.1f} kWh" if otimo.bateria_kwh else "Sem bateria")
+        col3.metric("Investimento", format_currency(otimo.investimento))
+        col4.metric("Payback / VPL", format_anos(otimo.payback_anos), format_currency(otimo.vpl), delta_color="off")
+        if dimensionado.no_limite:
+            st.warning("O ótimo ficou no limite superior da busca: aumente a potência ou a bateria máxima avaliada.")
+
+        fronteira = pd.DataFrame(dimensionado.fronteira._asdict())
+        eixo_y = "vpl" if objetivo == "vpl" else "payback_anos"
+        fig_fronteira = px.scatter(
+            fronteira.replace([np.inf, -np.inf], np.nan), x="potencia_kwp", y=eixo_y,
+            color="bateria_kwh" if incluir_bateria else None,
+            color_continuous_scale="Oranges", color_discrete_sequence=["#10B981"], hover_data=["investimento", "economia_anual"],
+            labels={"potencia_kwp": "Potência (kWp)", "vpl": "VPL (R$)", "payback_anos": "Payback (anos)",
+                    "bateria_kwh": "Bateria (kWh)", "investimento": "Investimento (R$)",
+                    "economia_anual": "Economia Anual (R$)"},
+        )
+        fig_fronteira.update_layout(margin=dict(l=0, r=0, t=0, b=0))
+        st.plotly_chart(fig_fronteira, use_container_width=True)
+        st.caption(f"{len(fronteira)} configurações avaliadas em {dimensionado.rodadas} rodadas de refinamento.")
+
 # --- TABELA DE DADOS ---
 st.markdown("<br>", unsafe_allow_html=True)
 # SVG: Lista
@@ -234,13 +494,28 @@ with st.expander("Relatório Executivo Completo"):
     **Resumo da Simulação:**
     O sistema simulado com **{intensidade_sol}% de eficiência** gerou uma economia diária de **{format_currency(economia_diaria)}**.
     
+    * **Produção anual estimada:** {producao_anual:,.0f} kWh ({producao_anual / potencia_kwp:,.0f} kWh/kWp)
     * **Investimento:** {format_currency(investimento_inicial)}
-    * **Retorno em:** {tempo_retorno:.1f} anos
-    * **Lucro Projetado (25 anos):** {format_currency((economia_anual * 25) - investimento_inicial)}
-    * **ROI em 25 anos:** {((economia_anual * 25 - investimento_inicial) / investimento_inicial * 100):.1f}%
+    * **Retorno em:** {format_anos(tempo_retorno)} (P10–P90: {format_anos(payback['P10'])} a {format_anos(payback['P90'])})
+    * **VPL a {taxa_desconto:.1f}% a.a.:** {format_currency(vpl['P50'])} · **TIR:** {format_taxa(tir['P50'])}
+    * **Lucro Projetado (25 anos):** {format_currency(economia_horizonte - investimento_inicial)}
+    * **ROI em 25 anos:** {((economia_horizonte - investimento_inicial) / investimento_inicial * 100):.1f}%
     
     **Configurações utilizadas:**
     - Tarifa normal: {format_currency(tarifa_normal)}/kWh
     - Tarifa pico: {format_currency(tarifa_pico)}/kWh
     - Tarifa compensação: {format_currency(tarifa_compensacao)}/kWh
-    """)
\ No newline at end of file
+    - Reajuste tarifário: {reajuste_tarifa:.1f}% a.a. · Degradação: {degradacao:.1f}% a.a.
+    - O&M: {om_percentual:.1f}% do investimento a.a. · Inflação: {inflacao:.1f}% a.a.
+    - Troca do inversor: {f"ano {ano_troca_inversor} ({inversor_percentual:.0f}% do investimento)" if ano_troca_inversor else "não considerada"}
+    """)
+
+    st.dataframe(
+        fluxo_caixa,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Fluxo (R$)": st.column_config.NumberColumn("Fluxo do Ano", format="R$ %.2f"),
+            "Acumulado (R$)": st.column_config.NumberColumn("Acumulado", format="R$ %.2f"),
+        }
+    )
\ No newline at end of file
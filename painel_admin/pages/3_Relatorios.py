@@ -3,6 +3,7 @@ import sys
 from datetime import datetime, timedelta
 from io import BytesIO
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -11,6 +12,7 @@ from plotly.subplots import make_subplots
 
 # Importa o estilo global
 from shared import aplicar_estilo_solar
+import financeiro
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
 
@@ -83,9 +85,31 @@ with st.sidebar:
     
     tipo_relatorio = st.selectbox(
         "Selecione a Visão",
-        ["Resumo Geral", "Análise Detalhada", "Comparativo Mensal", "Eficiência e Performance"],
+        ["Resumo Geral", "Análise Detalhada", "Comparativo Mensal", "Eficiência e Performance",
+         "Viabilidade Financeira"],
         label_visibility="collapsed"
     )
+
+    premissas_financeiras = None
+    if tipo_relatorio == "Viabilidade Financeira":
+        with st.expander("Premissas Financeiras", expanded=True):
+            premissas_financeiras = {
+                "investimento": st.number_input("Investimento (R$)", value=15000.0, step=500.0, format="%.2f"),
+                "taxa_desconto": st.number_input("Taxa de Desconto (% a.a.)", value=financeiro.TAXA_DESCONTO * 100,
+                                                 step=0.5, format="%.1f"),
+                "reajuste": st.number_input("Reajuste Tarifário (% a.a.)", value=financeiro.REAJUSTE_TARIFA * 100,
+                                            step=0.5, format="%.1f"),
+                "degradacao": st.number_input("Degradação (% a.a.)", value=financeiro.DEGRADACAO_ANUAL * 100,
+                                              step=0.1, format="%.1f"),
+                "om_fracao": st.number_input("O&M (% do investimento a.a.)", value=financeiro.OM_FRACAO * 100,
+                                             step=0.5, format="%.1f"),
+                "inflacao": st.number_input("Inflação (% a.a.)", value=financeiro.INFLACAO * 100, step=0.5,
+                                            format="%.1f"),
+                "ano_troca_inversor": st.slider("Troca do Inversor (ano)", 0, financeiro.HORIZONTE_ANOS,
+                                                financeiro.ANO_TROCA_INVERSOR),
+                "inversor_fracao": st.number_input("Custo do Inversor (% do investimento)",
+                                                   value=financeiro.INVERSOR_FRACAO * 100, step=1.0, format="%.1f"),
+            }
     
     with st.expander("Configurações de Visualização"):
         mostrar_graficos = st.checkbox("Exibir Gráficos", value=True)
@@ -99,6 +123,7 @@ with st.sidebar:
         st.session_state.tipo_relatorio = tipo_relatorio
         st.session_state.mostrar_graficos = mostrar_graficos
         st.session_state.mostrar_metricas = mostrar_metricas
+        st.session_state.premissas_financeiras = premissas_financeiras
 
 # --- FUNÇÕES AUXILIARES ---
 def exportar_dados(df, formato="csv"):
@@ -111,7 +136,7 @@ def exportar_dados(df, formato="csv"):
         return output.getvalue()
 
 def renderizar_graficos(df, tipo_relatorio):
-    if tipo_relatorio == "Resumo Geral":
+    if tipo_relatorio in ("Resumo Geral", "Viabilidade Financeira"):
         col_g1, col_g2 = st.columns([2, 1])
         with col_g1:
             render_icon('<polyline points="22 12 18 12 15 21 9 3 6 12 2 12"></polyline>', "Produção vs Consumo")
@@ -194,12 +219,62 @@ def renderizar_graficos(df, tipo_relatorio):
         fig2.update_traces(line_color=CORES['excedente'], line_width=4)
         st.plotly_chart(fig2, use_container_width=True)
 
+def renderizar_viabilidade(df, premissas):
+    # Fluxo de caixa de 25 anos (financeiro.py) a partir da economia média observada no período
+    economia_ano1 = df['Economia (R$)'].mean() * 365
+    investimento = premissas["investimento"]
+    custos = {
+        "degradacao": premissas["degradacao"] / 100, "om_fracao": premissas["om_fracao"] / 100,
+        "inflacao": premissas["inflacao"] / 100, "ano_troca_inversor": premissas["ano_troca_inversor"],
+        "inversor_fracao": premissas["inversor_fracao"] / 100,
+    }
+    fluxos = financeiro.fluxo_caixa(
+        financeiro.economias_anuais(economia_ano1, reajuste=premissas["reajuste"] / 100), investimento, **custos
+    )
+    resultado = financeiro.indicadores(fluxos, premissas["taxa_desconto"] / 100)
+
+    payback = float(resultado.payback_anos)
+    tir = float(resultado.tir)
+    with st.container(border=True):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("VPL", f"R$ {float(resultado.vpl):,.2f}", f"Taxa: {premissas['taxa_desconto']:.1f}% a.a.")
+        col2.metric("TIR", f"{tir * 100:.1f}%" if np.isfinite(tir) else "—", "Ao ano")
+        col3.metric("Payback", f"{payback:.1f} anos" if np.isfinite(payback) else "> 25 anos", "Fluxo nominal")
+        col4.metric("ROI (25 anos)", f"{float(resultado.roi) * 100:.0f}%", f"Economia ano 1: R$ {economia_ano1:,.0f}")
+
+    col_g1, col_g2 = st.columns([3, 2])
+    with col_g1:
+        render_icon('<line x1="12" y1="20" x2="12" y2="10"></line><line x1="18" y1="20" x2="18" y2="4"></line><line x1="6" y1="20" x2="6" y2="16"></line>', "Fluxo de Caixa (25 anos)")
+        anos = np.arange(len(fluxos))
+        fig1 = make_subplots(specs=[[{"secondary_y": True}]])
+        fig1.add_trace(go.Bar(x=anos, y=fluxos, name='Fluxo do Ano',
+                              marker_color=np.where(fluxos < 0, CORES['consumido'], CORES['excedente'])))
+        fig1.add_trace(go.Scatter(x=anos, y=np.cumsum(fluxos), name='Acumulado',
+                                  line=dict(color=CORES['gerado'], width=3)), secondary_y=True)
+        fig1.update_layout(legend=dict(orientation="h", y=1.1), hovermode="x unified")
+        st.plotly_chart(fig1, use_container_width=True)
+    with col_g2:
+        # Sensibilidade: VPL para toda a grade taxa x reajuste em uma única chamada vetorizada
+        render_icon('<polyline points="23 6 13.5 15.5 8.5 10.5 1 18"></polyline><polyline points="17 6 23 6 23 12"></polyline>', "Sensibilidade do VPL")
+        taxas = np.linspace(0.04, 0.16, 41)
+        reajustes = np.linspace(0.02, 0.10, 41)
+        taxa_grade, reajuste_grade = np.meshgrid(taxas, reajustes)
+        fluxos_grade = financeiro.fluxo_caixa(
+            financeiro.economias_anuais(economia_ano1, reajuste=reajuste_grade.ravel()), investimento, **custos
+        )
+        vpl_grade = financeiro.vpl(fluxos_grade, taxa_grade.ravel()).reshape(taxa_grade.shape)
+        fig2 = px.imshow(vpl_grade, x=taxas * 100, y=reajustes * 100, origin="lower", aspect="auto",
+                         labels=dict(x="Taxa de Desconto (%)", y="Reajuste Tarifário (%)", color="VPL (R$)"),
+                         color_continuous_scale='RdYlGn', color_continuous_midpoint=0)
+        st.plotly_chart(fig2, use_container_width=True)
+
 # --- LÓGICA PRINCIPAL ---
 if st.session_state.get("relatorio_gerado", False):
     dias_relatorio = st.session_state.get("dias_relatorio", 30)
     tipo_relatorio = st.session_state.get("tipo_relatorio", "Resumo Geral")
     mostrar_graficos = st.session_state.get("mostrar_graficos", True)
     mostrar_metricas = st.session_state.get("mostrar_metricas", True)
+    premissas_financeiras = st.session_state.get("premissas_financeiras")
     
     # Busca os dados (sem exibir gráficos ainda)
     if tipo_relatorio == "Comparativo Mensal":
@@ -259,6 +334,11 @@ if st.session_state.get("relatorio_gerado", False):
         c1.success(f"Melhor Dia: {metricas['melhor_dia']}")
         c2.warning(f"Pior Dia: {metricas['pior_dia']}")
         c3.info(f"Dias Positivos: {metricas['dias_com_excedente']} dias")
+
+    if tipo_relatorio == "Viabilidade Financeira" and premissas_financeiras:
+        st.markdown("<br>", unsafe_allow_html=True)
+        render_icon('<line x1="12" y1="1" x2="12" y2="23"></line><path d="M17 5H9.5a3.5 3.5 0 0 0 0 7h5a3.5 3.5 0 0 1 0 7H6"></path>', "Viabilidade do Investimento", "#10B981")
+        renderizar_viabilidade(df_relatorio, premissas_financeiras)
     
     # 2. GRÁFICOS (Agora inclui o Comparativo Mensal aqui dentro)
     if mostrar_graficos:
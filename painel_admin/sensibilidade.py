@@ -0,0 +1,220 @@
+"""
+Varredura de sensibilidade do simulador: grade cartesiana de parâmetros.
+
+`faixas` dá os valores de cada parâmetro varrido ({nome: valores}); os
+demais vêm de `base` (ver BASE). O resultado tem um eixo por parâmetro
+varrido, na ordem de `faixas`. A conta é separada pelo que cada grupo de
+parâmetros afeta:
+
+    geração    PV horário de 1 kWp por combinação de intensidade, inclinação
+               e azimute (a produção do modelo é linear na potência)
+    energia    somas por horário (financeiro.somas_energia) de cada par
+               geração x potência x consumo, em blocos de colunas
+    financeiro tarifas, investimento e premissas do fluxo de caixa entram
+               por broadcasting sobre as somas, sem voltar às 8760 horas
+
+Com muitos pares de energia (PARES_PARALELO) os blocos vão para um
+ProcessPoolExecutor; o fluxo de caixa é avaliado em blocos de pontos da
+grade (BLOCO_PONTOS) para limitar a memória.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+import financeiro
+import fotovoltaico
+
+GERACAO = ("intensidade_sol", "inclinacao", "azimute")
+ENERGIA = GERACAO + ("potencia_kwp", "consumo_base")
+FINANCEIROS = ("tarifa_normal", "tarifa_pico", "tarifa_compensacao", "investimento", "taxa_desconto",
+               "reajuste", "degradacao", "om_fracao", "inflacao", "ano_troca_inversor", "inversor_fracao")
+METRICAS = ("economia_anual", "economia_horizonte", "payback_anos", "vpl")
+
+# Mesmos padrões da barra lateral do simulador (taxas em fração)
+BASE = {
+    "ano": 2025, "latitude": -23.55, "longitude": -46.63,
+    "intensidade_sol": 100.0, "inclinacao": 24.0, "azimute": 0.0, "potencia_kwp": 5.0, "consumo_base": 4.0,
+    "tarifa_normal": 0.65, "tarifa_pico": 0.85, "tarifa_compensacao": 0.50, "investimento": 15000.0,
+    "taxa_desconto": financeiro.TAXA_DESCONTO, "reajuste": financeiro.REAJUSTE_TARIFA,
+    "degradacao": financeiro.DEGRADACAO_ANUAL, "om_fracao": financeiro.OM_FRACAO,
+    "inflacao": financeiro.INFLACAO, "ano_troca_inversor": financeiro.ANO_TROCA_INVERSOR,
+    "inversor_fracao": financeiro.INVERSOR_FRACAO,
+}
+# Desvio do consumo horário sorteado em torno de consumo_base, como no simulador
+DESVIO_CONSUMO = 1.2
+# Pares geração x potência x consumo por bloco (8760 x 512 float64 ~ 36 MB)
+BLOCO_PARES = 512
+# A partir daqui o padrão é usar todos os núcleos
+PARES_PARALELO = 8192
+# Pontos da grade por bloco no fluxo de caixa (x 26 anos)
+BLOCO_PONTOS = 16384
+
+
+class ResultadoVarredura(NamedTuple):
+    eixos: dict                      # {parâmetro: valores}, na ordem dos eixos
+    economia_anual: np.ndarray       # R$ no ano 1
+    economia_horizonte: np.ndarray   # soma dos fluxos dos anos 1..25 (após O&M e inversor)
+    payback_anos: np.ndarray         # inf quando não se paga no horizonte
+    vpl: np.ndarray
+
+    def fatia(self, metrica: str, x: str, y: str, fixos: Optional[dict] = None) -> np.ndarray:
+        """Matriz (len(y), len(x)) da métrica; os outros eixos no índice de `fixos` (padrão: o do meio)."""
+        fixos = fixos or {}
+        indice = tuple(
+            slice(None) if nome in (x, y) else fixos.get(nome, len(valores) // 2)
+            for nome, valores in self.eixos.items()
+        )
+        matriz = getattr(self, metrica)[indice]
+        restantes = [nome for nome in self.eixos if nome in (x, y)]
+        return matriz.T if restantes == [x, y] else matriz
+
+
+class Tornado(NamedTuple):
+    parametros: tuple        # ordenados pela amplitude, a maior primeiro
+    no_minimo: np.ndarray    # métrica com o parâmetro no início da faixa
+    no_maximo: np.ndarray    # métrica com o parâmetro no fim da faixa
+    base: float
+
+
+def _perfil_consumo(consumo_base, horas: int, semente: int) -> np.ndarray:
+    # Mesmo sorteio para todos os valores de consumo_base: a grade compara só o nível
+    ruido = np.random.default_rng(semente).standard_normal(horas)
+    return np.maximum(0.0, np.asarray(consumo_base, dtype=np.float64)[None, :] + DESVIO_CONSUMO * ruido[:, None])
+
+
+def _grade(tamanhos):
+    # Índices de cada eixo para todas as combinações: (eixos, combinações)
+    return np.indices(tamanhos).reshape(len(tamanhos), int(np.prod(tamanhos)))
+
+
+def _autoconsumo_bloco(geracao, consumo, pesos, coluna_geracao, potencia, coluna_consumo):
+    # Autoconsumo fora de ponta/ponta (2, n) de cada par: a única soma que depende do par
+    return pesos @ np.minimum(geracao[:, coluna_geracao] * potencia, consumo[:, coluna_consumo])
+
+
+# Perfis horários de cada processo do pool, enviados uma vez pelo initializer
+_perfis = ()
+
+
+def _iniciar_processo(geracao, consumo, pesos):
+    global _perfis
+    _perfis = (geracao, consumo, pesos)
+
+
+def _autoconsumo_bloco_processo(coluna_geracao, potencia, coluna_consumo):
+    return _autoconsumo_bloco(*_perfis, coluna_geracao, potencia, coluna_consumo)
+
+
+def _valores(nome, base, faixas, formato, eixo):
+    # Valores do parâmetro com dimensão 1 nos outros eixos da grade (escalar se não varrido)
+    if nome not in faixas:
+        return np.float64(base[nome])
+    forma = [1] * len(formato)
+    forma[eixo[nome]] = formato[eixo[nome]]
+    return np.asarray(faixas[nome], dtype=np.float64).reshape(forma)
+
+
+def varrer(faixas: dict, base: Optional[dict] = None, semente: int = 0,
+           processos: Optional[int] = None) -> ResultadoVarredura:
+    """Avalia a grade cartesiana de `faixas` ({parâmetro: valores}) sobre `base`."""
+    desconhecidos = set(faixas) - set(ENERGIA) - set(FINANCEIROS)
+    if desconhecidos:
+        raise ValueError(f"parâmetros sem varredura: {', '.join(sorted(desconhecidos))}")
+    base = {**BASE, **(base or {})}
+    faixas = {nome: np.atleast_1d(np.asarray(valores, dtype=np.float64)) for nome, valores in faixas.items()}
+    eixo = {nome: i for i, nome in enumerate(faixas)}
+    formato = tuple(len(valores) for valores in faixas.values())
+
+    # Geração de 1 kWp por combinação dos parâmetros de geração varridos
+    geracao_varridos = [nome for nome in faixas if nome in GERACAO]
+    grade_geracao = _grade([len(faixas[nome]) for nome in geracao_varridos])
+    sistema = {nome: np.full(grade_geracao.shape[1], float(base[nome])) for nome in GERACAO}
+    for nome, indices in zip(geracao_varridos, grade_geracao):
+        sistema[nome] = faixas[nome][indices]
+    instantes = fotovoltaico.instantes_ano(int(base["ano"]))
+    geracao = fotovoltaico.simular(
+        instantes, 1.0, latitude=base["latitude"], longitude=base["longitude"],
+        inclinacao=sistema["inclinacao"], azimute=sistema["azimute"],
+        transmitancia=sistema["intensidade_sol"] / 100, temperatura_ambiente=fotovoltaico.temperatura_tipica(instantes),
+    ).energia_kwh
+    hora = (instantes - instantes.astype("datetime64[D]")).astype("timedelta64[h]").astype(int)
+    pico = (hora >= 18) & (hora <= 21)
+    consumo = _perfil_consumo(faixas.get("consumo_base", [base["consumo_base"]]), len(instantes), semente)
+
+    # Pares de energia: uma coluna de geração, uma potência e uma coluna de consumo por ponto
+    energia_varridos = [nome for nome in faixas if nome in ENERGIA]
+    formato_energia = [len(faixas[nome]) for nome in energia_varridos]
+    grade_energia = dict(zip(energia_varridos, _grade(formato_energia)))
+    pares = int(np.prod(formato_energia))
+    coluna_geracao = (np.ravel_multi_index([grade_energia[nome] for nome in geracao_varridos],
+                                           [len(faixas[nome]) for nome in geracao_varridos])
+                      if geracao_varridos else np.zeros(pares, dtype=np.intp))
+    potencia = (faixas["potencia_kwp"][grade_energia["potencia_kwp"]] if "potencia_kwp" in faixas
+                else np.full(pares, float(base["potencia_kwp"])))
+    coluna_consumo = grade_energia.get("consumo_base", np.zeros(pares, dtype=np.intp))
+
+    # Consumo e geração totais não dependem do par; o autoconsumo só das horas com sol
+    consumo_fora, consumo_ponta = consumo[~pico].sum(axis=0), consumo[pico].sum(axis=0)
+    total_geracao = geracao.sum(axis=0)
+    dia = np.flatnonzero(geracao.any(axis=1))
+    perfis = (geracao[dia], consumo[dia], np.stack([~pico[dia], pico[dia]]).astype(np.float64))
+
+    blocos = [slice(inicio, inicio + BLOCO_PARES) for inicio in range(0, pares, BLOCO_PARES)]
+    if processos is None:
+        processos = (os.cpu_count() or 1) if pares >= PARES_PARALELO else 1
+    argumentos = [(coluna_geracao[b], potencia[b], coluna_consumo[b]) for b in blocos]
+    if processos > 1 and len(blocos) > 1:
+        with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo,
+                                 initargs=perfis) as executor:
+            autoconsumo = list(executor.map(_autoconsumo_bloco_processo, *zip(*argumentos)))
+    else:
+        autoconsumo = [_autoconsumo_bloco(*perfis, *a) for a in argumentos]
+    autoconsumo = np.concatenate(autoconsumo, axis=1)
+    # Somas com os eixos de energia no lugar e dimensão 1 nos financeiros
+    forma_energia = [formato[i] if nome in ENERGIA else 1 for i, nome in enumerate(faixas)]
+    somas = financeiro.SomasEnergia(*(campo.reshape(forma_energia) for campo in (
+        autoconsumo[0], autoconsumo[1], consumo_fora[coluna_consumo], consumo_ponta[coluna_consumo],
+        potencia * total_geracao[coluna_geracao],
+    )))
+
+    # Financeiro: broadcasting sobre a grade inteira, fluxo de caixa em blocos de pontos
+    parametros = {nome: _valores(nome, base, faixas, formato, eixo) for nome in FINANCEIROS}
+    economia_anual = np.broadcast_to(
+        financeiro.valorar(somas, parametros["tarifa_normal"], parametros["tarifa_pico"],
+                           parametros["tarifa_compensacao"]).economia_total, formato).ravel()
+    planos = {nome: np.broadcast_to(valor, formato).ravel() for nome, valor in parametros.items()}
+    pontos = economia_anual.size
+    economia_horizonte, payback, vpl = np.empty(pontos), np.empty(pontos), np.empty(pontos)
+    for inicio in range(0, pontos, BLOCO_PONTOS):
+        b = slice(inicio, inicio + BLOCO_PONTOS)
+        fluxos = financeiro.fluxo_caixa(
+            financeiro.economias_anuais(economia_anual[b], reajuste=planos["reajuste"][b]),
+            planos["investimento"][b], planos["degradacao"][b], planos["om_fracao"][b], planos["inflacao"][b],
+            planos["ano_troca_inversor"][b], planos["inversor_fracao"][b],
+        )
+        economia_horizonte[b] = fluxos[:, 1:].sum(axis=1)
+        payback[b] = financeiro.payback(fluxos)
+        vpl[b] = financeiro.vpl(fluxos, planos["taxa_desconto"][b])
+    return ResultadoVarredura(
+        faixas, economia_anual.reshape(formato), economia_horizonte.reshape(formato),
+        payback.reshape(formato), vpl.reshape(formato),
+    )
+
+
+def tornado(faixas: dict, metrica: str = "payback_anos", base: Optional[dict] = None,
+            semente: int = 0) -> Tornado:
+    """Um parâmetro por vez nos extremos da sua faixa, os outros na base."""
+    base_valor = float(getattr(varrer({}, base, semente), metrica))
+    no_minimo, no_maximo = [], []
+    for nome, valores in faixas.items():
+        extremos = getattr(varrer({nome: [np.min(valores), np.max(valores)]}, base, semente), metrica)
+        no_minimo.append(extremos[0])
+        no_maximo.append(extremos[1])
+    no_minimo, no_maximo = np.array(no_minimo), np.array(no_maximo)
+    # inf (não se paga) conta como a maior amplitude
+    with np.errstate(invalid="ignore"):
+        amplitude = np.nan_to_num(np.abs(no_maximo - no_minimo), nan=np.inf)
+    ordem = np.argsort(-amplitude, kind="stable")
+    return Tornado(tuple(np.array(list(faixas))[ordem]), no_minimo[ordem], no_maximo[ordem], base_valor)
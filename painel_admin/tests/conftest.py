@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Os módulos do painel se importam pelo nome (import financeiro), como quando
+# o Streamlit roda de dentro de painel_admin/
+DIRETORIO_PAINEL = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, DIRETORIO_PAINEL)
@@ -0,0 +1,43 @@
+import numpy as np
+
+import dimensionamento
+
+TARIFAS = {"tarifa_normal": 0.65, "tarifa_pico": 1.2, "tarifa_compensacao": 0.0}
+
+
+def perfil_ano():
+    # 1 kWp: sol das 6h às 18h; consumo concentrado à noite, com a ponta das 18h às 21h
+    hora = np.arange(8760) % 24
+    geracao_kwp = np.clip(np.sin(np.pi * (hora - 6) / 12), 0, None) * 0.8
+    consumido = np.where((hora >= 17) & (hora <= 22), 1.2, 0.3)
+    return geracao_kwp, consumido, (hora >= 18) & (hora <= 21)
+
+
+def test_vpl_com_bateria_bate_a_forca_bruta():
+    geracao_kwp, consumido, pico = perfil_ano()
+    # Sem compensação do excedente, a bateria paga: o ótimo fica no meio da faixa
+    parametros = {**TARIFAS, "custo_bateria_kwh": 1500.0}
+    potencia, bateria = (g.ravel() for g in np.meshgrid(np.arange(0.5, 8.01, 0.25), np.arange(0.0, 12.01, 0.5),
+                                                        indexing="ij"))
+    bruta = dimensionamento.avaliar(geracao_kwp, consumido, pico, potencia, bateria, **parametros)
+    melhor = np.argmax(bruta.vpl)
+
+    resultado = dimensionamento.otimizar(geracao_kwp, consumido, pico, objetivo="vpl", potencia_max=8.0,
+                                         bateria_max=12.0, **parametros)
+    assert not resultado.no_limite
+    assert resultado.otimo.vpl >= bruta.vpl[melhor]
+    assert abs(resultado.otimo.potencia_kwp - potencia[melhor]) <= 0.25
+    assert abs(resultado.otimo.bateria_kwh - bateria[melhor]) <= 0.5
+
+
+def test_payback_sem_bateria_bate_a_forca_bruta():
+    geracao_kwp, consumido, pico = perfil_ano()
+    potencia = np.arange(0.5, 8.001, 0.01)
+    bruta = dimensionamento.avaliar(geracao_kwp, consumido, pico, potencia, 0.0, **TARIFAS)
+    melhor = np.argmin(bruta.payback_anos)
+
+    resultado = dimensionamento.otimizar(geracao_kwp, consumido, pico, objetivo="payback", potencia_max=8.0,
+                                         **TARIFAS)
+    assert resultado.otimo.bateria_kwh == 0.0
+    assert resultado.otimo.payback_anos <= bruta.payback_anos[melhor] * (1 + 1e-3)
+    assert abs(resultado.otimo.potencia_kwp - potencia[melhor]) <= 0.05
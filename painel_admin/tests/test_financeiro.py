@@ -0,0 +1,67 @@
+import numpy as np
+
+import financeiro
+
+
+def test_calcular_valores_conhecidos():
+    # Hora 1, fora de ponta: 1 kWh autoconsumido e 2 kWh injetados; hora 2, ponta: sem sol
+    resultado = financeiro.calcular([3.0, 0.0], [1.0, 2.0], [False, True],
+                                    tarifa_normal=0.5, tarifa_pico=1.0, tarifa_compensacao=0.25)
+    np.testing.assert_allclose(resultado.economia_consumo, [0.5, 0.0])
+    np.testing.assert_allclose(resultado.ganho_excedente, [0.5, 0.0])
+    np.testing.assert_allclose(resultado.custo_sem_solar, [0.5, 2.0])
+    np.testing.assert_allclose(resultado.custo_real, [0.0, 2.0])
+    np.testing.assert_allclose(resultado.economia_total, [1.0, 0.0])
+
+
+def test_totais_em_blocos_batem_com_calcular():
+    rng = np.random.default_rng(0)
+    gerado = rng.uniform(0, 3, (48, 5))
+    consumido = rng.uniform(0, 2, 48)
+    pico = np.arange(48) % 24 >= 18
+    tarifas = (np.linspace(0.5, 0.7, 5), 0.9, np.linspace(0.2, 0.4, 5))
+    por_intervalo = financeiro.calcular(gerado, consumido, pico, *tarifas)
+    somados = financeiro.totais(gerado, consumido, pico, *tarifas, bloco=2)
+    for campo, esperado in zip(somados, por_intervalo):
+        np.testing.assert_allclose(campo, esperado.sum(axis=0))
+
+
+def test_vpl_e_tir_de_anuidade():
+    # Anuidade: VPL = -I + A (1 - (1 + r)^-T) / r; com I = valor presente a 10%, a TIR é 10%
+    anos, parcela, taxa = 25, 1000.0, 0.08
+    fator = (1 - (1 + taxa) ** -anos) / taxa
+    fluxos = np.array([-5000.0] + [parcela] * anos)
+    np.testing.assert_allclose(financeiro.vpl(fluxos, taxa), -5000.0 + parcela * fator)
+
+    investimento_10 = parcela * (1 - 1.1 ** -anos) / 0.1
+    planos = np.array([
+        [-investimento_10] + [parcela] * anos,
+        [-100.0, 110.0] + [0.0] * (anos - 1),
+        [-1000.0] + [0.0] * anos,            # VPL sempre negativo: não existe TIR
+    ])
+    tir = financeiro.tir(planos)
+    np.testing.assert_allclose(tir[:2], [0.10, 0.10], atol=1e-9)
+    np.testing.assert_allclose(financeiro.vpl(planos[:2], tir[:2]), 0.0, atol=1e-6)
+    assert np.isnan(tir[2])
+
+
+def test_payback_de_fluxo_constante():
+    fluxos = np.array([
+        [-1000.0, 300.0, 300.0, 300.0, 300.0],   # paga em 3 + 100/300 anos
+        [-1000.0, 100.0, 100.0, 100.0, 100.0],   # não se paga no horizonte
+        [0.0, 100.0, 100.0, 100.0, 100.0],       # sem investimento
+    ])
+    np.testing.assert_allclose(financeiro.payback(fluxos), [10 / 3, np.inf, 0.0])
+
+
+def test_fluxo_caixa_sem_custos_e_com_troca_do_inversor():
+    economias = financeiro.economias_anuais(1000.0, anos=3, reajuste=0.1)
+    np.testing.assert_allclose(economias, [1000.0, 1100.0, 1210.0])
+
+    sem_custos = financeiro.fluxo_caixa(economias, 5000.0, degradacao=0.0, om_fracao=0.0, ano_troca_inversor=0)
+    np.testing.assert_allclose(sem_custos, [-5000.0, 1000.0, 1100.0, 1210.0])
+
+    fluxos = financeiro.fluxo_caixa(economias, 5000.0, degradacao=0.5, om_fracao=0.01, inflacao=0.0,
+                                    ano_troca_inversor=2, inversor_fracao=0.1)
+    # Ano t: economia x 0,5^(t-1) - O&M de 50, mais 500 do inversor no ano 2
+    np.testing.assert_allclose(fluxos, [-5000.0, 950.0, 1100.0 * 0.5 - 550.0, 1210.0 * 0.25 - 50.0])
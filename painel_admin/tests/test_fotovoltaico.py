@@ -0,0 +1,37 @@
+import numpy as np
+
+import fotovoltaico
+
+
+def simular_ano(potencia_kwp=1.0):
+    instantes = fotovoltaico.instantes_ano(2025)
+    resultado = fotovoltaico.simular(instantes, potencia_kwp,
+                                     temperatura_ambiente=fotovoltaico.temperatura_tipica(instantes))
+    hora = (instantes - instantes.astype("datetime64[D]")).astype("timedelta64[h]").astype(int)
+    return resultado.energia_kwh, hora
+
+
+def test_sem_producao_a_noite_e_pico_plausivel():
+    energia, hora = simular_ano()
+    assert energia[(hora < 5) | (hora >= 19)].max() == 0.0
+    assert energia.min() >= 0.0
+    # Céu claro em São Paulo: pico horário abaixo da potência CA (1 kWp / razão CC/CA 1,2)
+    assert 0.6 < energia.max() <= 1 / 1.2
+    # Limite superior de céu claro: 1500-2200 kWh/kWp no ano
+    assert 1500 < energia.sum() < 2200
+
+
+def test_geometria_e_ceu_claro():
+    # Equinócio, meio-dia, no equador e no meridiano do fuso: sol quase a pino
+    instante = np.array(["2025-03-20T12:00"], dtype="datetime64[m]")
+    cos_zenite, _, _ = fotovoltaico.posicao_solar(instante, 0.0, -45.0, -3)
+    assert cos_zenite[0] > 0.99
+    # Haurwitz com o sol a pino: 1098 exp(-0,057) W/m², dividida em direta e difusa
+    ghi, dni, dhi = fotovoltaico.ceu_claro(np.array([1.0]), np.array([1367.0]))
+    np.testing.assert_allclose(ghi, 1098 * np.exp(-0.057))
+    np.testing.assert_allclose(dni + dhi, ghi)
+
+
+def test_producao_linear_na_potencia():
+    energia, _ = simular_ano(np.array([1.0, 2.5]))
+    np.testing.assert_allclose(energia[:, 1], 2.5 * energia[:, 0], atol=1e-12)
@@ -0,0 +1,38 @@
+import numpy as np
+
+import montecarlo
+
+
+def perfil_ano():
+    # Sol das 6h às 18h, consumo constante, ponta das 18h às 21h
+    hora = np.arange(8760) % 24
+    gerado = np.clip(np.sin(np.pi * (hora - 6) / 12), 0, None) * 4.0
+    consumido = np.full(8760, 1.5)
+    return gerado, consumido, (hora >= 18) & (hora <= 21)
+
+
+def simular(investimento=15000.0, **opcoes):
+    return montecarlo.simular(*perfil_ano(), 0.65, 0.85, 0.50, investimento, cenarios=600, **opcoes)
+
+
+def test_percentis_ordenados_e_reprodutiveis():
+    resultado = simular(semente=7)
+    resumo = resultado.percentis()
+    for nome in ("payback_anos", "vpl", "tir"):
+        faixa = resumo[nome]
+        assert faixa["P10"] <= faixa["P50"] <= faixa["P90"]
+    assert resumo["fracao_sem_tir"] == 0.0
+
+    # Mesma semente, mesmo resultado, com um ou dois processos (blocos com sementes próprias)
+    for processos in (1, 2):
+        repetido = simular(semente=7, processos=processos)
+        np.testing.assert_array_equal(repetido.fluxos, resultado.fluxos)
+    assert not np.array_equal(simular(semente=8).fluxos, resultado.fluxos)
+
+
+def test_cenarios_sem_tir_contados_a_parte():
+    # Investimento que nunca se paga: nenhum cenário tem TIR, nem vira TIR "baixa"
+    resumo = simular(investimento=1e7, semente=0).percentis()
+    assert resumo["fracao_sem_tir"] == 1.0
+    assert all(np.isnan(v) for v in resumo["tir"].values())
+    assert resumo["payback_anos"]["P10"] == np.inf
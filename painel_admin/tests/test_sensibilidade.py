@@ -0,0 +1,41 @@
+import itertools
+
+import numpy as np
+
+import financeiro
+import fotovoltaico
+import sensibilidade
+
+
+def test_ponto_base_bate_com_o_calculo_direto():
+    base = sensibilidade.BASE
+    resultado = sensibilidade.varrer({})
+
+    instantes = fotovoltaico.instantes_ano(base["ano"])
+    geracao = fotovoltaico.simular(
+        instantes, base["potencia_kwp"], latitude=base["latitude"], longitude=base["longitude"],
+        inclinacao=base["inclinacao"], azimute=base["azimute"], transmitancia=base["intensidade_sol"] / 100,
+        temperatura_ambiente=fotovoltaico.temperatura_tipica(instantes),
+    ).energia_kwh
+    consumo = sensibilidade._perfil_consumo([base["consumo_base"]], len(instantes), 0)[:, 0]
+    hora = np.arange(len(instantes)) % 24
+    economia = financeiro.totais(geracao, consumo, (hora >= 18) & (hora <= 21), base["tarifa_normal"],
+                                 base["tarifa_pico"], base["tarifa_compensacao"]).economia_total
+    fluxos = financeiro.fluxo_caixa(
+        financeiro.economias_anuais(economia, reajuste=base["reajuste"]), base["investimento"], base["degradacao"],
+        base["om_fracao"], base["inflacao"], base["ano_troca_inversor"], base["inversor_fracao"],
+    )
+    np.testing.assert_allclose(resultado.economia_anual, economia)
+    np.testing.assert_allclose(resultado.vpl, financeiro.vpl(fluxos, base["taxa_desconto"]))
+    np.testing.assert_allclose(resultado.payback_anos, financeiro.payback(fluxos))
+
+
+def test_grade_bate_com_cada_ponto_avaliado_sozinho():
+    faixas = {"inclinacao": [10.0, 24.0], "potencia_kwp": [3.0, 5.0], "tarifa_normal": [0.5, 0.65]}
+    grade = sensibilidade.varrer(faixas)
+    assert grade.vpl.shape == (2, 2, 2)
+    for indice in itertools.product(range(2), repeat=3):
+        ponto = {nome: valores[i] for (nome, valores), i in zip(faixas.items(), indice)}
+        sozinho = sensibilidade.varrer({}, base=ponto)
+        for metrica in sensibilidade.METRICAS:
+            np.testing.assert_allclose(getattr(grade, metrica)[indice], getattr(sozinho, metrica))
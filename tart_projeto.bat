@@ -5,7 +5,7 @@ call venv\Scripts\activate
 
 echo =======================
 echo Iniciando API (porta 8000)...
-start cmd /k "cd backend && uvicorn main:app --reload"
+start cmd /k "cd backend && python migracoes.py aplicar && uvicorn main:app --reload"
 timeout /t 2 > nul
 
 echo =======================